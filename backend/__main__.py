@@ -30,19 +30,21 @@ def cleanup():
     logger.info("Performing cleanup tasks.")
 
 if __name__ == "__main__":
+    # Report where startup time goes rather than running the app
+    if '--profile-startup' in sys.argv:
+        from backend.profiling import profile_startup
+        sys.exit(profile_startup())
+
     # Set up signal handlers
     signal.signal(signal.SIGINT, handle_keyboard_interrupt)
     signal.signal(signal.SIGTERM, handle_keyboard_interrupt)
 
-    # Ensure certificates are generated
+    # Ensure certificates are generated. The app itself is created by uvicorn,
+    # through the app:create_app factory (which reloading needs), so it isn't
+    # created here as well.
     from common.cert import check_cert
     check_cert()
 
-    # Create the app
-    logger.info("Creating the app.")
-    from app import create_app
-    app = create_app()
-
     # Define host and port
     host = get_env_key("PAIOS_HOST", "localhost")
     port = int(get_env_key("PAIOS_PORT", 8443))
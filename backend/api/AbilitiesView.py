@@ -1,4 +1,6 @@
 from starlette.responses import JSONResponse
+from backend.etags import conditional
+from backend.responses import FastJSONResponse
 from backend.managers.AbilitiesManager import AbilitiesManager
 from backend.pagination import parse_pagination_params
 import logging
@@ -20,12 +22,14 @@ class AbilitiesView:
     async def delete(self, id: str):
         return self.error_immutable()
 
+    @conditional()
     def get(self, id=None):
         ability = self.am.get_ability(id)
         if ability:
-            return JSONResponse(status_code=200, content=ability)
+            return FastJSONResponse(ability, status_code=200)
         return JSONResponse(status_code=404, content={"message": "Ability not found"})
 
+    @conditional()
     async def search(self, filter: str = None, range: str = None, sort: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
@@ -46,7 +50,7 @@ class AbilitiesView:
             'X-Total-Count': str(total_count),
             'Content-Range': f'abilities {offset}-{offset + len(abilities) - 1}/{total_count}'
         }
-        return JSONResponse(abilities, status_code=200, headers=headers)
+        return FastJSONResponse(abilities, status_code=200, headers=headers)
 
     async def install(self, id: str, version: str = None):
         try:
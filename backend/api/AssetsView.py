@@ -1,29 +1,34 @@
 from starlette.responses import JSONResponse, Response
+from backend.etags import conditional
+from backend.responses import FastJSONResponse
+from connexion import request
 from backend.managers.AssetsManager import AssetsManager
 from common.paths import api_base_url
-from backend.pagination import parse_pagination_params
+from backend.pagination import parse_pagination_params, parse_cursor, next_cursor, estimate_count_requested
 from backend.schemas import AssetCreateSchema, AssetSchema
+from backend.bulk import parse_bulk_body, validate_bulk_items, valid_items, bulk_results, bulk_result, export_response, import_ndjson
 from typing import List
 
 class AssetsView:
     def __init__(self):
         self.am = AssetsManager()
 
+    @conditional('asset')
     async def get(self, id: str):
         asset = await self.am.retrieve_asset(id)
         if asset is None:
             return JSONResponse({"error": "Asset not found"}, status_code=404)
-        return JSONResponse(asset.model_dump(), status_code=200)
+        return FastJSONResponse(asset, status_code=200)
 
     async def post(self, body: AssetCreateSchema):
-        new_asset = await self.am.create_asset(body)
-        return JSONResponse(new_asset.model_dump(), status_code=201, headers={'Location': f'{api_base_url}/assets/{new_asset.id}'})
+        new_asset = await self.am.create_asset(AssetCreateSchema(**body))
+        return FastJSONResponse(new_asset, status_code=201, headers={'Location': f'{api_base_url}/assets/{new_asset.id}'})
     
     async def put(self, id: str, body: AssetCreateSchema):
-        updated_asset = await self.am.update_asset(id, body)
+        updated_asset = await self.am.update_asset(id, AssetCreateSchema(**body))
         if updated_asset is None:
             return JSONResponse({"error": "Asset not found"}, status_code=404)
-        return JSONResponse(updated_asset.model_dump(), status_code=200)
+        return FastJSONResponse(updated_asset, status_code=200)
 
     async def delete(self, id: str):
         success = await self.am.delete_asset(id)
@@ -31,26 +36,87 @@ class AssetsView:
             return JSONResponse({"error": "Asset not found"}, status_code=404)
         return Response(status_code=204)
     
-    async def search(self, filter: str = None, range: str = None, sort: str = None):
+    # Bulk endpoints take a JSON array or NDJSON and return a result per item
+    async def bulk_create(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), AssetCreateSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        created = await self.am.create_assets(valid_items(items))
+        return JSONResponse(bulk_results(items, created, 201, 409, "Asset could not be created"), status_code=200)
+
+    async def bulk_update(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), AssetSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        updated = await self.am.update_assets(valid_items(items))
+        return JSONResponse(bulk_results(items, updated, 200, 404, "Asset not found"), status_code=200)
+
+    async def bulk_delete(self, body):
+        deleted = await self.am.delete_assets(body['ids'])
+        return JSONResponse([bulk_result(204, id=id) if success else bulk_result(404, id=id, error="Asset not found")
+                             for id, success in zip(body['ids'], deleted)], status_code=200)
+
+    # Imports a large NDJSON upload in batches as it streams in (no body argument,
+    # so the request body isn't buffered) and returns a summary
+    async def bulk_import(self):
+        try:
+            summary = await import_ndjson(request.stream(), AssetCreateSchema, self.am.create_assets)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(summary, status_code=200)
+
+    # Streams every asset matching the filter as NDJSON or CSV
+    async def export(self, filter: str = None, format: str = 'ndjson'):
+        result = parse_pagination_params(filter)
+        if isinstance(result, JSONResponse):
+            return result
+        filters = result[4]
+        query = filters.pop('q', None) if filters else None
+        try:
+            assets = self.am.export_assets(filters, query)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return export_response('assets', assets, AssetSchema, format)
+
+    @conditional('asset')
+    async def search(self, filter: str = None, range: str = None, sort: str = None, cursor: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
             return result
 
         offset, limit, sort_by, sort_order, filters = result
 
+        after = None
+        if cursor:
+            after = parse_cursor(cursor)
+            if isinstance(after, JSONResponse):
+                return after
+            offset, sort_by, sort_order = after['position'], after['sort_by'], after['sort_order']
+
         # Extract the free text search query
         query = filters.pop('q', None)
 
-        assets, total_count = await self.am.retrieve_assets(
-            limit=limit, 
-            offset=offset, 
-            sort_by=sort_by, 
-            sort_order=sort_order, 
-            filters=filters, 
-            query=query
-        )
+        try:
+            assets, total_count = await self.am.retrieve_assets(
+                limit=limit, 
+                offset=offset, 
+                sort_by=sort_by, 
+                sort_order=sort_order, 
+                filters=filters, 
+                query=query,
+                after=after,
+                estimate_count=estimate_count_requested(request)
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
         headers = {
             'X-Total-Count': str(total_count),
             'Content-Range': f'assets {offset}-{offset + len(assets) - 1}/{total_count}'
         }
-        return JSONResponse([asset.model_dump() for asset in assets], status_code=200, headers=headers)
+        # relevance ranked results have no sort key to seek on, so use offset paging for those
+        next_page = next_cursor(assets, limit, sort_by, sort_order, offset) if sort_by or not query else None
+        if next_page:
+            headers['X-Next-Cursor'] = next_page
+        return FastJSONResponse(assets, status_code=200, headers=headers, schema=AssetSchema)
@@ -1,4 +1,5 @@
 from starlette.responses import JSONResponse, Response
+from backend.responses import FastJSONResponse
 from backend.managers.ConfigManager import ConfigManager
 from backend.schemas import ConfigSchema
 
@@ -10,13 +11,13 @@ class ConfigView:
         config_item = await self.cm.retrieve_config_item(key)
         if config_item is None:
             return JSONResponse(status_code=404, content={"error": "Config item not found"})
-        return JSONResponse(config_item.model_dump(), status_code=200)
+        return FastJSONResponse(config_item, status_code=200)
 
     async def put(self, key: str, body: ConfigSchema):
         print(f"ConfigView: PUT {key}->{body}")
         updated_config = await self.cm.update_config_item(key, body.value)
         if updated_config:
-            return JSONResponse(updated_config.model_dump(), status_code=200)
+            return FastJSONResponse(updated_config, status_code=200)
         return JSONResponse({"error": "Failed to update config item"}, status_code=400)
 
     async def delete(self, key: str):
@@ -27,8 +28,8 @@ class ConfigView:
 
     async def list(self):
         config_items = await self.cm.retrieve_all_config_items()
-        return JSONResponse([item.model_dump() for item in config_items], status_code=200)
+        return FastJSONResponse(config_items, status_code=200, schema=ConfigSchema)
 
     async def create(self, body: ConfigSchema):
         new_config = await self.cm.create_config_item(body.value)
-        return JSONResponse(new_config.model_dump(), status_code=201)
+        return FastJSONResponse(new_config, status_code=201)
@@ -1,4 +1,5 @@
 from starlette.responses import Response, JSONResponse
+from backend.etags import conditional
 from backend.managers.DownloadsManager import DownloadsManager
 from backend.pagination import parse_pagination_params
 
@@ -6,6 +7,7 @@ class DownloadsView:
     def __init__(self):
         self.manager = DownloadsManager()
 
+    @conditional()
     async def get(self):
         downloads = await self.manager.retrieve_downloads()
         return JSONResponse(status_code=200, content=downloads)
@@ -31,6 +33,7 @@ class DownloadsView:
         await self.manager.delete_download(id)
         return Response(status_code=204)
 
+    @conditional()
     async def search(self, filter: str = None, range: str = None, sort: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
@@ -1,31 +1,34 @@
 from starlette.responses import JSONResponse, Response
+from backend.etags import conditional
+from backend.responses import FastJSONResponse
+from connexion import request
 from backend.managers.PersonasManager import PersonasManager
 from common.paths import api_base_url
-from backend.pagination import parse_pagination_params
-from backend.schemas import PersonaCreateSchema
+from backend.pagination import parse_pagination_params, parse_cursor, next_cursor, estimate_count_requested
+from backend.schemas import PersonaCreateSchema, PersonaSchema
+from backend.bulk import parse_bulk_body, validate_bulk_items, valid_items, bulk_results, bulk_result, export_response, import_ndjson
 
 
 class PersonasView:
     def __init__(self):
         self.pm = PersonasManager()
 
+    @conditional('persona')
     async def get(self, id: str):
         persona = await self.pm.retrieve_persona(id)
         if persona is None:
             return JSONResponse({"error": "Persona not found"}, status_code=404)
-        return JSONResponse(persona.dict(), status_code=200)
+        return FastJSONResponse(persona, status_code=200)
 
     async def post(self, body: PersonaCreateSchema):
-        id = await self.pm.create_persona(body)
-        persona = await self.pm.retrieve_persona(id)
-        return JSONResponse(persona.dict(), status_code=201, headers={'Location': f'{api_base_url}/personas/{id}'})
+        persona = await self.pm.create_persona(body)
+        return FastJSONResponse(persona, status_code=201, headers={'Location': f'{api_base_url}/personas/{persona.id}'})
 
     async def put(self, id: str, body: PersonaCreateSchema):
-        await self.pm.update_persona(id, body)
-        persona = await self.pm.retrieve_persona(id)
+        persona = await self.pm.update_persona(id, body)
         if persona is None:
             return JSONResponse({"error": "Persona not found"}, status_code=404)
-        return JSONResponse(persona.dict(), status_code=200)
+        return FastJSONResponse(persona, status_code=200)
 
     async def delete(self, id: str):
         success = await self.pm.delete_persona(id)
@@ -33,22 +36,81 @@ class PersonasView:
             return JSONResponse({"error": "Persona not found"}, status_code=404)
         return Response(status_code=204)
 
-    async def search(self, filter: str = None, range: str = None, sort: str = None):
+    # Bulk endpoints take a JSON array or NDJSON and return a result per item
+    async def bulk_create(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), PersonaCreateSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        created = await self.pm.create_personas(valid_items(items))
+        return JSONResponse(bulk_results(items, created, 201, 409, "Persona could not be created"), status_code=200)
+
+    async def bulk_update(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), PersonaSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        updated = await self.pm.update_personas(valid_items(items))
+        return JSONResponse(bulk_results(items, updated, 200, 404, "Persona not found"), status_code=200)
+
+    async def bulk_delete(self, body):
+        deleted = await self.pm.delete_personas(body['ids'])
+        return JSONResponse([bulk_result(204, id=id) if success else bulk_result(404, id=id, error="Persona not found")
+                             for id, success in zip(body['ids'], deleted)], status_code=200)
+
+    # Imports a large NDJSON upload in batches as it streams in (no body argument,
+    # so the request body isn't buffered) and returns a summary
+    async def bulk_import(self):
+        try:
+            summary = await import_ndjson(request.stream(), PersonaCreateSchema, self.pm.create_personas)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(summary, status_code=200)
+
+    # Streams every persona matching the filter as NDJSON or CSV
+    async def export(self, filter: str = None, format: str = 'ndjson'):
+        result = parse_pagination_params(filter)
+        if isinstance(result, JSONResponse):
+            return result
+        filters = result[4]
+        try:
+            personas = self.pm.export_personas(filters)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return export_response('personas', personas, PersonaSchema, format)
+
+    @conditional('persona')
+    async def search(self, filter: str = None, range: str = None, sort: str = None, cursor: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
             return result
 
         offset, limit, sort_by, sort_order, filters = result
 
-        personas, total_count = await self.pm.retrieve_personas(
-            limit=limit,
-            offset=offset,
-            sort_by=sort_by,
-            sort_order=sort_order,
-            filters=filters
-        )
+        after = None
+        if cursor:
+            after = parse_cursor(cursor)
+            if isinstance(after, JSONResponse):
+                return after
+            offset, sort_by, sort_order = after['position'], after['sort_by'], after['sort_order']
+
+        try:
+            personas, total_count = await self.pm.retrieve_personas(
+                limit=limit,
+                offset=offset,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                filters=filters,
+                after=after,
+                estimate_count=estimate_count_requested(request)
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
         headers = {
             'X-Total-Count': str(total_count),
             'Content-Range': f'personas {offset}-{offset + len(personas) - 1}/{total_count}'
         }
-        return JSONResponse([persona.dict() for persona in personas], status_code=200, headers=headers)
\ No newline at end of file
+        next_page = next_cursor(personas, limit, sort_by, sort_order, offset)
+        if next_page:
+            headers['X-Next-Cursor'] = next_page
+        return FastJSONResponse(personas, status_code=200, headers=headers, schema=PersonaSchema)
\ No newline at end of file
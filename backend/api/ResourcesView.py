@@ -1,29 +1,34 @@
 from starlette.responses import JSONResponse, Response
+from backend.etags import conditional
+from backend.responses import FastJSONResponse
+from connexion import request
 from common.paths import api_base_url
 from backend.managers.ResourcesManager import ResourcesManager
-from backend.pagination import parse_pagination_params
-from backend.schemas import ChannelCreateSchema
+from backend.pagination import parse_pagination_params, parse_cursor, next_cursor, estimate_count_requested
+from backend.schemas import ChannelCreateSchema, ChannelSchema
+from backend.bulk import parse_bulk_body, validate_bulk_items, valid_items, bulk_results, bulk_result, export_response, import_ndjson
 from typing import List
 
 class ResourcesView:
     def __init__(self):
         self.cm = ResourcesManager()
 
+    @conditional('resource')
     async def get(self, resource_id: str):
         resource = await self.cm.retrieve_resource(resource_id)
         if resource is None:
             return JSONResponse({"error": "Resource not found"}, status_code=404)
-        return JSONResponse(resource.model_dump(), status_code=200)
+        return FastJSONResponse(resource, status_code=200)
 
     async def post(self, body: ChannelCreateSchema):
-        new_resource = await self.cm.create_resource(body)
-        return JSONResponse(new_resource.model_dump(), status_code=201, headers={'Location': f'{api_base_url}/resources/{new_resource.id}'})
+        new_resource = await self.cm.create_resource(ChannelCreateSchema(**body))
+        return FastJSONResponse(new_resource, status_code=201, headers={'Location': f'{api_base_url}/resources/{new_resource.id}'})
 
     async def put(self, resource_id: str, body: ChannelCreateSchema):
-        updated_resource = await self.cm.update_resource(resource_id, body)
+        updated_resource = await self.cm.update_resource(resource_id, ChannelCreateSchema(**body))
         if updated_resource is None:
             return JSONResponse({"error": "Resource not found"}, status_code=404)
-        return JSONResponse(updated_resource.model_dump(), status_code=200)
+        return FastJSONResponse(updated_resource, status_code=200)
 
     async def delete(self, resource_id: str):
         success = await self.cm.delete_resource(resource_id)
@@ -31,16 +36,74 @@ class ResourcesView:
             return JSONResponse({"error": "Resource not found"}, status_code=404)
         return Response(status_code=204)
 
-    async def search(self, filter: str = None, range: str = None, sort: str = None):
+    # Bulk endpoints take a JSON array or NDJSON and return a result per item
+    async def bulk_create(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), ChannelCreateSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        created = await self.cm.create_resources(valid_items(items))
+        return JSONResponse(bulk_results(items, created, 201, 409, "Resource could not be created"), status_code=200)
+
+    async def bulk_update(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), ChannelSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        updated = await self.cm.update_resources(valid_items(items))
+        return JSONResponse(bulk_results(items, updated, 200, 404, "Resource not found"), status_code=200)
+
+    async def bulk_delete(self, body):
+        deleted = await self.cm.delete_resources(body['ids'])
+        return JSONResponse([bulk_result(204, id=id) if success else bulk_result(404, id=id, error="Resource not found")
+                             for id, success in zip(body['ids'], deleted)], status_code=200)
+
+    # Imports a large NDJSON upload in batches as it streams in (no body argument,
+    # so the request body isn't buffered) and returns a summary
+    async def bulk_import(self):
+        try:
+            summary = await import_ndjson(request.stream(), ChannelCreateSchema, self.cm.create_resources)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(summary, status_code=200)
+
+    # Streams every resource matching the filter as NDJSON or CSV
+    async def export(self, filter: str = None, format: str = 'ndjson'):
+        result = parse_pagination_params(filter)
+        if isinstance(result, JSONResponse):
+            return result
+        filters = result[4]
+        try:
+            resources = self.cm.export_resources(filters)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return export_response('resources', resources, ChannelSchema, format)
+
+    @conditional('resource')
+    async def search(self, filter: str = None, range: str = None, sort: str = None, cursor: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
             return result
 
         offset, limit, sort_by, sort_order, filters = result
 
-        resources, total_count = await self.cm.retrieve_resources(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters)
+        after = None
+        if cursor:
+            after = parse_cursor(cursor)
+            if isinstance(after, JSONResponse):
+                return after
+            offset, sort_by, sort_order = after['position'], after['sort_by'], after['sort_order']
+
+        try:
+            resources, total_count = await self.cm.retrieve_resources(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters, after=after,
+                                                                      estimate_count=estimate_count_requested(request))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
         headers = {
             'X-Total-Count': str(total_count),
             'Content-Range': f'resources {offset}-{offset + len(resources) - 1}/{total_count}'
         }
-        return JSONResponse([resource.model_dump() for resource in resources], status_code=200, headers=headers)
+        next_page = next_cursor(resources, limit, sort_by, sort_order, offset)
+        if next_page:
+            headers['X-Next-Cursor'] = next_page
+        return FastJSONResponse(resources, status_code=200, headers=headers, schema=ChannelSchema)
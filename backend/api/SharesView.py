@@ -1,18 +1,35 @@
 from starlette.responses import JSONResponse, Response
+from backend.etags import conditional
+from backend.responses import FastJSONResponse
+from connexion import request
 from common.paths import api_base_url
 from backend.managers.SharesManager import SharesManager
-from backend.pagination import parse_pagination_params
+from backend.pagination import parse_pagination_params, parse_cursor, next_cursor, estimate_count_requested
+from backend.schemas import ShareCreateSchema, ShareSchema
+from backend.bulk import parse_bulk_body, validate_bulk_items, valid_items, bulk_results, bulk_result, export_response
 from datetime import datetime, timezone
 
+# Stores expiration times in UTC and a missing user as NULL, as post and put do.
+# Only fields that were given are normalized, so those that weren't stay unset
+# (and so untouched by bulk updates).
+def normalize_share(share, **changes):
+    normalized = {}
+    if 'expiration_dt' in share.model_fields_set:
+        normalized['expiration_dt'] = share.expiration_dt.astimezone(tz=timezone.utc) if share.expiration_dt else None
+    if 'user_id' in share.model_fields_set:
+        normalized['user_id'] = share.user_id or None
+    return share.model_copy(update={**normalized, **changes})
+
 class SharesView:
     def __init__(self):
         self.slm = SharesManager()
 
+    @conditional('share')
     async def get(self, id: str):
         share = await self.slm.retrieve_share(id)
         if share is None:
             return JSONResponse(headers={"error": "Share not found"}, status_code=404)
-        return JSONResponse(share.model_dump(), status_code=200)
+        return FastJSONResponse(share, status_code=200)
 
     async def post(self, body: dict):
         expiration_dt = None
@@ -25,7 +42,7 @@ class SharesView:
                                                 user_id=user_id,
                                                 expiration_dt=expiration_dt,
                                                 is_revoked=False)
-        return JSONResponse(new_share.model_dump(), status_code=201, headers={'Location': f'{api_base_url}/shares/{new_share.id}'})
+        return FastJSONResponse(new_share, status_code=201, headers={'Location': f'{api_base_url}/shares/{new_share.id}'})
 
     async def put(self, id: str, body: dict):
         expiration_dt = None
@@ -41,7 +58,7 @@ class SharesView:
                                                     is_revoked=body['is_revoked'])
         if updated_share is None:
             return JSONResponse({"error": "Share not found"}, status_code=404)
-        return JSONResponse(updated_share.model_dump(), status_code=200)
+        return FastJSONResponse(updated_share, status_code=200)
 
     async def delete(self, id: str):
         success = await self.slm.delete_share(id)
@@ -49,16 +66,65 @@ class SharesView:
             return JSONResponse({"error": "Share not found"}, status_code=404)
         return Response(status_code=204)
 
-    async def search(self, filter: str = None, range: str = None, sort: str = None):
+    # Bulk endpoints take a JSON array or NDJSON and return a result per item
+    async def bulk_create(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), ShareCreateSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        created = await self.slm.create_shares([normalize_share(share, is_revoked=False) for share in valid_items(items)])
+        return JSONResponse(bulk_results(items, created, 201, 409, "Share could not be created"), status_code=200)
+
+    async def bulk_update(self, body):
+        try:
+            items = validate_bulk_items(parse_bulk_body(body), ShareSchema)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        updated = await self.slm.update_shares([normalize_share(share) for share in valid_items(items)])
+        return JSONResponse(bulk_results(items, updated, 200, 404, "Share not found"), status_code=200)
+
+    async def bulk_delete(self, body):
+        deleted = await self.slm.delete_shares(body['ids'])
+        return JSONResponse([bulk_result(204, id=id) if success else bulk_result(404, id=id, error="Share not found")
+                             for id, success in zip(body['ids'], deleted)], status_code=200)
+
+    # Streams every share matching the filter as NDJSON or CSV
+    async def export(self, filter: str = None, format: str = 'ndjson'):
+        result = parse_pagination_params(filter)
+        if isinstance(result, JSONResponse):
+            return result
+        filters = result[4]
+        try:
+            shares = self.slm.export_shares(filters)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return export_response('shares', shares, ShareSchema, format)
+
+    @conditional('share')
+    async def search(self, filter: str = None, range: str = None, sort: str = None, cursor: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
             return result
 
         offset, limit, sort_by, sort_order, filters = result
 
-        shares, total_count = await self.slm.retrieve_shares(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters)
+        after = None
+        if cursor:
+            after = parse_cursor(cursor)
+            if isinstance(after, JSONResponse):
+                return after
+            offset, sort_by, sort_order = after['position'], after['sort_by'], after['sort_order']
+
+        try:
+            shares, total_count = await self.slm.retrieve_shares(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters, after=after,
+                                                                 estimate_count=estimate_count_requested(request))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
         headers = {
             'X-Total-Count': str(total_count),
             'Content-Range': f'shares {offset}-{offset + len(shares) - 1}/{total_count}'
         }
-        return JSONResponse([share.model_dump() for share in shares], status_code=200, headers=headers)
+        next_page = next_cursor(shares, limit, sort_by, sort_order, offset)
+        if next_page:
+            headers['X-Next-Cursor'] = next_page
+        return FastJSONResponse(shares, status_code=200, headers=headers, schema=ShareSchema)
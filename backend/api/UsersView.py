@@ -1,12 +1,14 @@
 from starlette.responses import JSONResponse, Response
+from backend.responses import FastJSONResponse
 from common.paths import api_base_url
 from backend.managers.UsersManager import UsersManager
 from backend.managers.CasbinRoleManager import CasbinRoleManager
-from backend.pagination import parse_pagination_params
+from backend.schemas import UserSchema
+from backend.pagination import parse_pagination_params, parse_cursor, next_cursor, estimate_count_requested
 from aiosqlite import IntegrityError
 from functools import wraps
 from connexion.exceptions import Forbidden
-from connexion import context
+from connexion import context, request
 
 def check_permission(action, resourceId="user"):
     def decorator(f):
@@ -31,7 +33,7 @@ class UsersView:
         user = await self.um.retrieve_user(id)
         if user is None:
             return JSONResponse(status_code=404, headers={"error": "User not found"})
-        return JSONResponse(user.model_dump(), status_code=200)
+        return FastJSONResponse(user, status_code=200)
 
     @check_permission("create")
     async def post(self, body: dict):
@@ -52,21 +54,32 @@ class UsersView:
         return Response(status_code=204)
 
     @check_permission("list")
-    async def search(self, filter: str = None, range: str = None, sort: str = None):
+    async def search(self, filter: str = None, range: str = None, sort: str = None, cursor: str = None):
         result = parse_pagination_params(filter, range, sort)
         if isinstance(result, JSONResponse):
             return result
 
         offset, limit, sort_by, sort_order, filters = result
 
-        users, total_count = await self.um.retrieve_users(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters)
-        
-        # Convert Pydantic models to dictionaries
-        users_dict = [user.model_dump() for user in users]
-        
+        after = None
+        if cursor:
+            after = parse_cursor(cursor)
+            if isinstance(after, JSONResponse):
+                return after
+            offset, sort_by, sort_order = after['position'], after['sort_by'], after['sort_order']
+
+        try:
+            users, total_count = await self.um.retrieve_users(limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, filters=filters, after=after,
+                                                              estimate_count=estimate_count_requested(request))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
         headers = {
             'X-Total-Count': str(total_count),
             'Content-Range': f'users {offset}-{offset+len(users)}/{total_count}',
             'Access-Control-Expose-Headers': 'Content-Range'
         }
-        return JSONResponse(users_dict, status_code=200, headers=headers)
+        next_page = next_cursor(users, limit, sort_by, sort_order, offset)
+        if next_page:
+            headers['X-Next-Cursor'] = next_page
+        return FastJSONResponse(users, status_code=200, headers=headers, schema=UserSchema)
@@ -5,13 +5,35 @@ from connexion.resolver import MethodResolver
 from connexion.middleware import MiddlewarePosition
 from starlette.middleware.cors import CORSMiddleware
 from backend.db import init_db
+from backend.queries import check_query_plans
+from backend.validation import get_response_validation, get_sample_rate, validator_map
+from backend.startup import run_pipeline
+from backend.spec_cache import load_spec, prevalidated_spec
 from backend.utils import get_env_key
 
-def create_backend_app():
-    # Initialize the database
-    init_db()
+# Stages that set up managers import them when they run, so importing this
+# module doesn't load them (e.g. Casbin)
+def load_casbin_policy():
+    from backend.managers.CasbinRoleManager import CasbinRoleManager
+    return CasbinRoleManager().enforcer
+
+def load_abilities():
+    from backend.managers.AbilitiesManager import AbilitiesManager
+    return AbilitiesManager().abilities
 
+def create_backend_app():
     apis_dir = Path(__file__).parent.parent / 'apis' / 'paios'
+
+    loaded = run_pipeline([
+        # Initialize the database
+        ('migrations', init_db, []),
+        # Warn if any hot lookup has lost its index
+        ('query plans', check_query_plans, ['migrations']),
+        ('casbin policy', load_casbin_policy, ['migrations']),
+        ('abilities', load_abilities, []),
+        ('openapi spec', lambda: load_spec(apis_dir / 'openapi.yaml'), []),
+    ], name='backend startup')
+
     connexion_app = AsyncApp(__name__, specification_dir=apis_dir)
     
     allow_origins = [
@@ -43,16 +65,19 @@ def create_backend_app():
        allow_credentials=True,
        allow_methods=["GET","POST","PUT","DELETE","PATCH","HEAD","OPTIONS"],
        allow_headers=["Content-Range", "X-Total-Count"],
-       expose_headers=["Content-Range", "X-Total-Count"],
+       expose_headers=["Content-Range", "X-Total-Count", "X-Next-Cursor"],
     )
 
-    # Add API with validation
-    connexion_app.add_api(
-        'openapi.yaml',
-        resolver=MethodResolver('backend.api'),
-        resolver_error=501,
-        # TODO: Validation has a performance impact and may want to be disabled in production
-        validate_responses=True,  # Validate responses against the OpenAPI spec
-        strict_validation=True    # Validate requests strictly against the OpenAPI spec
-    )
+    # Add API with validation (the spec itself was validated by load_spec)
+    response_validation = get_response_validation()
+    with prevalidated_spec():
+        connexion_app.add_api(
+            loaded['openapi spec'],
+            resolver=MethodResolver('backend.api'),
+            resolver_error=501,
+            # Validate responses against the OpenAPI spec, strictly or sampled (see backend.validation)
+            validate_responses=response_validation != 'off',
+            strict_validation=True,   # Validate requests strictly against the OpenAPI spec
+            validator_map=validator_map(response_validation, get_sample_rate())
+        )
     return connexion_app
\ No newline at end of file
@@ -0,0 +1,93 @@
+# Asset free-text search latency: ilike('%q%') scans vs the FTS5 index
+#
+# Usage: python -m backend.benchmarks.bench_asset_search [--rows 10000 100000 1000000] [--repeat 20]
+import argparse
+import asyncio
+import importlib.util
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, event, or_, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from backend.db import SQLModelBase, apply_storage_profile
+from backend.models import Asset
+from backend.managers.AssetsManager import asset_fts, fts_query, search_assets
+from backend.queries import fetch_page
+from common.paths import base_dir
+
+# a few common words plus a long tail of made up ones, so searches are selective like real text
+common = ["open", "source", "personal", "assistant", "privacy", "knowledge", "garden", "recipe"]
+syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "ze", "shi", "dra", "pel", "qua"]
+rare = sorted({"".join(random.Random(i).choices(syllables, k=3)) for i in range(5000)})
+words = common + rare
+queries = ["privacy", "open sou", rare[100], rare[200][:4], f"{rare[300]} {rare[400]}"]
+
+def populate(db_file, rows):
+    engine = create_engine(f"sqlite:///{db_file}")
+    SQLModelBase.metadata.create_all(engine, tables=[Asset.__table__])
+    rng = random.Random(rows)
+    with sqlite3.connect(db_file) as conn:
+        conn.executemany("INSERT INTO asset (id, title, creator, subject, description) VALUES (?, ?, ?, ?, ?)",
+                         ((str(uuid4()), " ".join(rng.sample(words, 3)), f"creator {i % 1000}", rng.choice(words),
+                           " ".join(rng.choices(words, k=12))) for i in range(rows)))
+
+    # create and backfill the index with the real migrations, timing the last
+    # (which rebuilds the index as it's used now)
+    for name in ("added_asset_fts_table", "keyed_asset_fts_on_a_stable_key"):
+        path = next((base_dir / "migrations" / "versions").glob(f"*_{name}.py"))
+        spec = importlib.util.spec_from_file_location(name, path)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade()
+    return time.perf_counter() - start
+
+def ilike_search(query):
+    return select(Asset).filter(or_(
+        Asset.title.ilike(f"%{query}%"),
+        Asset.description.ilike(f"%{query}%"),
+        Asset.creator.ilike(f"%{query}%"),
+        Asset.subject.ilike(f"%{query}%")
+    ))
+
+def fts_search(query):
+    return search_assets(select(Asset), fts_query(query)).order_by(asset_fts.c.rank)
+
+async def measure(db_file, repeat):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    event.listen(engine.sync_engine, "connect", apply_storage_profile)
+    results = {}
+    for name, search in (("ilike", ilike_search), ("fts5", fts_search)):
+        for query in queries:
+            async with AsyncSession(engine) as session:
+                await fetch_page(session, search(query), Asset, 0, 25)  # warm up
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    await fetch_page(session, search(query), Asset, 0, 25)
+                results[(name, query)] = 1000 * (time.perf_counter() - start) / repeat
+    await engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_file = Path(tmp) / f"{rows}.db"
+            indexed = populate(db_file, rows)
+            print(f"{rows:>8} rows indexed in {indexed:.2f} s")
+            for (name, query), ms in asyncio.run(measure(db_file, args.repeat)).items():
+                print(f"{rows:>8} rows {name:>6} {query!r:>20}: {ms:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Asset ingestion throughput: one create per row (as one POST at a time does)
+# vs the bulk create (multi-row INSERT in one transaction)
+#
+# Usage: python -m backend.benchmarks.bench_bulk_create [--rows 5000] [--batch 100 1000 5000]
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from backend.db import DatabaseWriter, SQLModelBase, apply_storage_profile
+from backend.models import Asset
+from backend.queries import bulk_insert
+from backend.schemas import AssetCreateSchema, AssetSchema
+
+def asset_data(i):
+    return AssetCreateSchema(title=f"asset {i}", creator="creator", subject="subject", description="description")
+
+async def run(db_file, rows, batch):
+    SQLModelBase.metadata.create_all(create_engine(f"sqlite:///{db_file}"), tables=[Asset.__table__])
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    event.listen(engine.sync_engine, "connect", apply_storage_profile)
+    writer = DatabaseWriter(session_factory=sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False))
+
+    # the AssetsManager.create_asset unit
+    async def create_one(asset_data):
+        async def write(session):
+            new_asset = Asset(id=str(uuid4()), **asset_data.model_dump())
+            session.add(new_asset)
+            await session.flush()
+            await session.refresh(new_asset)
+            return AssetSchema(id=new_asset.id, **asset_data.model_dump())
+        return await writer.submit(write)
+
+    # the AssetsManager.create_assets unit
+    async def create_many(assets_data):
+        assets = [AssetSchema(id=str(uuid4()), **asset_data.model_dump()) for asset_data in assets_data]
+        async def write(session):
+            await bulk_insert(session, Asset, [asset.model_dump() for asset in assets])
+            return assets
+        return await writer.submit(write)
+
+    data = [asset_data(i) for i in range(rows)]
+    start = time.perf_counter()
+    if batch is None:
+        for asset in data:
+            await create_one(asset)
+    else:
+        for i in range(0, rows, batch):
+            await create_many(data[i:i + batch])
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    await engine.dispose()
+    return rows / elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = asyncio.run(run(Path(tmp) / "per_row.db", args.rows, None))
+        print(f"{'per row':>14}: {baseline:9.1f} rows/s")
+        for batch in args.batch:
+            rate = asyncio.run(run(Path(tmp) / f"bulk_{batch}.db", args.rows, batch))
+            print(f"{f'bulk of {batch}':>14}: {rate:9.1f} rows/s ({rate / baseline:.0f}x)")
+
+if __name__ == "__main__":
+    main()
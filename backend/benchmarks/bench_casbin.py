@@ -0,0 +1,52 @@
+# Cost of a permission check (CasbinRoleManager.check_permissions) as the
+# number of users in the policy grows: casbin's enforce() on every check vs the
+# decision cache, over a stream of random checks (including each user's first,
+# which misses the cache) and once every decision is cached. Each is measured
+# on a freshly built policy, as casbin builds its role links on the first
+# check. Policies are built in memory (the app's model and default rules, plus
+# a role for each user), so the app's database isn't touched.
+#
+# Usage: python -m backend.benchmarks.bench_casbin [--users 100 1000 10000] [--checks 5000]
+import argparse
+import random
+import time
+from casbin import Enforcer
+from backend.managers.CasbinRoleManager import CasbinRoleManager, model_path
+
+actions = ('list', 'show', 'create', 'edit', 'delete')
+
+def build_policy(users):
+    enforcer = Enforcer(model_path)
+    manager = CasbinRoleManager()
+    manager.use_enforcer(enforcer)  # in memory rather than loaded from the database
+    manager.add_default_rules()
+    enforcer.add_named_grouping_policies('g', [[f"user-{i}", "admin" if i % 10 == 0 else "user", "ADMIN_PORTAL"]
+                                               for i in range(users)])
+    manager.invalidate_decisions()
+    return manager
+
+def per_check(check, requests):
+    start = time.perf_counter()
+    for user_id, action in requests:
+        check(user_id, action, "user", "ADMIN_PORTAL")
+    return (time.perf_counter() - start) / len(requests)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--checks', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'enforce us':>11} {'cache us':>9} {'all cached us':>14}")
+    for users in args.users:
+        requests = [(f"user-{random.randrange(users)}", random.choice(actions)) for _ in range(args.checks)]
+        enforcer = build_policy(users).enforcer
+        enforce = per_check(lambda user_id, action, resource, domain: enforcer.enforce(user_id, domain, resource, action),
+                            requests)
+        manager = build_policy(users)
+        cache = per_check(manager.check_permissions, requests)
+        cached = per_check(manager.check_permissions, requests)
+        print(f"{users:>8} {1e6 * enforce:11.2f} {1e6 * cache:9.2f} {1e6 * cached:14.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Write throughput of per-call commits vs the group-committing DatabaseWriter
+#
+# Usage: python -m backend.benchmarks.bench_db_writer [--writes 2000] [--concurrency 1 10 100]
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from backend.db import DatabaseWriter, apply_storage_profile
+
+async def run(db_file, writes, concurrency, group_commit):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    event.listen(engine.sync_engine, "connect", apply_storage_profile)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    writer = DatabaseWriter(session_factory=session_factory)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE asset (id TEXT PRIMARY KEY, title TEXT NOT NULL)"))
+
+    async def write(session):
+        await session.execute(text("INSERT INTO asset VALUES (:id, 'title')"), {"id": str(uuid4())})
+
+    async def per_call_commit():
+        async with session_factory() as session:
+            await write(session)
+            await session.commit()
+
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    async def client():
+        nonlocal errors
+        async with semaphore:
+            try:
+                await (writer.submit(write) if group_commit else per_call_commit())
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(writes)])
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    await engine.dispose()
+    return writes / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            for name, group_commit in (("per-call commit", False), ("group commit", True)):
+                rate, errors = asyncio.run(run(Path(tmp) / f"{uuid4()}.db", args.writes, concurrency, group_commit))
+                print(f"concurrency {concurrency:>4} {name:>16}: {rate:8.1f} writes/s ({errors} errors)")
+
+if __name__ == "__main__":
+    main()
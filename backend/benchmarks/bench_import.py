@@ -0,0 +1,68 @@
+# Streaming NDJSON import: rows/s and peak RSS (which should depend on the
+# batch size, not the upload size) for import_ndjson into a scratch database
+#
+# Usage: python -m backend.benchmarks.bench_import [--rows 1000000] [--batch 1000] [--chunk 65536]
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import resource
+from pathlib import Path
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from backend.bulk import import_ndjson
+from backend.db import DatabaseWriter, SQLModelBase, apply_storage_profile
+from backend.models import Asset
+from backend.queries import bulk_insert
+from backend.schemas import AssetCreateSchema, AssetSchema
+
+# an upload of rows NDJSON lines, delivered in chunk sized pieces like a request body
+async def upload(rows, chunk):
+    buffer = b''
+    for i in range(rows):
+        buffer += (json.dumps({"title": f"asset {i}", "creator": "creator", "subject": "subject",
+                               "description": "description"}) + "\n").encode()
+        if len(buffer) >= chunk:
+            yield buffer[:chunk]
+            buffer = buffer[chunk:]
+    yield buffer
+
+async def run(db_file, rows, batch, chunk):
+    SQLModelBase.metadata.create_all(create_engine(f"sqlite:///{db_file}"), tables=[Asset.__table__])
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    event.listen(engine.sync_engine, "connect", apply_storage_profile)
+    writer = DatabaseWriter(session_factory=sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False))
+
+    # the AssetsManager.create_assets unit
+    async def create_assets(assets_data):
+        assets = [AssetSchema(id=str(uuid4()), **asset_data.model_dump()) for asset_data in assets_data]
+        async def write(session):
+            errors = await bulk_insert(session, Asset, [asset.model_dump() for asset in assets])
+            return [asset if error is None else None for asset, error in zip(assets, errors)]
+        return await writer.submit(write)
+
+    start = time.perf_counter()
+    summary = await import_ndjson(upload(rows, chunk), AssetCreateSchema, create_assets, batch_size=batch)
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    await engine.dispose()
+    return summary, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--chunk', type=int, default=65536)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary, elapsed = asyncio.run(run(Path(tmp) / "import.db", args.rows, args.batch, args.chunk))
+    print(f"imported {summary['imported']} of {summary['received']} rows in {elapsed:.1f}s "
+          f"({summary['imported'] / elapsed:.0f} rows/s), peak RSS "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Startup cost of bringing the database schema up to date when it already is:
+# a full Alembic upgrade vs the init_db fast path (compare alembic_version with
+# the precomputed head). Each run is a fresh interpreter, as on a (re)start.
+#
+# Usage: python -m backend.benchmarks.bench_init_db [--runs 5]
+import argparse
+import statistics
+import subprocess
+import sys
+from common.paths import base_dir
+
+# timed from after importing backend.db (which both pay for) so that importing
+# Alembic counts against the full upgrade
+timed = """
+import time
+from backend.db import init_db, alembic_config
+start = time.perf_counter()
+{}
+print(time.perf_counter() - start)
+"""
+
+def run(code, runs):
+    times = [float(subprocess.run([sys.executable, '-c', timed.format(code)], cwd=base_dir, check=True,
+                                  capture_output=True, text=True).stdout.split()[-1]) for _ in range(runs)]
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    run("init_db()", 1)  # make sure the database is at head
+    full = run("from alembic import command; command.upgrade(alembic_config(), 'head')", args.runs)
+    fast = run("init_db()", args.runs)
+    print(f"alembic upgrade: {1000 * full:7.1f}ms")
+    print(f"fast path:       {1000 * fast:7.1f}ms (saves {1000 * (full - fast):.0f}ms per start)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Time to build a JSON response for a page of --rows models (assets, shares and
+# users), comparing JSONResponse of model_dump() dicts (json.dumps) with
+# FastJSONResponse (backend.responses), with and without the list's schema.
+#
+# Usage: python -m backend.benchmarks.bench_json_responses [--rows 1000] [--repeat 200]
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from starlette.responses import JSONResponse
+from backend.responses import FastJSONResponse
+from backend.schemas import AssetSchema, ShareSchema, UserSchema
+
+def pages(rows):
+    now = datetime.now(timezone.utc)
+    return {
+        'assets': (AssetSchema, [AssetSchema(id=f"{i:08}", title=f"asset {i}", user_id="user", creator="creator",
+                                             subject="subject", description="description " * 10) for i in range(rows)]),
+        'shares': (ShareSchema, [ShareSchema(id=f"{i:08}", resource_id="resource", user_id=None,
+                                             expiration_dt=now + timedelta(days=i)) for i in range(rows)]),
+        'users': (UserSchema, [UserSchema(id=f"{i:08}", name=f"user {i}", email=f"user{i}@example.com", role="user")
+                               for i in range(rows)]),
+    }
+
+def timed(build, repeat):
+    build()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'page':<8} {'model_dump ms':>14} {'fast ms':>8} {'schema ms':>10} {'speedup':>8}")
+    for name, (schema, models) in pages(args.rows).items():
+        baseline = timed(lambda: JSONResponse([model.model_dump() for model in models]), args.repeat)
+        fast = timed(lambda: FastJSONResponse(models), args.repeat)
+        with_schema = timed(lambda: FastJSONResponse(models, schema=schema), args.repeat)
+        print(f"{name:<8} {1000 * baseline:14.2f} {1000 * fast:8.2f} {1000 * with_schema:10.2f} {baseline / with_schema:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# List latency of page + separate count vs fetch_page (one statement) vs estimated count
+#
+# Usage: python -m backend.benchmarks.bench_list_count [--rows 10000 100000 1000000] [--repeat 20]
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from backend.db import SQLModelBase, apply_storage_profile
+from backend.models import Asset
+from backend.pagination import apply_sort
+from backend.queries import fetch_page
+
+def populate(db_file, rows):
+    SQLModelBase.metadata.create_all(create_engine(f"sqlite:///{db_file}"), tables=[Asset.__table__])
+    with sqlite3.connect(db_file) as conn:
+        conn.executemany("INSERT INTO asset (id, title, creator, subject, description) VALUES (?, ?, ?, ?, ?)",
+                         ((str(uuid4()), f"asset {i}", f"creator {i % 100}", "subject", "description") for i in range(rows)))
+
+async def two_queries(session, stmt):
+    rows = (await session.execute(apply_sort(stmt, Asset, 'title', 'asc').offset(0).limit(100))).scalars().all()
+    count_stmt = select(func.count()).select_from(Asset)
+    if stmt.whereclause is not None:
+        count_stmt = count_stmt.filter(stmt.whereclause)
+    return rows, (await session.execute(count_stmt)).scalar()
+
+async def single_statement(session, stmt):
+    return await fetch_page(session, stmt, Asset, 0, 100, 'title', 'asc')
+
+async def estimated_count(session, stmt):
+    return await fetch_page(session, stmt, Asset, 0, 100, 'title', 'asc', estimate_count=True)
+
+async def measure(db_file, repeat):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    event.listen(engine.sync_engine, "connect", apply_storage_profile)
+    results = {}
+    for filtered in (False, True):
+        stmt = select(Asset).filter(Asset.creator == 'creator 7') if filtered else select(Asset)
+        for name, strategy in (("page + count", two_queries), ("fetch_page", single_statement), ("estimate", estimated_count)):
+            async with AsyncSession(engine) as session:
+                await strategy(session, stmt)  # warm up
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    await strategy(session, stmt)
+                results[(filtered, name)] = 1000 * (time.perf_counter() - start) / repeat
+    await engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_file = Path(tmp) / f"{rows}.db"
+            populate(db_file, rows)
+            for (filtered, name), ms in asyncio.run(measure(db_file, args.repeat)).items():
+                print(f"{rows:>8} rows {'filtered' if filtered else 'all':>8} {name:>14}: {ms:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# p50/p99 latency of an unrelated endpoint (listing assets) during a storm of
+# WebAuthn logins, with the login cryptography (see backend.crypto_pool) run
+# inline on the event loop, in a thread pool and in a process pool, through the
+# full app in-process. Logins and probes share the app's event loop, as they
+# would with one uvicorn worker. Seeds a user with a credential (an ECDSA P-256
+# key made up here, so responses are signed as a real authenticator would)
+# in the app's database, removed afterwards.
+#
+# Usage: python -m backend.benchmarks.bench_login_storm [--logins 200] [--concurrency 50] [--workers 4]
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import cbor2
+import httpx
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from sqlalchemy import delete
+from backend.crypto_pool import crypto_pool
+from backend.db import db_write
+from backend.managers.AuthManager import generate_jwt
+from backend.models import Cred, User
+from common.utils import get_env_key
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).decode("utf-8").rstrip("=")
+
+# An authenticator's response to a login challenge, signed with key
+def authentication_response(key, credential_id, challenge, origin, rp_id):
+    authenticator_data = hashlib.sha256(rp_id.encode()).digest() + bytes([0x05]) + (2).to_bytes(4, 'big')  # user present and verified
+    client_data = json.dumps({"type": "webauthn.get", "challenge": b64url(challenge), "origin": origin}).encode()
+    signature = key.sign(authenticator_data + hashlib.sha256(client_data).digest(), ec.ECDSA(hashes.SHA256()))
+    return {"id": b64url(credential_id), "rawId": b64url(credential_id), "type": "public-key",
+            "response": {"authenticatorData": b64url(authenticator_data), "clientDataJSON": b64url(client_data),
+                         "signature": b64url(signature), "userHandle": None}}
+
+def cose_public_key(key):
+    numbers = key.public_key().public_numbers()
+    return cbor2.dumps({1: 2, 3: -7, -1: 1, -2: numbers.x.to_bytes(32, 'big'), -3: numbers.y.to_bytes(32, 'big')})
+
+async def seed(marker, key, credential_id):
+    async def write(session):
+        session.add(User(id=marker, webauthn_user_id=marker, name=marker, email=f"{marker}@example.com", emailVerified=True))
+        session.add(Cred(id=b64url(credential_id), public_key=b64url(cose_public_key(key)), webauthn_user_id=marker,
+                         backed_up="0", name=marker, transports="[]"))
+    await db_write(write)
+
+async def unseed(marker):
+    async def write(session):
+        await session.execute(delete(Cred).where(Cred.webauthn_user_id == marker))
+        await session.execute(delete(User).where(User.id == marker))
+    await db_write(write)
+
+def percentile(samples, p):
+    return statistics.quantiles(samples, n=100)[p - 1]
+
+async def storm(client, marker, response, challenge, probe_url, headers, logins, concurrency):
+    body = {"email": f"{marker}@example.com", "auth_resp": response}
+    cookie = {"Cookie": f"challenge={b64url(challenge)}"}
+    remaining = logins
+
+    async def log_in():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            assert (await client.post('/api/v1/auth/webauthn/login', json=body, headers=cookie)).status_code == 200
+
+    probes = []
+    async def probe():
+        while remaining > 0:
+            start = time.perf_counter()
+            await client.get(probe_url, headers=headers)
+            probes.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(probe(), *[log_in() for _ in range(concurrency)])
+    return probes, logins / (time.perf_counter() - start)
+
+async def run(args):
+    from app import create_app
+    app = create_app()
+    marker = str(uuid4())
+    key = ec.generate_private_key(ec.SECP256R1())
+    credential_id = os.urandom(16)
+    challenge = os.urandom(32)
+    host = get_env_key('PAIOS_HOST', 'localhost')
+    response = authentication_response(key, credential_id, challenge, f"https://{host}:{get_env_key('PAIOS_PORT', '8443')}", host)
+    now = datetime.now(timezone.utc)
+    headers = {"Authorization": "Bearer " + generate_jwt({"sub": marker, "role": "admin", "iat": now, "exp": now + timedelta(hours=1)})}
+    probe_url = f'/api/v1/assets?filter={json.dumps({"creator": marker})}&range=[0,9]'
+
+    await seed(marker, key, credential_id)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='https://localhost') as client:
+            baseline = []
+            for _ in range(200):
+                start = time.perf_counter()
+                assert (await client.get(probe_url, headers=headers)).status_code == 200
+                baseline.append(time.perf_counter() - start)
+            print(f"{'pool':<8} {'workers':>7} {'logins/s':>9} {'probe p50 ms':>13} {'probe p99 ms':>13} {'max queued':>11}")
+            print(f"{'idle':<8} {'':>7} {'':>9} {1000 * percentile(baseline, 50):13.2f} {1000 * percentile(baseline, 99):13.2f}")
+            for kind, workers in (('inline', 0), ('thread', args.workers), ('process', args.workers)):
+                crypto_pool.configure('thread' if kind == 'inline' else kind, workers)
+                await storm(client, marker, response, challenge, probe_url, headers, args.concurrency, args.concurrency)  # warm up
+                crypto_pool.configure(crypto_pool.kind, workers)  # resets the metrics, keeping the workers
+                probes, rate = await storm(client, marker, response, challenge, probe_url, headers, args.logins, args.concurrency)
+                print(f"{kind:<8} {workers:>7} {rate:9.0f} {1000 * percentile(probes, 50):13.2f} "
+                      f"{1000 * percentile(probes, 99):13.2f} {crypto_pool.snapshot()['max_queued']:>11}")
+    finally:
+        crypto_pool.configure('thread', 0)
+        await unseed(marker)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
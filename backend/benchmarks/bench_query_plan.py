@@ -0,0 +1,59 @@
+# Per-request CPU of building list statements from scratch vs cached query plans
+#
+# "build" is parsing the filters and constructing the page statement and
+# "cache key" is generating the key SQLAlchemy looks the compiled statement up
+# by on each execution (memoized on a statement, so free for a cached one).
+# "compile" is a full compile, which SQLAlchemy's compiled cache saves after
+# the first execution of each cache key, for reference.
+#
+# Usage: python -m backend.benchmarks.bench_query_plan [--number 5000]
+import argparse
+import timeit
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from backend.models import Share
+from backend.managers.SharesManager import shares_plan
+from backend.queries import page_statement
+
+dialect = sqlite.dialect()
+
+cases = {
+    "unfiltered": {},
+    "eq": {"resource_id": "resource-id"},
+    "eq + in + range": {"resource_id": "resource-id", "user_id": ["a", "b", "c"],
+                        "expiration_dt_gte": "2024-01-01T00:00:00+00:00"},
+}
+
+# what the managers used to do on every request
+def from_scratch(filters, sort_by='expiration_dt', sort_order='asc'):
+    stmt = select(Share)
+    for key, value in filters.items():
+        if key.endswith('_gte'):
+            stmt = stmt.filter(getattr(Share, key[:-4]) >= value)
+        elif isinstance(value, list):
+            stmt = stmt.filter(getattr(Share, key).in_(value))
+        else:
+            stmt = stmt.filter(getattr(Share, key) == value)
+    return page_statement(stmt, Share, 0, 100, sort_by, sort_order)
+
+def from_plan(filters, sort_by='expiration_dt', sort_order='asc'):
+    shape, params = shares_plan.parse_filters(filters)
+    return shares_plan.page(shape, sort_by, sort_order, None, False)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=5000)
+    args = parser.parse_args()
+
+    for case, filters in cases.items():
+        for name, build in (("from scratch", from_scratch), ("query plan", from_plan)):
+            build(filters)  # warm up (and fill the plan cache)
+            us = lambda f: 1e6 * timeit.timeit(f, number=args.number) / args.number
+            build_us = us(lambda: build(filters))
+            key_us = max(us(lambda: build(filters)._generate_cache_key()) - build_us, 0.0)
+            print(f"{case:>16} {name:>13}: build {build_us:7.1f} us  cache key {key_us:6.1f} us")
+        compile_us = us(lambda: from_scratch(filters).compile(dialect=dialect)) - us(lambda: from_scratch(filters))
+        print(f"{case:>16} {'(compile)':>13}: {compile_us:7.1f} us")
+
+if __name__ == "__main__":
+    main()
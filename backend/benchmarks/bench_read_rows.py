@@ -0,0 +1,71 @@
+# CPU time to read a page of --rows assets into schemas: ORM entities validated
+# into AssetSchema field by field (what the managers used to do) vs a select of
+# the columns with schemas built by from_row, with and without validation
+# (PAIOS_VALIDATE_ROWS). Seeds --rows assets (removed afterwards) in the app's
+# database.
+#
+# Usage: python -m backend.benchmarks.bench_read_rows [--rows 1000] [--repeat 50]
+import argparse
+import asyncio
+import statistics
+import time
+from unittest import mock
+from uuid import uuid4
+from sqlalchemy import select
+from backend import queries
+from backend.db import db_read_context
+from backend.managers.AssetsManager import AssetsManager, assets_plan
+from backend.models import Asset
+from backend.queries import fetch_page, from_row
+from backend.schemas import AssetCreateSchema, AssetSchema
+
+async def orm_validated(session, marker, rows):
+    page, _ = await fetch_page(session, select(Asset).filter(Asset.creator == marker), Asset, 0, rows)
+    # rows of (Asset, total_count)
+    assets = [AssetSchema(id=asset.id, title=asset.title, user_id=asset.user_id, creator=asset.creator,
+                          subject=asset.subject, description=asset.description) for asset, _ in page]
+    session.expunge_all()
+    return assets
+
+async def columns_from_row(session, marker, rows):
+    page, _ = await assets_plan.fetch_page(session, {'creator': marker}, 0, rows)
+    return [from_row(AssetSchema, asset) for asset in page]
+
+async def columns_validated(session, marker, rows):
+    with mock.patch.object(queries, 'validate_rows', True):
+        return await columns_from_row(session, marker, rows)
+
+async def timed(strategy, marker, rows, repeat):
+    async with db_read_context() as session:
+        assert len(await strategy(session, marker, rows)) == rows  # warm up
+        wall, cpu = [], []
+        for _ in range(repeat):
+            started, started_cpu = time.perf_counter(), time.process_time()
+            await strategy(session, marker, rows)
+            wall.append(time.perf_counter() - started)
+            cpu.append(time.process_time() - started_cpu)
+    return statistics.median(wall), statistics.median(cpu)
+
+async def run(rows, repeat):
+    marker = str(uuid4())
+    assets = await AssetsManager().create_assets([AssetCreateSchema(title=f"asset {i}", user_id=marker, creator=marker,
+                                                                    subject="subject", description="description " * 10)
+                                                  for i in range(rows)])
+    try:
+        print(f"{'strategy':<20} {'wall ms':>8} {'cpu ms':>8}")
+        for name, strategy in (("orm + validation", orm_validated), ("columns + validation", columns_validated),
+                               ("columns + from_row", columns_from_row)):
+            wall, cpu = await timed(strategy, marker, rows, repeat)
+            print(f"{name:<20} {1000 * wall:8.2f} {1000 * cpu:8.2f}")
+    finally:
+        await AssetsManager().delete_assets([asset.id for asset in assets])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+if __name__ == "__main__":
+    main()
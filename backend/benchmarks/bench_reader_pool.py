@@ -0,0 +1,49 @@
+# Read throughput and reader pool checkout waits (reader_pool_metrics) as the
+# number of concurrent readers grows past the pool (PAIOS_DB_READERS plus the
+# pool's overflow), each reading a page of assets as the list endpoint does
+# from the app's database.
+#
+# Usage: python -m backend.benchmarks.bench_reader_pool [--reads 2000] [--concurrency 1 8 32 128]
+import argparse
+import asyncio
+import logging
+import time
+from backend.db import reader_engine, reader_pool_metrics
+from backend.managers.AssetsManager import AssetsManager
+
+async def run(reads, concurrency):
+    manager = AssetsManager()
+    remaining = reads
+
+    async def reader():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await manager.retrieve_assets(limit=25, sort_by='title')
+
+    await asyncio.gather(*[reader() for _ in range(concurrency)])  # warm up, opening connections
+    remaining = reads
+    reader_pool_metrics.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*[reader() for _ in range(concurrency)])
+    return reads / (time.perf_counter() - start), reader_pool_metrics.snapshot()
+
+async def run_all(args):
+    pool = reader_engine.pool
+    print(f"reader pool: {pool.size()} connections + {pool._max_overflow} overflow")
+    print(f"{'readers':>7} {'reads/s':>8} {'avg wait ms':>12} {'max wait ms':>12} {'slow':>6}")
+    for concurrency in args.concurrency:
+        rate, snapshot = await run(args.reads, concurrency)
+        print(f"{concurrency:>7} {rate:8.0f} {snapshot['avg_wait_ms']:12.3f} {snapshot['max_wait_ms']:12.3f} "
+              f"{snapshot['slow_checkouts']:>6}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # slow checkouts are expected here
+    asyncio.run(run_all(args))
+
+if __name__ == "__main__":
+    main()
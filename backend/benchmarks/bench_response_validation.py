@@ -0,0 +1,85 @@
+# p50/p99 latency of list endpoints in each response validation mode (strict,
+# sampled and off, see backend.validation), through the full app in-process.
+# Seeds each list with --rows rows (removed afterwards) in the app's database.
+#
+# Usage: python -m backend.benchmarks.bench_response_validation [--rows 100] [--requests 500] [--sample-rate 0.01]
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from starlette.testclient import TestClient
+from backend.managers.AssetsManager import AssetsManager
+from backend.managers.AuthManager import generate_jwt
+from backend.managers.ResourcesManager import ResourcesManager
+from backend.managers.SharesManager import SharesManager
+from backend.schemas import AssetCreateSchema, ChannelCreateSchema, ShareCreateSchema
+
+async def seed(rows, marker):
+    assets = await AssetsManager().create_assets([AssetCreateSchema(title=f"asset {i}", user_id=marker, creator=marker,
+                                                                    subject="subject", description="description")
+                                                  for i in range(rows)])
+    resources = await ResourcesManager().create_resources([ChannelCreateSchema(name=f"{marker} {i}", uri="https://example.com")
+                                                           for i in range(rows)])
+    shares = await SharesManager().create_shares([ShareCreateSchema(resource_id=marker, user_id=marker,
+                                                                    expiration_dt=datetime.now(timezone.utc) + timedelta(days=1))
+                                                  for _ in range(rows)])
+    return assets, resources, shares
+
+async def unseed(assets, resources, shares):
+    await AssetsManager().delete_assets([asset.id for asset in assets])
+    await ResourcesManager().delete_resources([resource.id for resource in resources])
+    await SharesManager().delete_shares([share.id for share in shares])
+
+def percentile(samples, p):
+    return statistics.quantiles(samples, n=100)[p - 1]
+
+def run(mode, sample_rate, endpoints, headers, requests):
+    os.environ['PAIOS_RESPONSE_VALIDATION'] = mode
+    os.environ['PAIOS_RESPONSE_VALIDATION_SAMPLE_RATE'] = str(sample_rate)
+    from app import create_app
+    results = {}
+    with TestClient(create_app()) as client:
+        for name, url in endpoints.items():
+            for _ in range(20):  # warm up
+                assert client.get(url, headers=headers).status_code == 200
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                client.get(url, headers=headers)
+                samples.append(time.perf_counter() - start)
+            results[name] = (percentile(samples, 50), percentile(samples, 99))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    marker = str(uuid4())
+    seeded = asyncio.run(seed(args.rows, marker))
+    page = f"range=[0,{args.rows - 1}]"
+    endpoints = {
+        'assets': f'/api/v1/assets?filter={json.dumps({"creator": marker})}&{page}',
+        'resources': f'/api/v1/resources?filter={json.dumps({"name_prefix": marker})}&{page}',
+        'shares': f'/api/v1/shares?filter={json.dumps({"resource_id": marker})}&{page}',
+    }
+    now = datetime.now(timezone.utc)
+    headers = {"Authorization": "Bearer " + generate_jwt({"sub": marker, "role": "admin", "iat": now, "exp": now + timedelta(hours=1)})}
+    try:
+        print(f"{'mode':<8} {'endpoint':<10} {'p50 ms':>8} {'p99 ms':>8}")
+        for mode in ('strict', 'sampled', 'off'):
+            for name, (p50, p99) in run(mode, args.sample_rate, endpoints, headers, args.requests).items():
+                print(f"{mode:<8} {name:<10} {1000 * p50:8.2f} {1000 * p99:8.2f}")
+    finally:
+        asyncio.run(unseed(*seeded))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Mixed read/write throughput of the SQLite storage profile vs SQLite defaults
+#
+# Usage: python -m backend.benchmarks.bench_storage_profile [--seconds 5] [--readers 8] [--writers 2]
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.db import apply_storage_profile, get_storage_profile
+
+async def run_workload(db_file, profile, seconds, readers, writers):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}", pool_size=readers + writers)
+    if profile:
+        event.listen(engine.sync_engine, "connect", lambda conn, rec: apply_storage_profile(conn, rec, profile))
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE asset (id TEXT PRIMARY KEY, title TEXT NOT NULL, description TEXT)"))
+        for i in range(1000):
+            await conn.execute(text("INSERT INTO asset VALUES (:id, :title, :description)"),
+                               {"id": str(uuid4()), "title": f"asset {i}", "description": "x" * 200})
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT id, title FROM asset ORDER BY title LIMIT 100 OFFSET 500"))
+                counts["reads"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    async def writer():
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(text("INSERT INTO asset VALUES (:id, 'new', NULL)"), {"id": str(uuid4())})
+                counts["writes"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    await asyncio.gather(*[reader() for _ in range(readers)], *[writer() for _ in range(writers)])
+    await engine.dispose()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profile in (("sqlite defaults", None), ("storage profile", get_storage_profile())):
+            db_file = Path(tmp) / f"{uuid4()}.db"
+            counts = asyncio.run(run_workload(db_file, profile, args.seconds, args.readers, args.writers))
+            print(f"{name:>16}: {counts['reads'] / args.seconds:8.1f} reads/s "
+                  f"{counts['writes'] / args.seconds:8.1f} writes/s "
+                  f"({counts['errors']} errors)")
+
+if __name__ == "__main__":
+    main()
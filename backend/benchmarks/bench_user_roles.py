@@ -0,0 +1,47 @@
+# Cost of resolving the roles of a page of users (as UsersManager.retrieve_users
+# does) as the number of users in the policy grows: asking casbin's role manager
+# for each user in turn (the first page after loading the policy, when casbin
+# builds its role links, and after that) vs CasbinRoleManager.get_users_roles
+# (when its index of the grouping policy has to be built, i.e. the first page
+# after the policy changes, and when it's already built). Policies are built in
+# memory (see bench_casbin), so the app's database isn't touched.
+#
+# Usage: python -m backend.benchmarks.bench_user_roles [--users 1000 10000] [--page 1000] [--repeat 20]
+import argparse
+import time
+from backend.benchmarks.bench_casbin import build_policy
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'page':>6} {'per user first ms':>18} {'per user ms':>12} {'index build ms':>15} {'indexed ms':>11}")
+    for users in args.users:
+        manager = build_policy(users)
+        page = [f"user-{i}" for i in range(min(args.page, users))]
+        enforcer = manager.enforcer
+        def per_user_roles():
+            return [",".join(enforcer.get_roles_for_user_in_domain(user_id, "ADMIN_PORTAL")) for user_id in page]
+        first = best_of(1, per_user_roles)
+        per_user = best_of(args.repeat, per_user_roles)
+
+        def rebuilt():
+            manager.invalidate_decisions()
+            manager.get_users_roles(page, "ADMIN_PORTAL")
+        build = best_of(args.repeat, rebuilt)
+        indexed = best_of(args.repeat, lambda: manager.get_users_roles(page, "ADMIN_PORTAL"))
+        print(f"{users:>8} {len(page):>6} {1000 * first:18.2f} {1000 * per_user:12.2f} {1000 * build:15.2f} {1000 * indexed:11.2f}")
+
+if __name__ == "__main__":
+    main()
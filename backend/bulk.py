@@ -0,0 +1,192 @@
+# helpers for the bulk create/update/delete and export endpoints
+import io
+import os
+import csv
+import json
+import logging
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from connexion.validators import AbstractRequestBodyValidator, AbstractResponseBodyValidator
+
+logger = logging.getLogger(__name__)
+
+bulk_max_items = int(os.environ.get('PAIOS_BULK_MAX_ITEMS', 10000))
+
+# NDJSON bodies are parsed and validated line by line by the views, so connexion
+# passes them through untouched (its JSON validator would match */*json)
+class NDJSONRequestBodyValidator(AbstractRequestBodyValidator):
+    async def wrap_receive(self, receive, *, scope):
+        return receive, scope
+
+# Likewise for streamed NDJSON responses, which response validation would otherwise buffer in memory
+class NDJSONResponseBodyValidator(AbstractResponseBodyValidator):
+    def wrap_send(self, send):
+        return send
+
+# Bulk endpoints accept a JSON array or NDJSON (one JSON document per line).
+# Returns a list with the parsed item, or the error message for an item that
+# can't be parsed (so the rest of the request still goes through).
+def parse_bulk_body(body):
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode('utf-8')
+    if isinstance(body, str):
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(f"Invalid JSON: {e}")
+        body = items
+    if not isinstance(body, list):
+        raise ValueError("Body must be a JSON array or NDJSON")
+    if len(body) > bulk_max_items:
+        raise ValueError(f"Too many items (at most {bulk_max_items} per request)")
+    return body
+
+# Validates each parsed item against schema, returning the schema instance or
+# an error message
+def validate_bulk_items(items, schema):
+    validated = []
+    for item in items:
+        if isinstance(item, str):
+            validated.append(item)
+            continue
+        try:
+            validated.append(schema.model_validate(item))
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            validated.append(f"Invalid item: {'.'.join(map(str, error['loc']))}: {error['msg']}")
+    return validated
+
+# Per-item result of a bulk request, in the same order as the request
+def bulk_result(status, id=None, error=None):
+    result = {'status': status}
+    if id is not None:
+        result['id'] = id
+    if error is not None:
+        result['error'] = error
+    return result
+
+# Items that passed validation, i.e. what to hand to the manager
+def valid_items(items):
+    return [item for item in items if not isinstance(item, str)]
+
+# Merges the manager's outcomes for the valid items (the created or updated
+# object, or None if it failed) back in with the invalid items' errors
+def bulk_results(items, outcomes, status, failed_status, failed_error):
+    outcomes = iter(outcomes)
+    results = []
+    for item in items:
+        if isinstance(item, str):
+            results.append(bulk_result(400, error=item))
+            continue
+        outcome = next(outcomes)
+        id = getattr(outcome or item, 'id', None)
+        if outcome is None:
+            results.append(bulk_result(failed_status, id=id, error=failed_error))
+        else:
+            results.append(bulk_result(status, id=id))
+    return results
+
+# Streams items (pydantic models, from an async iterator) as NDJSON or CSV,
+# encoding rows in chunks so a large export needs constant memory
+export_formats = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+export_chunk_size = 500
+
+def export_response(name, items, schema, format='ndjson'):
+    fields = ['id'] + [field for field in schema.model_fields if field != 'id']
+
+    async def ndjson():
+        lines = []
+        async for item in items:
+            lines.append(item.model_dump_json())
+            if len(lines) >= export_chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        rows = 0
+        async for item in items:
+            writer.writerow(item.model_dump(mode='json'))
+            rows += 1
+            if rows % export_chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return StreamingResponse(ndjson() if format == 'ndjson' else csv_rows(), media_type=export_formats[format],
+                             headers={'Content-Disposition': f'attachment; filename="{name}.{format}"'})
+
+# Imports NDJSON from an async stream of bytes (e.g. the request body) without
+# holding it in memory: lines are parsed and validated against schema as they
+# arrive and handed to create (a manager's bulk create) in batches of
+# batch_size. Awaiting each batch before reading on applies backpressure to the
+# upload. Each batch is its own transaction, so rows before a failure stay
+# imported. Returns a summary with the first max_errors per-line errors.
+import_batch_size = int(os.environ.get('PAIOS_IMPORT_BATCH_SIZE', 1000))
+import_max_line = 1024 * 1024
+
+async def import_ndjson(stream, schema, create, batch_size=import_batch_size, max_errors=100):
+    summary = {'received': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    batch, lines = [], []
+
+    def fail(line, error):
+        summary['failed'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'line': line, 'error': error})
+
+    async def flush():
+        created = await create([item for _, item in batch])
+        for (line, _), outcome in zip(batch, created):
+            if outcome is None:
+                fail(line, f"{schema.__name__} could not be created")
+            else:
+                summary['imported'] += 1
+        batch.clear()
+        logger.debug(f"Imported {summary['imported']} of {summary['received']} rows")
+
+    # errors are reported by line number in the upload, counting blank lines
+    line_number = 0
+
+    async def add(line):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        summary['received'] += 1
+        # a line that isn't UTF-8 or JSON fails on its own, like an invalid item
+        try:
+            item = json.loads(line.decode('utf-8'))
+        except UnicodeDecodeError as e:
+            fail(line_number, f"Invalid UTF-8: {e}")
+            return
+        except ValueError as e:
+            fail(line_number, f"Invalid JSON: {e}")
+            return
+        item, = validate_bulk_items([item], schema)
+        if isinstance(item, str):
+            fail(line_number, item)
+            return
+        batch.append((line_number, item))
+        if len(batch) >= batch_size:
+            await flush()
+
+    remainder = b''
+    async for chunk in stream:
+        *lines, remainder = (remainder + chunk).split(b'\n')
+        if len(remainder) > import_max_line:
+            raise ValueError(f"Line {line_number + len(lines) + 1} is longer than {import_max_line} bytes")
+        for line in lines:
+            await add(line)
+    await add(remainder)
+    if batch:
+        await flush()
+    return summary
@@ -0,0 +1,40 @@
+# Async Casbin adapter: persists policy changes without blocking the event
+# loop. It wraps the synchronous casbin_sqlalchemy_adapter.Adapter (which shares
+# the app's SQLite storage profile via create_sync_engine) and runs its I/O on a
+# dedicated thread, so a write waiting on the database lock (e.g. behind the
+# app's writer) waits there rather than on the loop. Changes are saved
+# incrementally (a row per rule added or removed) rather than by rewriting the
+# whole policy. There's a single thread, so changes are saved in the order
+# they're made.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from casbin.persist.adapters.asyncio import AsyncAdapter, AsyncBatchAdapter
+
+class AsyncPolicyAdapter(AsyncAdapter, AsyncBatchAdapter):
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='casbin-adapter')
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def load_policy(self, model):
+        return await self._run(self.adapter.load_policy, model)
+
+    async def save_policy(self, model):
+        return await self._run(self.adapter.save_policy, model)
+
+    async def add_policy(self, sec, ptype, rule):
+        return await self._run(self.adapter.add_policy, sec, ptype, rule)
+
+    async def add_policies(self, sec, ptype, rules):
+        return await self._run(self.adapter.add_policies, sec, ptype, rules)
+
+    async def remove_policy(self, sec, ptype, rule):
+        return await self._run(self.adapter.remove_policy, sec, ptype, rule)
+
+    async def remove_policies(self, sec, ptype, rules):
+        return await self._run(self.adapter.remove_policies, sec, ptype, rules)
+
+    async def remove_filtered_policy(self, sec, ptype, field_index, *field_values):
+        return await self._run(self.adapter.remove_filtered_policy, sec, ptype, field_index, *field_values)
@@ -0,0 +1,103 @@
+# Worker pool for the CPU-bound cryptography done while signing up and in
+# (verifying WebAuthn registration and authentication responses, signing
+# JWTs), so a burst of logins doesn't stall every other request on the event
+# loop. PAIOS_CRYPTO_POOL picks threads (the default, cheapest per call) or
+# processes (which also take the CBOR parsing and the rest of the Python off
+# the loop's GIL, at the cost of pickling each call), and PAIOS_CRYPTO_WORKERS
+# how many; 0 runs calls inline on the loop. By default there's a worker for
+# each core beyond the loop's (up to 4), so none with a single core, where a
+# pool only competes with the loop for it (bench_login_storm: an unrelated
+# endpoint's p99 went from ~65ms to ~140ms during a storm). Calls beyond the
+# number of workers queue, and how deep the queue gets is kept in the metrics
+# (see snapshot).
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+crypto_pool_kind = os.environ.get('PAIOS_CRYPTO_POOL', 'thread')
+crypto_workers = int(os.environ.get('PAIOS_CRYPTO_WORKERS', min(4, (os.cpu_count() or 1) - 1)))
+
+# Runs in the worker. Times are monotonic, which is system wide, so a worker
+# process's times compare with the loop's.
+def _timed(function, args, kwargs):
+    started = time.monotonic()
+    result = function(*args, **kwargs)
+    return result, started, time.monotonic()
+
+class CryptoPool:
+    def __init__(self, kind=crypto_pool_kind, workers=crypto_workers):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(kind, workers)
+
+    # Replaces the pool if kind or workers changed (which benchmarks use to
+    # compare pools; calls already running finish on the old one) and resets
+    # the metrics
+    def configure(self, kind, workers):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Invalid crypto pool kind: {kind} (expected thread or process)")
+        if workers < 0:
+            raise ValueError(f"Invalid number of crypto workers: {workers}")
+        with self._lock:
+            if self._executor is not None and (kind, workers) != (self.kind, self.workers):
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.kind = kind
+            self.workers = workers
+        self.calls = 0
+        self.pending = 0  # submitted and not yet finished, i.e. running or queued
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    # Workers are started on first use rather than at startup
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == 'process':
+                        # spawn rather than fork, as the app has threads (e.g. aiosqlite's)
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                             mp_context=multiprocessing.get_context('spawn'))
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crypto')
+        return self._executor
+
+    # Runs function(*args, **kwargs) in the pool. With processes, function and
+    # its arguments and result must be picklable.
+    async def run(self, function, *args, **kwargs):
+        if self.workers == 0:
+            return function(*args, **kwargs)
+        submitted = time.monotonic()
+        future = self._get_executor().submit(_timed, function, args, kwargs)
+        self.pending += 1
+        self.max_queued = max(self.max_queued, self.pending - self.workers)
+        try:
+            result, started, finished = await asyncio.wrap_future(future)
+        finally:
+            self.pending -= 1
+        self.calls += 1
+        wait = started - submitted
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += finished - started
+        return result
+
+    def snapshot(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "calls": self.calls,
+            "running": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "max_queued": self.max_queued,
+            "avg_wait_ms": 1000 * self.total_wait / self.calls if self.calls else 0.0,
+            "max_wait_ms": 1000 * self.max_wait,
+            "avg_run_ms": 1000 * self.total_run / self.calls if self.calls else 0.0,
+        }
+
+crypto_pool = CryptoPool()
@@ -1,11 +1,15 @@
 # database helper functions
 import os
+import re
+import time
+import asyncio
 import logging
+import sqlite3
+import threading
 from sqlmodel import SQLModel
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from alembic import command
-from alembic.config import Config as AlembicConfig
 from common.paths import base_dir, db_path, db_url
 from contextlib import asynccontextmanager
 
@@ -15,8 +19,119 @@ logger = logging.getLogger(__name__)
 class SQLModelBase(SQLModel):
     pass
 
+# SQLite storage profile applied to every pooled connection. Each pragma can be
+# overridden with an environment variable, e.g. PAIOS_DB_SYNCHRONOUS=FULL
+# or PAIOS_DB_MMAP_SIZE=0 to disable memory-mapped I/O.
+storage_profile = {
+    'journal_mode': 'WAL',      # readers don't block the writer (and vice versa)
+    'synchronous': 'NORMAL',    # fsync on checkpoint rather than every commit (safe with WAL)
+    'mmap_size': 268435456,     # 256MiB of memory-mapped reads
+    'cache_size': -65536,       # negative values are KiB, so 64MiB of page cache
+    'busy_timeout': 5000,       # wait up to 5s for a lock rather than failing with "database is locked"
+    'temp_store': 'MEMORY',     # temporary tables and indices (e.g. sorts) stay in memory
+}
+
+_pragma_value_pattern = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+def get_storage_profile():
+    profile = {}
+    for pragma, default in storage_profile.items():
+        value = str(os.environ.get(f'PAIOS_DB_{pragma.upper()}', default))
+        if not _pragma_value_pattern.match(value):
+            raise ValueError(f"Invalid value for PAIOS_DB_{pragma.upper()}: {value}")
+        profile[pragma] = value
+    return profile
+
+def apply_storage_profile(dbapi_connection, connection_record=None, profile=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in (profile or get_storage_profile()).items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+# Versions of tables, so callers can tell whether a table has changed (e.g. for
+# ETags) without querying it. They're kept in the database, in table_version,
+# and bumped by triggers on each versioned table (see the migration that added
+# it) in the same transaction as the write, so writes from any connection or
+# process count (other app workers, the Casbin adapter's engine, the sqlite3
+# shell) and a version is never visible before the data it's for. They're read
+# on a connection kept for the purpose, and only re-read when its PRAGMA
+# data_version shows another connection has committed since. A table without
+# triggers has no version, and asking for one raises ValueError.
+class TableVersions:
+    def __init__(self, path=db_path):
+        self.path = path
+        self.versions = {}
+        self._data_version = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            # used by whichever thread holds the lock
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._connection
+
+    def version(self, *tables):
+        with self._lock:
+            connection = self._connect()
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self.versions = dict(connection.execute("SELECT name, version FROM table_version"))
+                self._data_version = data_version
+            versions = self.versions
+        missing = [table for table in tables if table not in versions]
+        if missing:
+            raise ValueError(f"No version kept for tables: {', '.join(missing)}")
+        return tuple(versions[table] for table in tables)
+
+table_versions = TableVersions()
+
+# pysqlite (and so aiosqlite) begins transactions itself, lazily, and not before
+# a SAVEPOINT, so when a SAVEPOINT is the first statement of a transaction its
+# RELEASE commits everything up to it and a later rollback can't undo it. This
+# is SQLAlchemy's documented workaround: the driver's transaction handling is
+# turned off and SQLAlchemy emits BEGIN itself. Needed wherever SAVEPOINTs are
+# used, e.g. the DatabaseWriter's retries and bulk_insert.
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+def _begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+def enable_savepoints(sync_engine):
+    event.listen(sync_engine, "connect", _disable_driver_transactions)
+    event.listen(sync_engine, "begin", _begin)
+
 # Create async engine
 engine = create_async_engine(db_url, echo=False)
+event.listen(engine.sync_engine, "connect", apply_storage_profile)
+enable_savepoints(engine.sync_engine)
+
+# Create a separate read-only engine for list/get queries so that (with WAL)
+# readers run in parallel with the writer. Connections are opened with
+# mode=ro and have query_only set, so the reader pool can never write.
+reader_profile = {'query_only': 'ON'}
+
+def apply_reader_profile(dbapi_connection, connection_record=None):
+    profile = get_storage_profile()
+    profile.pop('journal_mode')  # persisted in the database file and can't be changed read-only
+    profile.update(reader_profile)
+    apply_storage_profile(dbapi_connection, connection_record, profile)
+
+reader_engine = create_async_engine(
+    f"sqlite+aiosqlite:///file:{db_path}?mode=ro&uri=true",
+    echo=False,
+    pool_size=int(os.environ.get('PAIOS_DB_READERS', 8)),
+)
+event.listen(reader_engine.sync_engine, "connect", apply_reader_profile)
+
+# Create a synchronous engine for libraries that don't support async (e.g. the Casbin adapter)
+def create_sync_engine(**kwargs):
+    sync_engine = create_engine(db_url.replace("+aiosqlite", ""), **kwargs)
+    event.listen(sync_engine, "connect", apply_storage_profile)
+    return sync_engine
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -25,13 +140,94 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
-# use alembic to create the database or migrate to the latest schema
-def init_db():
+AsyncSessionReader = sessionmaker(
+    bind=reader_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+# Tracks how long callers wait to check a connection out of a pool (see
+# snapshot). A wait of slow_wait_ms or more means every connection was in use,
+# i.e. the pool is too small for the load, which is logged with the metrics so
+# far, at most once a minute.
+class PoolMetrics:
+    log_interval = 60
+
+    def __init__(self, name, size_setting, slow_wait_ms=50):
+        self.name = name
+        self.size_setting = size_setting
+        self.slow_wait = slow_wait_ms / 1000
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._logged = None
+
+    def record(self, wait):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait >= self.slow_wait:
+            self.slow_checkouts += 1
+            now = time.monotonic()
+            if self._logged is None or now - self._logged >= self.log_interval:
+                self._logged = now
+                logger.warning(f"Waited {1000 * wait:.0f}ms for a {self.name} connection, consider raising "
+                               f"{self.size_setting}: {self.snapshot()}")
+
+    def snapshot(self):
+        return {
+            "checkouts": self.checkouts,
+            "slow_checkouts": self.slow_checkouts,
+            "avg_wait_ms": 1000 * self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait_ms": 1000 * self.max_wait,
+        }
+
+reader_pool_metrics = PoolMetrics('reader', 'PAIOS_DB_READERS',
+                                  slow_wait_ms=float(os.environ.get('PAIOS_DB_READER_SLOW_WAIT_MS', 50)))
+
+# The head revision of migrations/versions, precomputed so that a database
+# that's already up to date can be recognised without loading Alembic (its
+# config, the migration environment and every script). Update it when adding
+# a migration; test_db_schema checks it against the scripts.
+schema_head = 'cf6657f26c36'
+
+# The revision stored in the database, or None if it doesn't have one yet
+def current_revision():
+    if not db_path.exists():
+        return None
+    try:
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = connection.execute("SELECT version_num FROM alembic_version").fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def alembic_config():
+    from alembic.config import Config as AlembicConfig
     alembic_cfg = AlembicConfig()
-    os.makedirs(db_path.parent, exist_ok=True)
     alembic_cfg.set_main_option("script_location", str(base_dir / "migrations"))
     alembic_cfg.set_main_option("sqlalchemy.url", db_url.replace("+aiosqlite", "")) # because Alembic doesn't like async apparently
-    command.upgrade(alembic_cfg, "head")
+    return alembic_cfg
+
+# use alembic to create the database or migrate to the latest schema, unless
+# it's already at schema_head
+def init_db():
+    start = time.perf_counter()
+    revision = current_revision()
+    if revision == schema_head:
+        logger.debug(f"Database is at {schema_head}, skipped migrations ({1000 * (time.perf_counter() - start):.1f}ms)")
+        return
+    from alembic import command
+    os.makedirs(db_path.parent, exist_ok=True)
+    command.upgrade(alembic_config(), "head")
+    logger.info(f"Migrated database from {revision} to head ({1000 * (time.perf_counter() - start):.0f}ms)")
 
 @asynccontextmanager
 async def db_session_context():
@@ -44,3 +240,108 @@ async def db_session_context():
         raise
     finally:
         await session.close()
+
+@asynccontextmanager
+async def db_read_context():
+    session = AsyncSessionReader()
+    try:
+        start = time.perf_counter()
+        await session.connection()  # check out a pooled reader connection
+        reader_pool_metrics.record(time.perf_counter() - start)
+        yield session
+    finally:
+        await session.close()
+
+# Single writer: managers submit write units (async callables taking a session)
+# which are group committed, i.e. everything queued since the last commit is
+# written in one transaction. If any unit fails the batch is rolled back and
+# rerun with each unit in its own SAVEPOINT so a failing unit only fails its
+# own caller. Results and errors are returned to callers via futures, so write
+# units must only touch the session (they may run twice).
+class DatabaseWriter:
+    def __init__(self, session_factory=AsyncSessionLocal, max_batch_size=100):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def _ensure_started(self):
+        # the writer task is bound to the running event loop (e.g. tests use asyncio.run per test)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, unit):
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((unit, future))
+        return await future
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._commit_batch(batch)
+
+    async def _execute(self, pending, isolated):
+        outcomes = []
+        async with self.session_factory() as session:
+            try:
+                for unit, future in pending:
+                    if not isolated:
+                        outcomes.append((future, await unit(session), None))
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            result = await unit(session)
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+        return outcomes
+
+    async def _commit_batch(self, batch):
+        pending = [(unit, future) for unit, future in batch if not future.cancelled()]
+        if not pending:
+            return
+        try:
+            # optimistically run the whole batch in one transaction
+            outcomes = await self._execute(pending, isolated=False)
+        except Exception as e:
+            if len(pending) == 1:
+                outcomes = [(pending[0][1], None, e)]
+            else:
+                # something failed so rerun with each unit in its own SAVEPOINT to find out what
+                try:
+                    outcomes = await self._execute(pending, isolated=True)
+                except Exception as e:
+                    logger.error(f"Group commit of {len(pending)} write(s) failed: {e}")
+                    outcomes = [(future, None, e) for _, future in pending]
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+db_writer = DatabaseWriter()
+
+async def db_write(unit):
+    return await db_writer.submit(unit)
@@ -0,0 +1,61 @@
+# Conditional GETs for polled endpoints. Views decorated with @conditional send
+# a weak ETag and answer a matching If-None-Match with a 304 Not Modified.
+# - @conditional('asset', ...) tags responses with the version of the tables
+#   they're read from (see backend.db.table_versions, which only keeps
+#   versions for tables with triggers for them), which is known before the
+#   view runs, so an unchanged poll costs a PRAGMA rather than the query and
+#   serializing the response
+# - @conditional() tags responses with a hash of their body, for data that
+#   isn't in the database (e.g. abilities and downloads, which change in
+#   memory): the view still runs but unchanged data isn't sent again
+# Responses also get Cache-Control: no-cache, so browsers keep them but
+# revalidate with If-None-Match every time rather than reusing them unchecked.
+import inspect
+import hashlib
+from functools import wraps
+from connexion import request
+from starlette.responses import Response
+from backend.db import table_versions
+
+# Versions are kept in the database, so ETags survive restarts and are the same
+# from every worker process
+def table_etag(*tables):
+    return f'W/"{".".join(str(version) for version in table_versions.version(*tables))}"'
+
+def content_etag(body):
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+# Whether an If-None-Match header value matches etag (weak comparison, i.e.
+# ignoring W/ prefixes)
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+def not_modified(etag):
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+def conditional(*tables):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            if_none_match = request.headers.get('If-None-Match')
+            etag = table_etag(*tables) if tables else None
+            if etag and etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            response = view(*args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+            if response.status_code != 200:
+                return response
+            etag = etag or content_etag(response.body)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -25,7 +25,7 @@ class AbilityState(Enum):
 class AbilitiesManager:
     _instance = None
     _lock = Lock()
-    abilities = []
+    _abilities = None
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -38,10 +38,18 @@ class AbilitiesManager:
         if not hasattr(self, '_initialized'):  # Ensure initialization happens only once
             with self._lock:
                 if not hasattr(self, '_initialized'):
-                    self._load_abilities()
                     self._load_dependency_managers()
                     self._initialized = True
 
+    # Abilities are scanned from abilities_dir on first use rather than at startup
+    @property
+    def abilities(self):
+        if self._abilities is None:
+            with self._lock:
+                if self._abilities is None:
+                    self._abilities = self._load_abilities()
+        return self._abilities
+
     def _load_dependency_managers(self):
         self._dependency_managers = {
             'python': PythonDependency(),
@@ -51,6 +59,7 @@ class AbilitiesManager:
         }
 
     def _load_abilities(self):
+        abilities = []
         for ability_path in abilities_dir.iterdir():
             if ability_path.is_dir():
                 versions_info = self._get_versions_info(ability_path)
@@ -62,7 +71,8 @@ class AbilitiesManager:
                             ability_data['versions'].update(versions_info)
                         else:
                             ability_data['versions'] = versions_info
-                        self.abilities.append(ability_data)
+                        abilities.append(ability_data)
+        return abilities
 
     def _fetch_ability_from_directory(self, ability_path, version):
         version_dir = ability_path / version
@@ -1,11 +1,34 @@
 from uuid import uuid4
 from threading import Lock
-from sqlalchemy import select, insert, update, delete, func, or_
+from sqlalchemy import delete, table, column, literal_column
 from backend.models import Asset
-from backend.db import db_session_context
+from backend.db import db_read_context, db_write
 from backend.schemas import AssetSchema, AssetCreateSchema
+from backend.queries import QueryPlan, fetch_page, stream_rows, bulk_insert, bulk_update, bulk_delete, insert_returning, update_returning, select_columns, from_row
 from typing import List, Tuple, Optional, Dict, Any
 
+# FTS5 index over the asset title, description, creator and subject (see the
+# added_asset_fts_table and keyed_asset_fts_on_a_stable_key migrations), keyed
+# on each asset's key in asset_search_key rather than its rowid, which can change
+asset_fts = table('asset_fts', column('rowid'), column('rank'))
+asset_search_key = table('asset_search_key', column('key'), column('asset_id'))
+
+# Restricts stmt to assets matching an FTS5 query
+def search_assets(stmt, match: str):
+    return stmt.join(asset_search_key, asset_search_key.c.asset_id == Asset.id) \
+               .join(asset_fts, asset_fts.c.rowid == asset_search_key.c.key) \
+               .filter(literal_column('asset_fts').op('MATCH')(match))
+
+asset_fields = ['id', 'user_id', 'title', 'creator', 'subject', 'description']
+assets_plan = QueryPlan(Asset, filterable=asset_fields, sortable=asset_fields)
+
+# Turns free text into an FTS5 query matching every word as a prefix, e.g.
+# 'open sour' -> '"open"* "sour"*'. Each word is quoted so FTS5 operators and
+# punctuation in user input are matched literally rather than parsed.
+def fts_query(query: str) -> Optional[str]:
+    terms = ['"' + term.replace('"', '""') + '"*' for term in query.split()]
+    return ' '.join(terms) or None
+
 class AssetsManager:
     _instance = None
     _lock = Lock()
@@ -25,88 +48,82 @@ class AssetsManager:
                     self._initialized = True
 
     async def create_asset(self, asset_data: AssetCreateSchema) -> AssetSchema:
-        async with db_session_context() as session:
-            new_asset = Asset(id=str(uuid4()), **asset_data.model_dump())
-            session.add(new_asset)
-            await session.commit()
-            await session.refresh(new_asset)
-            return AssetSchema(id=new_asset.id, **asset_data.model_dump())
+        async def write(session):
+            return AssetSchema(**await insert_returning(session, Asset, dict(id=str(uuid4()), **asset_data.model_dump())))
+        return await db_write(write)
 
     async def update_asset(self, id: str, asset_data: AssetCreateSchema) -> Optional[AssetSchema]:
-        async with db_session_context() as session:
-            stmt = update(Asset).where(Asset.id == id).values(**asset_data.model_dump(exclude_unset=True))
-            result = await session.execute(stmt)
-            if result.rowcount > 0:
-                await session.commit()
-                updated_asset = await session.get(Asset, id)
-                return AssetSchema(id=updated_asset.id, **asset_data.model_dump())
-            return None
+        async def write(session):
+            row = await update_returning(session, Asset, id, asset_data.model_dump(exclude_unset=True))
+            return AssetSchema(**row) if row else None
+        return await db_write(write)
 
     async def delete_asset(self, id: str) -> bool:
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Asset).where(Asset.id == id)
             result = await session.execute(stmt)
-            await session.commit()
             return result.rowcount > 0
+        return await db_write(write)
+
+    # Bulk versions of the above, returning per-item results in order: the new
+    # or updated asset (None if it failed or wasn't found) or whether it was deleted
+    async def create_assets(self, assets_data: List[AssetCreateSchema]) -> List[Optional[AssetSchema]]:
+        assets = [AssetSchema(id=str(uuid4()), **asset_data.model_dump()) for asset_data in assets_data]
+        async def write(session):
+            errors = await bulk_insert(session, Asset, [asset.model_dump() for asset in assets])
+            return [asset if error is None else None for asset, error in zip(assets, errors)]
+        return await db_write(write)
+
+    async def update_assets(self, assets: List[AssetSchema]) -> List[Optional[AssetSchema]]:
+        async def write(session):
+            found = await bulk_update(session, Asset, [asset.model_dump(exclude_unset=True) for asset in assets])
+            return [asset if exists else None for asset, exists in zip(assets, found)]
+        return await db_write(write)
+
+    async def delete_assets(self, ids: List[str]) -> List[bool]:
+        async def write(session):
+            return await bulk_delete(session, Asset, ids)
+        return await db_write(write)
 
     async def retrieve_asset(self, id: str) -> Optional[AssetSchema]:
-        async with db_session_context() as session:
-            result = await session.execute(select(Asset).filter(Asset.id == id))
-            asset = result.scalar_one_or_none()
-            if asset:
-                return AssetSchema(
-                    id=asset.id,
-                    title=asset.title,
-                    user_id=asset.user_id,
-                    creator=asset.creator,
-                    subject=asset.subject,
-                    description=asset.description
-                )
-            return None
+        async with db_read_context() as session:
+            result = await session.execute(select_columns(Asset).filter(Asset.id == id))
+            asset = result.one_or_none()
+            return from_row(AssetSchema, asset) if asset else None
 
     async def retrieve_assets(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None, 
                               sort_order: str = 'asc', filters: Optional[Dict[str, Any]] = None, 
-                              query: Optional[str] = None) -> Tuple[List[AssetSchema], int]:
-        async with db_session_context() as session:
-            stmt = select(Asset)
-
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        stmt = stmt.filter(getattr(Asset, key).in_(value))
-                    else:
-                        stmt = stmt.filter(getattr(Asset, key) == value)
-
-            if query:
-                search_condition = or_(
-                    Asset.title.ilike(f"%{query}%"),
-                    Asset.description.ilike(f"%{query}%"),
-                    Asset.creator.ilike(f"%{query}%"),
-                    Asset.subject.ilike(f"%{query}%")
-                )
-                stmt = stmt.filter(search_condition)
-
-            if sort_by and hasattr(Asset, sort_by):
-                order_column = getattr(Asset, sort_by)
-                stmt = stmt.order_by(order_column.desc() if sort_order.lower() == 'desc' else order_column)
-
-            stmt = stmt.offset(offset).limit(limit)
-
-            result = await session.execute(stmt)
-            assets = [AssetSchema(
-                id=asset.id,
-                title=asset.title,
-                user_id=asset.user_id,
-                creator=asset.creator,
-                subject=asset.subject,
-                description=asset.description
-            ) for asset in result.scalars().all()]
-
-            # Get total count
-            count_stmt = select(func.count()).select_from(Asset)
-            if filters or query:
-                count_stmt = count_stmt.filter(stmt.whereclause)
-            total_count = await session.execute(count_stmt)
-            total_count = total_count.scalar()
+                              query: Optional[str] = None, after: Optional[Dict[str, Any]] = None,
+                              estimate_count: bool = False) -> Tuple[List[AssetSchema], int]:
+        async with db_read_context() as session:
+            match = fts_query(query) if query else None
+            if not match:
+                rows, total_count = await assets_plan.fetch_page(session, filters, offset, limit, sort_by, sort_order,
+                                                                 after, estimate_count)
+            else:
+                shape, params = assets_plan.parse_filters(filters)
+                sort_by = assets_plan.sort_key(sort_by)
+                stmt = search_assets(assets_plan.statement(shape), match)
+                if not sort_by and not after:
+                    # most relevant first (BM25, weighted towards the title)
+                    stmt = stmt.order_by(asset_fts.c.rank)
+                rows, total_count = await fetch_page(session, stmt, Asset, offset, limit, sort_by, sort_order,
+                                                     after, estimate_count, params)
+            assets = [from_row(AssetSchema, asset) for asset in rows]
 
             return assets, total_count
+
+    # Streams every asset matching filters (and the free text query) for exports.
+    # Filters are validated (raising ValueError) before anything is streamed.
+    def export_assets(self, filters: Optional[Dict[str, Any]] = None, query: Optional[str] = None):
+        shape, params = assets_plan.parse_filters(filters)
+        stmt = assets_plan.statement(shape)
+        match = fts_query(query) if query else None
+        if match:
+            stmt = search_assets(stmt, match)
+
+        async def assets():
+            async with db_read_context() as session:
+                async for asset in stream_rows(session, stmt, Asset, params):
+                    yield from_row(AssetSchema, asset)
+        return assets()
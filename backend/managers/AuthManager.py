@@ -2,63 +2,43 @@ import os
 import json
 import base64
 import jwt
-import secrets
 from threading import Lock
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, delete
 from backend.models import User, Cred, Session
-from backend.db import db_session_context
+from backend.db import db_session_context, db_write
 from uuid import uuid4
-from webauthn import (
-    verify_registration_response,
-    verify_authentication_response, 
-    generate_authentication_options, 
-    generate_registration_options, 
-    options_to_json,
-    base64url_to_bytes
-)
-from webauthn.helpers.structs import (
-    AttestationConveyancePreference,
-    AuthenticatorAttachment,
-    AuthenticatorSelectionCriteria,
-    ResidentKeyRequirement,
-    PublicKeyCredentialDescriptor,
-    PublicKeyCredentialType,
-    AuthenticatorTransport,
-    UserVerificationRequirement
-)
-from webauthn.helpers.cose import COSEAlgorithmIdentifier
+# webauthn and jinja2 are slow to import and only needed to sign up or in, so
+# they're imported where they're used rather than at startup
 from connexion.exceptions import Unauthorized
 from common.utils import get_env_key
 import os
 from pathlib import Path
 from common.mail import send
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
-from jinja2 import Environment, FileSystemLoader
 from backend.managers.CasbinRoleManager import CasbinRoleManager
+from backend.tokens import token_verifier, sign
+from backend.crypto_pool import crypto_pool
 # set up logging
 from common.log import get_logger
 logger = get_logger(__name__)
 
 def generate_jwt(payload: dict):
-    header = {
-        "alg": "HS256",
-        "typ": "JWT"
-    }
+    return token_verifier.encode(payload)
 
-    jwt_secret = get_env_key('PAIOS_JWT_SECRET', lambda: secrets.token_urlsafe(32))
-
-    encoded_jwt = jwt.encode(payload, jwt_secret, algorithm='HS256', headers=header)
-    return encoded_jwt
+# generate_jwt, signed in the crypto pool (see backend.crypto_pool) rather than
+# on the event loop
+async def sign_jwt(payload: dict):
+    return await crypto_pool.run(sign, payload, token_verifier.secret, token_verifier.algorithm)
 
 def generate_verification_token(email: str):
-    SECRET_KEY = get_env_key('PAIOS_JWT_SECRET', lambda: secrets.token_urlsafe(32))
+    SECRET_KEY = token_verifier.secret
     SALT = "email-confirmation-salt"
     serializer = URLSafeTimedSerializer(SECRET_KEY)
     return serializer.dumps(email, salt=SALT)
 
 def verify_email_token(token):
-    SECRET_KEY = get_env_key('PAIOS_JWT_SECRET', lambda: secrets.token_urlsafe(32))
+    SECRET_KEY = token_verifier.secret
     SALT = "email-confirmation-salt"
     serializer = URLSafeTimedSerializer(SECRET_KEY)
     try:
@@ -70,6 +50,7 @@ def verify_email_token(token):
     return user_id
 
 async def send_verification_email(user_id, email_id):
+    from jinja2 import Environment, FileSystemLoader
     token = generate_verification_token(user_id)
     host = get_env_key('PAIOS_HOST', 'localhost')
     port = get_env_key('PAIOS_PORT', '8443')
@@ -91,11 +72,10 @@ async def send_verification_email(user_id, email_id):
         logger.error(f"Failed to send verification email: {str(e)}")
         raise
 
+# Verified tokens are cached (see backend.tokens), so a repeat token is a lookup
 def decode_jwt(token):
-    jwt_secret = get_env_key('PAIOS_JWT_SECRET', lambda: secrets.token_urlsafe(32))
-
     try:
-        decoded = jwt.decode(token, jwt_secret, algorithms=["HS256"])
+        decoded = token_verifier.decode(token)
         logger.debug("Decoded JWT: %s", decoded)
         return {"uid": decoded['sub'], "role": decoded['role']}
     
@@ -147,6 +127,14 @@ class AuthManager:
             return await self.webauthn_login_options(user)
 
     def webauthn_register_options(self, email_id, user):
+        from webauthn import generate_registration_options, options_to_json, base64url_to_bytes
+        from webauthn.helpers.structs import (
+            AttestationConveyancePreference,
+            AuthenticatorAttachment,
+            AuthenticatorSelectionCriteria,
+            ResidentKeyRequirement
+        )
+        from webauthn.helpers.cose import COSEAlgorithmIdentifier
         # result = await session.execute(select(User).where(User.email == email_id))
         # user = result.scalar_one_or_none()
         user_id = base64url_to_bytes(user.webauthn_user_id) if user else os.urandom(32)
@@ -185,33 +173,35 @@ class AuthManager:
         return challenge, options_to_json(options), "REGISTER"
         
     async def webauthn_register(self, challenge: str, email_id: str, user_id: str, response):
-        async with db_session_context() as session:
-            host = get_env_key('PAIOS_HOST', 'localhost')
-            port = get_env_key('PAIOS_PORT', '8443')
-            expected_origin = f"https://{host}:{port}"
-            expected_rpid = host
-
-            res = verify_registration_response(credential=response, 
-                                               expected_challenge=base64url_to_bytes(challenge),
-                                               expected_origin=expected_origin,
-                                               expected_rp_id=expected_rpid,
-                                               require_user_verification=False
-                                               )
-            if not res:
-                return False
-            
+        from webauthn import verify_registration_response, base64url_to_bytes
+        host = get_env_key('PAIOS_HOST', 'localhost')
+        port = get_env_key('PAIOS_PORT', '8443')
+        expected_origin = f"https://{host}:{port}"
+        expected_rpid = host
+
+        # CPU bound (CBOR and signature checks), so run in the crypto pool
+        res = await crypto_pool.run(verify_registration_response,
+                                    credential=response,
+                                    expected_challenge=base64url_to_bytes(challenge),
+                                    expected_origin=expected_origin,
+                                    expected_rp_id=expected_rpid,
+                                    require_user_verification=False
+                                    )
+        if not res:
+            return False
+
+        async def write(session):
             user_result = await session.execute(select(User).where(User.email == email_id))
             user = user_result.scalar_one_or_none()
             
             if not user:    
                 new_user = User(id=str(uuid4()), name=email_id, email=email_id, webauthn_user_id=user_id)
                 session.add(new_user)
-                await session.commit()
+                await session.flush()
                 await session.refresh(new_user)
                 user = new_user
             else:
                 await session.execute(delete(Cred).where(Cred.webauthn_user_id == user.webauthn_user_id))
-                await session.commit()
                 # Add default role for new user
                 # self.add_role_for_user(str(user.id), 'user')
 
@@ -221,20 +211,29 @@ class AuthManager:
             transports = json.dumps(response["response"]["transports"])
             new_cred = Cred(id=base64url_cred_id, public_key=base64url_public_key, webauthn_user_id=user.webauthn_user_id, backed_up=res.credential_backed_up, name=email_id, transports=transports)
             session.add(new_cred)
-            await session.commit()
-            await send_verification_email(user.id, email_id)
-            # payload = {
-            #     "sub": user.id,
-            #     "iat": datetime.now(timezone.utc),
-            #     "exp": datetime.now(timezone.utc) + timedelta(days=1),
-            #     "roles": self.get_roles_for_user(str(user.id))  # Include roles in the token
-            # }
-
-            # token = generate_jwt(payload)
-            
-            return True
+            return user.id
+
+        registered_user_id = await db_write(write)
+        await send_verification_email(registered_user_id, email_id)
+        # payload = {
+        #     "sub": user.id,
+        #     "iat": datetime.now(timezone.utc),
+        #     "exp": datetime.now(timezone.utc) + timedelta(days=1),
+        #     "roles": self.get_roles_for_user(str(user.id))  # Include roles in the token
+        # }
+
+        # token = generate_jwt(payload)
+        
+        return True
 
     async def webauthn_login_options(self, user):
+        from webauthn import generate_authentication_options, options_to_json, base64url_to_bytes
+        from webauthn.helpers.structs import (
+            AuthenticatorTransport,
+            PublicKeyCredentialDescriptor,
+            PublicKeyCredentialType,
+            UserVerificationRequirement
+        )
         async with db_session_context() as session:
             # user_result = await session.execute(select(User).where(User.email == email_id))
             # user = user_result.scalar_one_or_none()
@@ -266,75 +265,82 @@ class AuthManager:
             return challenge, options_to_json(options), "LOGIN"
         
     async def webauthn_login(self, challenge: str, email_id:str, response):
+        from webauthn import verify_authentication_response, base64url_to_bytes
+        host = get_env_key('PAIOS_HOST', 'localhost')
+        port = get_env_key('PAIOS_PORT', '8443')
+        expected_origin = f"https://{host}:{port}"
+        expected_rpid = host
+
+        # load what verification needs and give the connection back before
+        # verifying, rather than holding it (and its read snapshot) meanwhile
         async with db_session_context() as session:
-            host = get_env_key('PAIOS_HOST', 'localhost')
-            port = get_env_key('PAIOS_PORT', '8443')
-            expected_origin = f"https://{host}:{port}"
-            expected_rpid = host
-            
-            user_result = await session.execute(select(User).where(User.email == email_id, User.emailVerified == True))
-            user = user_result.scalar_one_or_none()
+            user_result = await session.execute(select(User.id).where(User.email == email_id, User.emailVerified == True))
+            user_id = user_result.scalar_one_or_none()
 
-            if not user:
+            if not user_id:
                 return None
             
-            credential_result = await session.execute(select(Cred).where(Cred.id == response["id"]))
-            credential = credential_result.scalar_one_or_none()
+            credential_result = await session.execute(select(Cred.public_key).where(Cred.id == response["id"]))
+            public_key = credential_result.scalar_one_or_none()
 
-            if not credential:
-                return None
-            
-            res = verify_authentication_response(credential=response,
-                                                 expected_challenge=base64url_to_bytes(challenge),
-                                                 expected_origin=expected_origin,
-                                                 expected_rp_id=expected_rpid,
-                                                 credential_public_key=base64url_to_bytes(credential.public_key),
-                                                 credential_current_sign_count=0,
-                                                 require_user_verification=True
-                                                 )
-
-            if not res.new_sign_count != 1:
+            if not public_key:
                 return None
             
-            cb = CasbinRoleManager()
-            role = cb.get_user_roles(user.id, "ADMIN_PORTAL")
-            payload = {
-                "sub": user.id,
-                "role": role,
-                "iat": datetime.utcnow(),
-                "exp": datetime.utcnow() + timedelta(days=1)
-            }
-            token = generate_jwt(payload)
-            return token, role
+        # CPU bound (CBOR and signature checks), so run in the crypto pool
+        res = await crypto_pool.run(verify_authentication_response,
+                                    credential=response,
+                                    expected_challenge=base64url_to_bytes(challenge),
+                                    expected_origin=expected_origin,
+                                    expected_rp_id=expected_rpid,
+                                    credential_public_key=base64url_to_bytes(public_key),
+                                    credential_current_sign_count=0,
+                                    require_user_verification=True
+                                    )
+
+        if not res.new_sign_count != 1:
+            return None
+        
+        cb = CasbinRoleManager()
+        role = cb.get_user_roles(user_id, "ADMIN_PORTAL")
+        payload = {
+            "sub": user_id,
+            "role": role,
+            "iat": datetime.utcnow(),
+            "exp": datetime.utcnow() + timedelta(days=1)
+        }
+        token = await sign_jwt(payload)
+        return token, role
         
     async def verify_email(self, token: str):
-        async with db_session_context() as session:
-            user_id = verify_email_token(token)
+        user_id = verify_email_token(token)
 
-            if not user_id:
-                return None
-            
+        if not user_id:
+            return None
+
+        async def write(session):
             user_result = await session.execute(select(User).where(User.id == user_id))
             user = user_result.scalar_one_or_none()
             if not user or user.emailVerified:
-                return None
+                return False
 
             user.emailVerified = True
+            return True
 
-            cb = CasbinRoleManager()
-            admin_users = cb.get_admin_users("ADMIN_PORTAL")
-            if not admin_users:
-                cb.assign_user_role(user.id, "ADMIN_PORTAL", "admin") # assign admin role to first user created
-            else:
-                cb.assign_user_role(user.id, "ADMIN_PORTAL", "user")
+        if not await db_write(write):
+            return None
 
-            await session.commit()
-            
-            return True
+        cb = CasbinRoleManager()
+        admin_users = cb.get_admin_users("ADMIN_PORTAL")
+        if not admin_users:
+            await cb.assign_user_role(user_id, "ADMIN_PORTAL", "admin") # assign admin role to first user created
+        else:
+            await cb.assign_user_role(user_id, "ADMIN_PORTAL", "user")
+
+        return True
 
 
     async def create_session(self, user_id: str):
-        async with db_session_context() as session:
+        async def write(session):
             new_session = Session(
                 id=str(uuid4()),
                 user_id=user_id,
@@ -342,12 +348,13 @@ class AuthManager:
                 expires_at=datetime.utcnow() + timedelta(days=1)  # Set expiration to 1 day from now
             )
             session.add(new_session)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_session)
             return new_session.id, new_session.token
+        return await db_write(write)
 
     async def delete_session(self, token: str):
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Session).where(Session.token == token)
             await session.execute(stmt)
-            await session.commit()
+        await db_write(write)
@@ -1,27 +1,72 @@
-from casbin import Enforcer
-from casbin_sqlalchemy_adapter import Adapter
+import os
 from pathlib import Path
-from common.paths import db_path
+from backend.db import create_sync_engine
 from threading import Lock
 
+# Most decisions the decision cache holds before it's cleared and starts over
+decision_cache_size = int(os.environ.get('PAIOS_CASBIN_CACHE_SIZE', 100000))
+
+model_path = str(Path(__file__).parent.parent / 'rbac_model.conf')
+
 class CasbinRoleManager:
     _instance = None
     _lock = Lock()  # Add this line if you want thread safety
+    _enforcer = None
+    # Saves policy changes made after startup (see assign_user_role). None
+    # when the policy isn't backed by the database, e.g. in tests.
+    policy_adapter = None
+    # Enforcement decisions by (user, domain, object, action). Casbin runs its
+    # matcher over the policy on every enforce(), so decisions are cached and
+    # the cache is dropped whenever the policy changes (see invalidate_decisions).
+    _decisions = {}
+    _generation = 0
+    # Each user's roles by (user, domain), indexed from the grouping policy when
+    # first needed after it changes (see get_users_roles)
+    _roles = None
 
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super(CasbinRoleManager, cls).__new__(cls)
-                    cls._instance.init_casbin()
         return cls._instance
 
+    # The enforcer (and with it the policy, loaded from the database) is set up
+    # on first use rather than when the manager is created at startup
+    @property
+    def enforcer(self):
+        if self._enforcer is None:
+            with self._lock:
+                if self._enforcer is None:
+                    self.init_casbin()
+        return self._enforcer
+
     def init_casbin(self):
-        path = Path(db_path)  # Ensure correct path
-        adapter = Adapter(f"sqlite:///{path}")  # Format as SQLite URL
-        model_path = str(Path(__file__).parent.parent / 'rbac_model.conf')  # Convert to string
-        self.enforcer = Enforcer(model_path, adapter)  # Use Enforcer correctly
+        from casbin import Enforcer
+        from casbin_sqlalchemy_adapter import Adapter
+        from backend.casbin_adapter import AsyncPolicyAdapter
+        adapter = Adapter(create_sync_engine())  # Shares the app's SQLite storage profile
+        enforcer = Enforcer(model_path, adapter)
+        self.use_enforcer(enforcer)
+        # Loading the policy and saving any missing default rules block, but
+        # only once, at startup. After that the enforcer only changes the policy
+        # in memory and changes are saved by policy_adapter, off the event loop.
         self.add_default_rules()
+        enforcer.enable_auto_save(False)
+        self.policy_adapter = AsyncPolicyAdapter(adapter)
+
+    # Sets up enforcer (which tests and benchmarks use to swap in an in-memory
+    # policy) and the adapter that saves changes to it
+    def use_enforcer(self, enforcer, policy_adapter=None):
+        # casbin's domain role manager defaults to matching role names with an
+        # equality function, which compares each role link it builds against
+        # every role, so building it is quadratic in the number of users (about
+        # 2 minutes on the first check after loading 10k). Names are matched
+        # exactly anyway, so it isn't needed.
+        enforcer.get_role_manager().add_matching_func(None)
+        self._enforcer = enforcer
+        self.policy_adapter = policy_adapter
+        self.invalidate_decisions()
 
     def add_default_rules(self):
         default_rules = [
@@ -36,12 +81,29 @@ class CasbinRoleManager:
         
         for rule in default_rules:
             self.enforcer.add_policy(*rule)
+        self.invalidate_decisions()
+
+    # Call after changing the policy other than through this manager
+    def invalidate_decisions(self):
+        self._generation += 1
+        self._decisions = {}
+        self._roles = None
 
     def get_enforcer(self):
         return self.enforcer
     
     def check_permissions(self, user_id, res_act, res_id, domain):
-        return self.enforcer.enforce(user_id, domain, res_id, res_act)
+        key = (user_id, domain, res_id, res_act)
+        decision = self._decisions.get(key)
+        if decision is None:
+            generation = self._generation
+            decision = self.enforcer.enforce(user_id, domain, res_id, res_act)
+            # don't cache a decision made against a policy that changed meanwhile
+            if generation == self._generation:
+                if len(self._decisions) >= decision_cache_size:
+                    self._decisions = {}
+                self._decisions[key] = decision
+        return decision
     
     def get_permissions(self, role, domain):
         return self.enforcer.get_permissions_for_user_in_domain(role, domain)
@@ -58,8 +120,21 @@ class CasbinRoleManager:
 
         return output
     
-    def assign_user_role(self, user_id, domain, role):
-        self.enforcer.add_role_for_user_in_domain(user_id, role, domain)
+    # The role applies straight away and is saved in the background; if saving
+    # fails it's taken away again and the error raised
+    async def assign_user_role(self, user_id, domain, role):
+        rule = [user_id, role, domain]
+        if not self.enforcer.add_grouping_policy(*rule):
+            return  # already has the role
+        self.invalidate_decisions()
+        if self.policy_adapter is None:
+            return
+        try:
+            await self.policy_adapter.add_policy("g", "g", rule)
+        except Exception:
+            self.enforcer.remove_grouping_policy(*rule)
+            self.invalidate_decisions()
+            raise
 
     def get_admin_users(self, domain):
         return self.enforcer.get_users_for_role_in_domain("admin",domain)
@@ -67,6 +142,23 @@ class CasbinRoleManager:
     def get_roles_for_user_in_domain(self, user_id, domain):
         return self.enforcer.get_roles_for_user_in_domain(user_id, domain)
     
+    # The roles of each of user_ids in domain (comma separated), e.g. for a page
+    # of users, looked up in an index built in one pass over the grouping policy
+    # rather than by asking casbin's role manager about each user in turn
+    # (which for a page of 1000 takes ~60ms the first time after loading 10k
+    # users and ~2ms after that, vs ~4ms to build the index and ~0.3ms to use it)
+    def get_users_roles(self, user_ids, domain):
+        roles = self._roles
+        if roles is None:
+            generation = self._generation
+            roles = {}
+            for user_id, role, role_domain in self.enforcer.get_named_grouping_policy("g"):
+                roles.setdefault((user_id, role_domain), []).append(role)
+            # don't keep an index of a policy that changed meanwhile
+            if generation == self._generation:
+                self._roles = roles
+        return {user_id: ",".join(roles.get((user_id, domain), ())) for user_id in user_ids}
+
     def get_user_roles(self, user_id, domain):
-        return ",".join(self.enforcer.get_roles_for_user_in_domain(user_id, domain))
+        return self.get_users_roles([user_id], domain)[user_id]
         
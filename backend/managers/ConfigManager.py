@@ -1,8 +1,8 @@
 from uuid import uuid4
 from threading import Lock
-from sqlalchemy import select, insert, update, delete
+from sqlalchemy import select, update, delete
 from backend.models import Config
-from backend.db import db_session_context, init_db
+from backend.db import db_session_context, db_write, init_db
 from backend.encryption import Encryption
 from backend.schemas import ConfigSchema
 
@@ -29,10 +29,10 @@ class ConfigManager:
     async def create_config_item(self, value):
         key = str(uuid4())
         encrypted_value = self.encryption.encrypt_value(value)
-        async with db_session_context() as session:
+        async def write(session):
             new_config = Config(key=key, value=encrypted_value)
             session.add(new_config)
-            await session.commit()
+        await db_write(write)
         return ConfigSchema(key=key, value=value)
 
     async def retrieve_config_item(self, key):
@@ -46,21 +46,21 @@ class ConfigManager:
 
     async def update_config_item(self, key, value):
         encrypted_value = self.encryption.encrypt_value(value)
-        async with db_session_context() as session:
+        async def write(session):
             stmt = update(Config).where(Config.key == key).values(value=encrypted_value)
             result = await session.execute(stmt)
             if result.rowcount == 0:
                 new_config = Config(key=key, value=encrypted_value)
                 session.add(new_config)
-            await session.commit()
+        await db_write(write)
         return ConfigSchema(key=key, value=value)
 
     async def delete_config_item(self, key):
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Config).where(Config.key == key)
             result = await session.execute(stmt)
-            await session.commit()
-        return result.rowcount > 0
+            return result.rowcount > 0
+        return await db_write(write)
 
     async def retrieve_all_config_items(self):
         async with db_session_context() as session:
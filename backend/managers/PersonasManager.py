@@ -1,11 +1,16 @@
 from uuid import uuid4
 from threading import Lock
-from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy import delete
 from backend.models import Persona
-from backend.db import db_session_context
+from backend.db import db_read_context, db_write
+from backend.queries import QueryPlan, stream_rows, bulk_insert, bulk_update, bulk_delete, insert_returning, update_returning, select_columns, from_row
 from backend.schemas import PersonaSchema, PersonaCreateSchema
 from typing import List, Tuple, Optional, Dict, Any
 
+persona_fields = ['id', 'name', 'description', 'voice_id', 'face_id']
+personas_plan = QueryPlan(Persona, filterable=persona_fields, sortable=persona_fields,
+                          default_operators={'name': 'contains'})
+
 class PersonasManager:
     _instance = None
     _lock = Lock()
@@ -23,80 +28,67 @@ class PersonasManager:
                 if not hasattr(self, '_initialized'):
                     self._initialized = True
 
-    async def create_persona(self, persona_data: PersonaCreateSchema) -> str:
-        async with db_session_context() as session:
-            new_persona = Persona(id=str(uuid4()), **persona_data)
-            session.add(new_persona)
-            await session.commit() 
-            await session.refresh(new_persona)
-            return new_persona.id    
+    async def create_persona(self, persona_data: PersonaCreateSchema) -> PersonaSchema:
+        async def write(session):
+            return PersonaSchema(**await insert_returning(session, Persona, dict(id=str(uuid4()), **persona_data)))
+        return await db_write(write)
 
     async def update_persona(self, id: str, persona_data: PersonaCreateSchema) -> Optional[PersonaSchema]:
-        async with db_session_context() as session:
-            stmt = update(Persona).where(Persona.id == id).values(**persona_data)
-            result = await session.execute(stmt)
-            if result.rowcount > 0:
-                await session.commit()
-                updated_persona = await session.get(Persona, id)
-                return PersonaSchema(id=updated_persona.id, **persona_data)
-            return None
+        async def write(session):
+            row = await update_returning(session, Persona, id, persona_data)
+            return PersonaSchema(**row) if row else None
+        return await db_write(write)
 
     async def delete_persona(self, id) -> bool:
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Persona).where(Persona.id == id)
             result = await session.execute(stmt)
-            await session.commit()
             return result.rowcount > 0
+        return await db_write(write)
 
-    async def retrieve_persona(self, id:str) -> Optional[PersonaSchema]:
-        async with db_session_context() as session:            
-            result = await session.execute(select(Persona).filter(Persona.id == id))
-            persona = result.scalar_one_or_none()
-            if persona:
-                return PersonaSchema(
-                    id=persona.id,
-                    name=persona.name,
-                    description=persona.description,
-                    voice_id=persona.voice_id,
-                    face_id=persona.face_id                    
-                )
-            return None
+    # Bulk versions of the above, returning per-item results in order: the new
+    # or updated persona (None if it failed or wasn't found) or whether it was deleted
+    async def create_personas(self, personas_data: List[PersonaCreateSchema]) -> List[Optional[PersonaSchema]]:
+        personas = [PersonaSchema(id=str(uuid4()), **persona_data.model_dump()) for persona_data in personas_data]
+        async def write(session):
+            errors = await bulk_insert(session, Persona, [persona.model_dump() for persona in personas])
+            return [persona if error is None else None for persona, error in zip(personas, errors)]
+        return await db_write(write)
 
-    async def retrieve_personas(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None,
-                                sort_order:str = 'asc',  filters: Optional[Dict[str, Any]] = None) -> Tuple[List[PersonaSchema], int]:
-        async with db_session_context() as session:
-            query = select(Persona)
+    async def update_personas(self, personas: List[PersonaSchema]) -> List[Optional[PersonaSchema]]:
+        async def write(session):
+            found = await bulk_update(session, Persona, [persona.model_dump(exclude_unset=True) for persona in personas])
+            return [persona if exists else None for persona, exists in zip(personas, found)]
+        return await db_write(write)
 
-            if filters:
-                for key, value in filters.items():
-                    if key == 'name':
-                        query = query.filter(Persona.name.ilike(f"%{value}%"))
-                    elif isinstance(value, list):
-                        query = query.filter(getattr(Persona, key).in_(value))
-                    else:
-                        query = query.filter(getattr(Persona, key) == value)
+    async def delete_personas(self, ids: List[str]) -> List[bool]:
+        async def write(session):
+            return await bulk_delete(session, Persona, ids)
+        return await db_write(write)
 
-            if sort_by and sort_by in ['id', 'name', 'description', 'voice_id', 'face_id']:
-                order_column = getattr(Persona, sort_by)
-                query = query.order_by(order_column.desc() if sort_order.lower() == 'desc' else order_column)
-
-            query = query.offset(offset).limit(limit)
+    async def retrieve_persona(self, id:str) -> Optional[PersonaSchema]:
+        async with db_read_context() as session:            
+            result = await session.execute(select_columns(Persona).filter(Persona.id == id))
+            persona = result.one_or_none()
+            return from_row(PersonaSchema, persona) if persona else None
 
-            result = await session.execute(query)
-            personas = [PersonaSchema.from_orm(persona) for persona in result.scalars().all()]
+    async def retrieve_personas(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None,
+                                sort_order:str = 'asc',  filters: Optional[Dict[str, Any]] = None,
+                                after: Optional[Dict[str, Any]] = None, estimate_count: bool = False) -> Tuple[List[PersonaSchema], int]:
+        async with db_read_context() as session:
+            rows, total_count = await personas_plan.fetch_page(session, filters, offset, limit, sort_by, sort_order,
+                                                               after, estimate_count)
+            personas = [from_row(PersonaSchema, persona) for persona in rows]
 
-            # Get total count
-            count_query = select(func.count()).select_from(Persona)
-            if filters:
-                for key, value in filters.items():
-                    if key == 'name':
-                        count_query = count_query.filter(Persona.name.ilike(f"%{value}%"))
-                    elif isinstance(value, list):
-                        count_query = count_query.filter(getattr(Persona, key).in_(value))
-                    else:
-                        count_query = count_query.filter(getattr(Persona, key) == value)
+            return personas, total_count
 
-            total_count = await session.execute(count_query)
-            total_count = total_count.scalar()
+    # Streams every persona matching filters for exports.
+    # Filters are validated (raising ValueError) before anything is streamed.
+    def export_personas(self, filters: Optional[Dict[str, Any]] = None):
+        shape, params = personas_plan.parse_filters(filters)
 
-            return personas, total_count
\ No newline at end of file
+        async def personas():
+            async with db_read_context() as session:
+                async for persona in stream_rows(session, personas_plan.statement(shape), Persona, params):
+                    yield from_row(PersonaSchema, persona)
+        return personas()
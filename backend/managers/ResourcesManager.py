@@ -1,11 +1,15 @@
 from uuid import uuid4
 from threading import Lock
-from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy import delete
 from backend.models import Resource
-from backend.db import db_session_context
+from backend.db import db_read_context, db_write
+from backend.queries import QueryPlan, stream_rows, bulk_insert, bulk_update, bulk_delete, insert_returning, update_returning, select_columns, from_row
 from backend.schemas import ChannelCreateSchema, ChannelSchema
 from typing import List, Tuple, Optional, Dict, Any
 
+resource_fields = ['id', 'name', 'uri']
+resources_plan = QueryPlan(Resource, filterable=resource_fields, sortable=resource_fields)
+
 class ResourcesManager:
     _instance = None
     _lock = Lock()
@@ -25,70 +29,66 @@ class ResourcesManager:
                     self._initialized = True
 
     async def create_resource(self, resource_data: ChannelCreateSchema) -> ChannelSchema:
-        async with db_session_context() as session:
-            new_resource = Resource(id=str(uuid4()), **resource_data.model_dump())
-            session.add(new_resource)
-            await session.commit()
-            await session.refresh(new_resource)
-            return ChannelSchema(id=new_resource.id, **resource_data.model_dump())
+        async def write(session):
+            return ChannelSchema(**await insert_returning(session, Resource, dict(id=str(uuid4()), **resource_data.model_dump())))
+        return await db_write(write)
 
     async def update_resource(self, id: str, resource_data: ChannelCreateSchema) -> Optional[ChannelSchema]:
-        async with db_session_context() as session:
-            stmt = update(Resource).where(Resource.id == id).values(**resource_data.dict())
-            result = await session.execute(stmt)
-            if result.rowcount > 0:
-                await session.commit()
-                updated_resource = await session.get(Resource, id)
-                return ChannelSchema(id=updated_resource.id, **resource_data.model_dump())
-            return None
+        async def write(session):
+            row = await update_returning(session, Resource, id, resource_data.model_dump())
+            return ChannelSchema(**row) if row else None
+        return await db_write(write)
 
     async def delete_resource(self, id: str) -> bool:
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Resource).where(Resource.id == id)
             result = await session.execute(stmt)
-            await session.commit()
             return result.rowcount > 0
+        return await db_write(write)
 
-    async def retrieve_resource(self, id: str) -> Optional[ChannelSchema]:
-        async with db_session_context() as session:
-            result = await session.execute(select(Resource).filter(Resource.id == id))
-            resource = result.scalar_one_or_none()
-            if resource:
-                return ChannelSchema(id=resource.id, name=resource.name, uri=resource.uri)
-            return None
-
-    async def retrieve_resources(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None, 
-                                sort_order: str = 'asc', filters: Optional[Dict[str, Any]] = None) -> Tuple[List[ChannelSchema], int]:
-        async with db_session_context() as session:
-            query = select(Resource)
+    # Bulk versions of the above, returning per-item results in order: the new
+    # or updated resource (None if it failed or wasn't found) or whether it was deleted
+    async def create_resources(self, resources_data: List[ChannelCreateSchema]) -> List[Optional[ChannelSchema]]:
+        resources = [ChannelSchema(id=str(uuid4()), **resource_data.model_dump()) for resource_data in resources_data]
+        async def write(session):
+            errors = await bulk_insert(session, Resource, [resource.model_dump() for resource in resources])
+            return [resource if error is None else None for resource, error in zip(resources, errors)]
+        return await db_write(write)
 
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        query = query.filter(getattr(Resource, key).in_(value))
-                    else:
-                        query = query.filter(getattr(Resource, key) == value)
+    async def update_resources(self, resources: List[ChannelSchema]) -> List[Optional[ChannelSchema]]:
+        async def write(session):
+            found = await bulk_update(session, Resource, [resource.model_dump() for resource in resources])
+            return [resource if exists else None for resource, exists in zip(resources, found)]
+        return await db_write(write)
 
-            if sort_by and sort_by in ['id', 'name', 'uri']:
-                order_column = getattr(Resource, sort_by)
-                query = query.order_by(order_column.desc() if sort_order.lower() == 'desc' else order_column)
+    async def delete_resources(self, ids: List[str]) -> List[bool]:
+        async def write(session):
+            return await bulk_delete(session, Resource, ids)
+        return await db_write(write)
 
-            query = query.offset(offset).limit(limit)
+    async def retrieve_resource(self, id: str) -> Optional[ChannelSchema]:
+        async with db_read_context() as session:
+            result = await session.execute(select_columns(Resource).filter(Resource.id == id))
+            resource = result.one_or_none()
+            return from_row(ChannelSchema, resource) if resource else None
 
-            result = await session.execute(query)
-            resources = [ChannelSchema(id=resource.id, name=resource.name, uri=resource.uri) 
-                        for resource in result.scalars().all()]
+    async def retrieve_resources(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None, 
+                                sort_order: str = 'asc', filters: Optional[Dict[str, Any]] = None,
+                                after: Optional[Dict[str, Any]] = None, estimate_count: bool = False) -> Tuple[List[ChannelSchema], int]:
+        async with db_read_context() as session:
+            rows, total_count = await resources_plan.fetch_page(session, filters, offset, limit, sort_by, sort_order,
+                                                                after, estimate_count)
+            resources = [from_row(ChannelSchema, resource) for resource in rows]
 
-            # Get total count
-            count_query = select(func.count()).select_from(Resource)
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        count_query = count_query.filter(getattr(Resource, key).in_(value))
-                    else:
-                        count_query = count_query.filter(getattr(Resource, key) == value)
+            return resources, total_count
 
-            total_count = await session.execute(count_query)
-            total_count = total_count.scalar()
+    # Streams every resource matching filters for exports.
+    # Filters are validated (raising ValueError) before anything is streamed.
+    def export_resources(self, filters: Optional[Dict[str, Any]] = None):
+        shape, params = resources_plan.parse_filters(filters)
 
-            return resources, total_count
+        async def resources():
+            async with db_read_context() as session:
+                async for resource in stream_rows(session, resources_plan.statement(shape), Resource, params):
+                    yield from_row(ChannelSchema, resource)
+        return resources()
@@ -1,12 +1,17 @@
 import secrets
 import string
 from threading import Lock
-from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from backend.models import Share
-from backend.db import db_session_context
+from backend.db import db_read_context, db_write
+from backend.queries import QueryPlan, stream_rows, bulk_insert, bulk_update, bulk_delete, chunks, insert_returning, update_returning, select_columns, from_row
 from backend.schemas import ShareCreateSchema, ShareSchema
 from typing import List, Tuple, Optional, Dict, Any
 
+share_fields = ['id', 'resource_id', 'user_id', 'expiration_dt', 'is_revoked']
+shares_plan = QueryPlan(Share, filterable=share_fields, sortable=share_fields)
+
 def generate_share_id(num_blocks = 3, block_size = 4):
     # `abcd-efgh-ijkl` format by default
     return '-'.join(''.join(secrets.choice(string.ascii_lowercase) for _ in range(block_size)) for _ in range(num_blocks))
@@ -30,87 +35,91 @@ class SharesManager:
                     self._initialized = True
 
     async def create_share(self, resource_id, user_id, expiration_dt, is_revoked=False) -> ShareSchema:
-        async with db_session_context() as session:
-            new_key = None
-            while not new_key:
-                new_key = generate_share_id()
-                result = await session.execute(select(Share).filter(Share.id == new_key))
-                share = result.scalar_one_or_none()
-                if share:  # new_key already in use
-                    new_key = None
-            new_share = Share(id=new_key, resource_id=resource_id, user_id=user_id,
-                              expiration_dt=expiration_dt, is_revoked=is_revoked)
-            session.add(new_share)
-            await session.commit()
-            await session.refresh(new_share)
-            return ShareSchema(id=new_share.id, resource_id=new_share.resource_id,
-                               user_id=new_share.user_id, expiration_dt=new_share.expiration_dt,
-                               is_revoked=new_share.is_revoked)
+        async def write(session):
+            # a generated id that's already in use inserts nothing, so try another
+            row = None
+            while not row:
+                row = await insert_returning(session, Share, dict(id=generate_share_id(), resource_id=resource_id,
+                                                                  user_id=user_id, expiration_dt=expiration_dt,
+                                                                  is_revoked=is_revoked),
+                                             stmt=sqlite_insert(Share.__table__).on_conflict_do_nothing(index_elements=['id']))
+            return ShareSchema(**row)
+        return await db_write(write)
 
     async def update_share(self, id: str, resource_id, user_id, expiration_dt, is_revoked) -> Optional[ShareSchema]:
-        async with db_session_context() as session:
-            stmt = update(Share).where(Share.id == id).values(resource_id=resource_id,
-                                                                user_id=user_id,
-                                                                expiration_dt=expiration_dt,
-                                                                is_revoked=is_revoked)
-            result = await session.execute(stmt)
-            if result.rowcount > 0:
-                await session.commit()
-                updated_share = await session.get(Share, id)
-                return ShareSchema(id=updated_share.id, resource_id=updated_share.resource_id,
-                               user_id=updated_share.user_id, expiration_dt=updated_share.expiration_dt,
-                               is_revoked=updated_share.is_revoked)
-            return None
+        async def write(session):
+            row = await update_returning(session, Share, id, dict(resource_id=resource_id, user_id=user_id,
+                                                                  expiration_dt=expiration_dt, is_revoked=is_revoked))
+            return ShareSchema(**row) if row else None
+        return await db_write(write)
 
     async def delete_share(self, id: str) -> bool:
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(Share).where(Share.id == id)
             result = await session.execute(stmt)
-            await session.commit()
             return result.rowcount > 0
+        return await db_write(write)
+
+    # Bulk versions of the above, returning per-item results in order: the new
+    # or updated share (None if it failed or wasn't found) or whether it was deleted
+    async def create_shares(self, shares_data: List[ShareCreateSchema]) -> List[Optional[ShareSchema]]:
+        async def write(session):
+            # generate unique keys, regenerating any already in use
+            keys = [generate_share_id() for _ in shares_data]
+            while True:
+                in_use = set()
+                for chunk in chunks(keys):
+                    in_use.update((await session.execute(select(Share.id).where(Share.id.in_(chunk)))).scalars())
+                if not in_use and len(set(keys)) == len(keys):
+                    break
+                seen = set()
+                for i, key in enumerate(keys):
+                    if key in in_use or key in seen:
+                        keys[i] = generate_share_id()
+                    seen.add(keys[i])
+            # dict() rather than model_dump(), which would serialize e.g. a user_id of None as ""
+            shares = [ShareSchema(id=key, **dict(share_data)) for key, share_data in zip(keys, shares_data)]
+            errors = await bulk_insert(session, Share, [dict(share) for share in shares])
+            return [share if error is None else None for share, error in zip(shares, errors)]
+        return await db_write(write)
+
+    async def update_shares(self, shares: List[ShareSchema]) -> List[Optional[ShareSchema]]:
+        async def write(session):
+            # only the fields given are updated, as with model_dump(exclude_unset=True), but with
+            # their values rather than model_dump's serialized ones (e.g. a user_id of None as "")
+            found = await bulk_update(session, Share, [{field: getattr(share, field) for field in share.model_fields_set}
+                                                      for share in shares])
+            return [share if exists else None for share, exists in zip(shares, found)]
+        return await db_write(write)
+
+    async def delete_shares(self, ids: List[str]) -> List[bool]:
+        async def write(session):
+            return await bulk_delete(session, Share, ids)
+        return await db_write(write)
 
     async def retrieve_share(self, id: str) -> Optional[ShareSchema]:
-        async with db_session_context() as session:
-            result = await session.execute(select(Share).filter(Share.id == id))
-            share = result.scalar_one_or_none()
-            if share:
-                return ShareSchema(id=share.id, resource_id=share.resource_id, user_id=share.user_id,
-                                   expiration_dt=share.expiration_dt, is_revoked=share.is_revoked)
-            return None
+        async with db_read_context() as session:
+            result = await session.execute(select_columns(Share).filter(Share.id == id))
+            share = result.one_or_none()
+            return from_row(ShareSchema, share) if share else None
 
     async def retrieve_shares(self, offset: int = 0, limit: int = 100, sort_by: Optional[str] = None,
-                              sort_order: str = 'asc', filters: Optional[Dict[str, Any]] = None) -> Tuple[List[ShareSchema], int]:
-        async with db_session_context() as session:
-            query = select(Share)
-
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        query = query.filter(getattr(Share, key).in_(value))
-                    else:
-                        query = query.filter(getattr(Share, key) == value)
-
-            if sort_by and sort_by in ['id', 'resource_id', 'user_id', 'expiration_dt', 'is_revoked']:
-                order_column = getattr(Share, sort_by)
-                query = query.order_by(order_column.desc() if sort_order.lower() == 'desc' else order_column)
-
-            query = query.offset(offset).limit(limit)
-
-            result = await session.execute(query)
-            shares = [ShareSchema(id=share.id, resource_id=share.resource_id, user_id=share.user_id,
-                                  expiration_dt=share.expiration_dt, is_revoked=share.is_revoked) 
-                        for share in result.scalars().all()]
-
-            # Get total count
-            count_query = select(func.count()).select_from(Share)
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        count_query = count_query.filter(getattr(Share, key).in_(value))
-                    else:
-                        count_query = count_query.filter(getattr(Share, key) == value)
-
-            total_count = await session.execute(count_query)
-            total_count = total_count.scalar()
+                              sort_order: str = 'asc', filters: Optional[Dict[str, Any]] = None,
+                              after: Optional[Dict[str, Any]] = None, estimate_count: bool = False) -> Tuple[List[ShareSchema], int]:
+        async with db_read_context() as session:
+            rows, total_count = await shares_plan.fetch_page(session, filters, offset, limit, sort_by, sort_order,
+                                                             after, estimate_count)
+            shares = [from_row(ShareSchema, share) for share in rows]
 
             return shares, total_count
+
+    # Streams every share matching filters for exports.
+    # Filters are validated (raising ValueError) before anything is streamed.
+    def export_shares(self, filters: Optional[Dict[str, Any]] = None):
+        shape, params = shares_plan.parse_filters(filters)
+
+        async def shares():
+            async with db_read_context() as session:
+                async for share in stream_rows(session, shares_plan.statement(shape), Share, params):
+                    yield from_row(ShareSchema, share)
+        return shares()
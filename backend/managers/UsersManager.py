@@ -1,11 +1,15 @@
 from uuid import uuid4
 from threading import Lock
-from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy import select, update, delete
 from backend.models import User
-from backend.db import db_session_context
+from backend.db import db_read_context, db_write
+from backend.queries import QueryPlan, from_row
 from backend.schemas import UserSchema
 from backend.managers.CasbinRoleManager import CasbinRoleManager
 
+user_fields = ['id', 'name', 'email']
+users_plan = QueryPlan(User, filterable=user_fields, sortable=user_fields)
+
 class UsersManager:
     _instance = None
     _lock = Lock()
@@ -25,67 +29,36 @@ class UsersManager:
                     self._initialized = True
 
     async def create_user(self, name, email):
-        async with db_session_context() as session:
+        async def write(session):
             new_user = User(id=str(uuid4()), name=name, email=email)
             session.add(new_user)
-            await session.commit()
             return new_user.id
+        return await db_write(write)
 
     async def update_user(self, id, name, email):
-        async with db_session_context() as session:
+        async def write(session):
             stmt = update(User).where(User.id == id).values(name=name, email=email)
             await session.execute(stmt)
-            await session.commit()
+        await db_write(write)
 
     async def delete_user(self, id):
-        async with db_session_context() as session:
+        async def write(session):
             stmt = delete(User).where(User.id == id)
             await session.execute(stmt)
-            await session.commit()
+        await db_write(write)
 
     async def retrieve_user(self, id):
-        async with db_session_context() as session:
+        async with db_read_context() as session:
             result = await session.execute(select(User).filter(User.id == id))
             user = result.scalar_one_or_none()
             cb = CasbinRoleManager()
             return UserSchema(id=user.id, name=user.name, email=user.email, role=cb.get_user_roles(user.id, "ADMIN_PORTAL")) if user else None
 
-    async def retrieve_users(self, offset=0, limit=100, sort_by=None, sort_order='asc', filters=None):
-        async with db_session_context() as session:
-            query = select(User)
-
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        query = query.filter(getattr(User, key).in_(value))
-                    else:
-                        query = query.filter(getattr(User, key) == value)
-
-            if sort_by and sort_by in ['id', 'name', 'email']:
-                order_column = getattr(User, sort_by)
-                query = query.order_by(order_column.desc() if sort_order.lower() == 'desc' else order_column)
-
-            query = query.offset(offset).limit(limit)
-
-            result = await session.execute(query)
-            cb = CasbinRoleManager()
-            users = [UserSchema(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                role=cb.get_user_roles(user.id, "ADMIN_PORTAL")
-            ) for user in result.scalars().all()]
-
-            # Get total count
-            count_query = select(func.count()).select_from(User)
-            if filters:
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        count_query = count_query.filter(getattr(User, key).in_(value))
-                    else:
-                        count_query = count_query.filter(getattr(User, key) == value)
-
-            total_count = await session.execute(count_query)
-            total_count = total_count.scalar()
+    async def retrieve_users(self, offset=0, limit=100, sort_by=None, sort_order='asc', filters=None, after=None, estimate_count=False):
+        async with db_read_context() as session:
+            rows, total_count = await users_plan.fetch_page(session, filters, offset, limit, sort_by, sort_order,
+                                                            after, estimate_count)
+            roles = CasbinRoleManager().get_users_roles([user.id for user in rows], "ADMIN_PORTAL")
+            users = [from_row(UserSchema, user, role=roles[user.id]) for user in rows]
 
             return users, total_count
\ No newline at end of file
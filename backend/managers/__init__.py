@@ -1,28 +1,42 @@
-from .AbilitiesManager import AbilitiesManager
-from .AssetsManager import AssetsManager
-from .ResourcesManager import ResourcesManager
-from .ConfigManager import ConfigManager
-from .DownloadsManager import DownloadsManager
-from .UsersManager import UsersManager
-from .PersonasManager import PersonasManager
-from .AuthManager import AuthManager
-from .CasbinRoleManager import CasbinRoleManager
+import importlib
+from collections.abc import Mapping
 
-# List of manager classes
-manager_classes = [
-    AbilitiesManager,
-    AssetsManager,
-    ResourcesManager,
-    ConfigManager,
-    DownloadsManager,
-    UsersManager,
-    AuthManager,
-    PersonasManager,
-    CasbinRoleManager
+# Names of the manager classes, each defined in the module of the same name
+manager_names = [
+    'AbilitiesManager',
+    'AssetsManager',
+    'ResourcesManager',
+    'ConfigManager',
+    'DownloadsManager',
+    'UsersManager',
+    'AuthManager',
+    'PersonasManager',
+    'CasbinRoleManager'
 ]
 
-# Initialize the managers dynamically
-managers = {cls.__name__.lower(): cls() for cls in manager_classes}
+# Managers are imported and initialized on first use rather than when this
+# package is imported (which happens whenever any one manager is imported), so
+# startup only pays for the managers it actually needs
+class LazyManagers(Mapping):
+    def __init__(self):
+        self._managers = {}
 
-# Expose the initialized managers for easy access as e.g. backend.managers.managers['abilitiesmanager']
-__all__ = ['managers'] + list(managers.keys())
+    def __getitem__(self, key):
+        if key not in self._managers:
+            names = {name.lower(): name for name in manager_names}
+            if key not in names:
+                raise KeyError(key)
+            module = importlib.import_module(f'.{names[key]}', __name__)
+            self._managers[key] = getattr(module, names[key])()
+        return self._managers[key]
+
+    def __iter__(self):
+        return (name.lower() for name in manager_names)
+
+    def __len__(self):
+        return len(manager_names)
+
+# The managers by lower case name, for easy access as e.g. backend.managers.managers['abilitiesmanager']
+managers = LazyManagers()
+
+__all__ = ['managers', 'manager_names']
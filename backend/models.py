@@ -1,6 +1,7 @@
 from uuid import uuid4
 from datetime import datetime
 from sqlmodel import Field, Relationship
+from sqlalchemy import Index, text
 from backend.db import SQLModelBase
 from typing import List, Optional, ForwardRef
 
@@ -31,7 +32,7 @@ class User(SQLModelBase, table=True):
 class Cred(SQLModelBase, table=True):
     id: str = Field(primary_key=True, default_factory=lambda: str(uuid4()))
     public_key: str = Field()
-    webauthn_user_id: str = Field(foreign_key="user.webauthn_user_id")
+    webauthn_user_id: str = Field(foreign_key="user.webauthn_user_id", index=True)
     backed_up: str = Field()
     name: str | None = Field(default=None)
     transports: str = Field()
@@ -39,8 +40,8 @@ class Cred(SQLModelBase, table=True):
 
 class Session(SQLModelBase, table=True):
     id: str = Field(primary_key=True, default_factory=lambda: str(uuid4()))
-    user_id: str = Field(foreign_key="user.id")
-    token: str = Field()
+    user_id: str = Field(foreign_key="user.id", index=True)
+    token: str = Field(index=True)
     expires_at: datetime = Field()
     user: User = Relationship(back_populates="sessions")
 
@@ -60,6 +61,11 @@ class Persona(SQLModelBase, table=True):
     face_id: str | None = Field(default=None)
 
 class Share(SQLModelBase, table=True):
+    __table_args__ = (
+        Index('ix_share_resource_id_expiration_dt', 'resource_id', 'expiration_dt'),
+        Index('ix_share_user_id', 'user_id', sqlite_where=text('user_id IS NOT NULL')),
+        Index('ix_share_expiration_dt', 'expiration_dt', sqlite_where=text('expiration_dt IS NOT NULL')),
+    )
     id: str = Field(primary_key=True)  # the short URL tag, eg abcd-efgh-ijkl
     resource_id: str = Field(foreign_key="resource.id")  # the bot ID
     user_id: str | None = Field(default=None)  # the user granted access (optional)
@@ -1,4 +1,7 @@
 import json
+import base64
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, and_, or_, bindparam
 from starlette.responses import JSONResponse
 
 def parse_pagination_params(filter=None, range=None, sort=None):
@@ -34,3 +37,93 @@ def parse_pagination_params(filter=None, range=None, sort=None):
 
     except (ValueError, TypeError):
         return JSONResponse({"error": "Invalid query parameter format"}, status_code=400)
+
+# Keyset (cursor) pagination: the cursor is an opaque token holding the sort
+# and the sort column value + id of the last row returned, which managers use
+# to seek straight to the next page instead of counting through an OFFSET. It
+# also carries the position of the page it leads to (how many rows came
+# before), which is only reported (in Content-Range), never used to seek.
+
+def encode_cursor(sort_by, sort_order, value, id, position=0):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, id, position], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def parse_cursor(cursor):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_by, sort_order, value, id, position = json.loads(payload)
+        if sort_order.lower() not in ('asc', 'desc') or not isinstance(id, str):
+            raise ValueError
+        if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+            raise ValueError
+        return {"sort_by": sort_by, "sort_order": sort_order, "value": value, "id": id, "position": position}
+    except (ValueError, TypeError, AttributeError):
+        return JSONResponse({"error": "Invalid cursor"}, status_code=400)
+
+# position is that of the page items came from
+def next_cursor(items, limit, sort_by, sort_order, position=0):
+    # A short page is the last page
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(sort_by, sort_order, getattr(last, sort_by, None) if sort_by else None, last.id,
+                         position + len(items))
+
+# Converts value (from a filter or cursor) for column: an ISO 8601 string for a
+# date/time column is parsed (naive values are taken as UTC), and anything else
+# that isn't a date/time raises ValueError. Columns are checked by their type's
+# implementation, as python_type is object for sqlmodel's UTCDateTime.
+def coerce_value(column, value):
+    if value is None or not isinstance(getattr(column.type, 'impl', column.type), DateTime):
+        return value
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid date/time: {value}")
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid date/time: {value}")
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+# Bind parameters for seeking past a cursor's last row (see apply_sort)
+def cursor_params(model, sort_by, after):
+    value = after["value"]
+    if sort_by and sort_by != 'id':
+        value = coerce_value(getattr(model, sort_by), value)
+    return {"after_id": after["id"], "after_value": value}
+
+# Orders stmt by the sort column with the id as a tie-breaker (so pages are
+# stable) and, if a cursor is given, seeks past its last row. The cursor values
+# are bound as after_id/after_value, so a built statement can be reused for
+# other cursors with the same shape (sort and whether the value is NULL) and is
+# executed with cursor_params().
+def apply_sort(stmt, model, sort_by, sort_order, after=None):
+    descending = sort_order.lower() == 'desc'
+    sort_column = getattr(model, sort_by) if sort_by and sort_by != 'id' else None
+
+    if after:
+        after_id = bindparam("after_id")
+        seek = model.id < after_id if descending else model.id > after_id
+        if sort_column is not None:
+            value = bindparam("after_value", type_=sort_column.type)
+            # SQLite sorts NULLs first, so they come first ascending and last descending
+            if after["value"] is None:
+                if descending:
+                    seek = and_(sort_column.is_(None), seek)
+                else:
+                    seek = or_(sort_column.is_not(None), and_(sort_column.is_(None), seek))
+            elif descending:
+                seek = or_(sort_column < value, sort_column.is_(None), and_(sort_column == value, seek))
+            else:
+                seek = or_(sort_column > value, and_(sort_column == value, seek))
+        stmt = stmt.filter(seek)
+
+    order_columns = ([sort_column] if sort_column is not None else []) + [model.id]
+    return stmt.order_by(*[column.desc() if descending else column for column in order_columns])
+
+# Clients can opt out of exact counts for huge tables by sending an
+# `X-Total-Count: estimate` request header
+def estimate_count_requested(request):
+    return request.headers.get('X-Total-Count', '').lower() == 'estimate'
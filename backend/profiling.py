@@ -0,0 +1,60 @@
+# Startup profiler for python -m backend --profile-startup: creates the app in
+# a fresh interpreter run with -X importtime and reports how long each manager
+# took to import and initialize, the total time to create the app and the
+# slowest modules to import (cumulative, i.e. including their own imports).
+import json
+import subprocess
+import sys
+from common.paths import base_dir
+
+# Runs in the child interpreter. Managers are timed first so each one's import
+# time is what it costs on top of the managers before it.
+def measure():
+    import importlib
+    import time
+    start = time.perf_counter()
+    from backend.managers import manager_names
+    managers = {}
+    for name in manager_names:
+        started = time.perf_counter()
+        manager_class = getattr(importlib.import_module(f'backend.managers.{name}'), name)
+        imported = time.perf_counter()
+        manager_class()
+        managers[name] = {'import': imported - started, 'init': time.perf_counter() - imported}
+    started = time.perf_counter()
+    from app import create_app
+    create_app()
+    finished = time.perf_counter()
+    print(json.dumps({'managers': managers, 'create_app': finished - started, 'total': finished - start}))
+
+# Parses -X importtime output into {module: (self seconds, cumulative seconds)}
+def parse_importtime(output):
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        imports[module.strip()] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return imports
+
+def profile_startup(top=25):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             'from backend.profiling import measure; measure()'],
+                            cwd=base_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+
+    print(f"{'manager':<20} {'import ms':>10} {'init ms':>10}")
+    for name, timing in timings['managers'].items():
+        print(f"{name:<20} {1000 * timing['import']:10.1f} {1000 * timing['init']:10.1f}")
+    print(f"\ncreate_app (after the managers): {1000 * timings['create_app']:.0f}ms")
+    print(f"total: {1000 * timings['total']:.0f}ms\n")
+
+    print(f"{'module':<60} {'self ms':>10} {'cumulative ms':>14}")
+    slowest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    for module, (own, cumulative) in slowest:
+        print(f"{module:<60} {1000 * own:10.1f} {1000 * cumulative:14.1f}")
+    return 0
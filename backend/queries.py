@@ -0,0 +1,316 @@
+# query helper functions shared by the managers
+import os
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from backend.pagination import apply_sort, coerce_value, cursor_params
+
+logger = logging.getLogger(__name__)
+
+# Read paths select a model's columns rather than the ORM entity, so rows come
+# back as plain Row tuples (with attribute access by column name) and skip
+# building ORM instances and tracking them in the session's identity map
+def select_columns(model):
+    return select(*model.__table__.columns)
+
+# Rows read back from our own database already match their schemas, so read
+# paths build schemas from them without pydantic validation, which is most of
+# the cost of turning a large page into schemas. (model_construct() skips
+# validation too, but fills in defaults field by field in Python and ends up
+# slower than validating.) PAIOS_VALIDATE_ROWS=1 validates them anyway, e.g. to
+# catch a schema that no longer matches its table while debugging.
+validate_rows = os.environ.get('PAIOS_VALIDATE_ROWS', '').lower() in ('1', 'true', 'yes')
+
+# Returns schema built from row's columns, with values overriding or adding to them
+def from_row(schema, row, **values):
+    values = {name: values[name] if name in values else getattr(row, name) for name in schema.model_fields}
+    if validate_rows:
+        return schema.model_validate(values)
+    model = schema.__new__(schema)
+    object.__setattr__(model, '__dict__', values)
+    object.__setattr__(model, '__pydantic_fields_set__', set(values))
+    object.__setattr__(model, '__pydantic_extra__', None)
+    object.__setattr__(model, '__pydantic_private__', None)
+    return model
+
+# Builds the statement for one page of stmt (a select of model with any filters
+# applied), fetching the total count in the same round trip rather than
+# repeating the query in a second SELECT count(). Filtered queries are counted
+# with COUNT(*) OVER () alongside the page. Unfiltered queries use an
+# uncorrelated count subquery instead, which SQLite evaluates once with its
+# fast whole-table count (a window over every row of a big table is far
+# slower). With estimate_count the count is skipped entirely and the total is
+# estimated from the page ("at least this many"), for huge tables.
+# The offset, limit and cursor are bind parameters (see page_params) so the
+# statement can be cached and reused for any page of the same shape.
+def page_statement(stmt, model, offset=0, limit=100, sort_by=None, sort_order='asc',
+                   after=None, estimate_count=False):
+    if estimate_count:
+        page = apply_sort(stmt, model, sort_by, sort_order, after)
+        return page.offset(bindparam('offset', offset)).limit(bindparam('limit', limit + 1))
+
+    if stmt.whereclause is None:
+        total_count = select(func.count()).select_from(model).scalar_subquery().label('total_count')
+        page = apply_sort(stmt.add_columns(total_count), model, sort_by, sort_order, after)
+    elif after:
+        # the total has to be counted before seeking past the cursor
+        counted = stmt.add_columns(func.count().over().label('total_count')).subquery()
+        page = apply_sort(select(counted), counted.c, sort_by, sort_order, after)
+    else:
+        page = apply_sort(stmt.add_columns(func.count().over().label('total_count')), model, sort_by, sort_order)
+    return page.offset(bindparam('offset', offset)).limit(bindparam('limit', limit))
+
+# With a cursor, offset is the cursor's position, which is only reported: the
+# page starts right after the cursor's row rather than offset rows in
+def page_params(model, offset=0, limit=100, sort_by=None, after=None, estimate_count=False):
+    params = {'offset': 0 if after else offset, 'limit': limit + 1 if estimate_count else limit}
+    if after:
+        params.update(cursor_params(model, sort_by, after))
+    return params
+
+# Returns (rows, total_count) for a page statement built by page_statement().
+# The rows are those of the statement (see select_columns), plus a total_count
+# column unless the count was estimated.
+async def execute_page(session, page, stmt, params, offset=0, limit=100, after=None, estimate_count=False):
+    if estimate_count:
+        rows = (await session.execute(page, params)).all()
+        return rows[:limit], offset + len(rows)
+
+    rows = (await session.execute(page, params)).all()
+    if rows:
+        return rows, rows[0].total_count
+    if offset == 0 and not after:
+        return [], 0
+
+    # past the end of the results there are no rows to carry the count
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    return [], (await session.execute(count_stmt, params)).scalar()
+
+# Returns (rows, total_count) for one page of stmt. params are any bind
+# parameters used by stmt's filters.
+async def fetch_page(session, stmt, model, offset=0, limit=100, sort_by=None, sort_order='asc',
+                     after=None, estimate_count=False, params=None):
+    page = page_statement(stmt, model, offset, limit, sort_by, sort_order, after, estimate_count)
+    params = {**(params or {}), **page_params(model, offset, limit, sort_by, after, estimate_count)}
+    return await execute_page(session, page, stmt, params, offset, limit, after, estimate_count)
+
+# Yields every row of stmt in sort order (by id by default) from a server-side
+# cursor, fetching stream_chunk_size rows at a time, so exporting a large table
+# holds one chunk in memory rather than the whole result
+stream_chunk_size = 500
+
+async def stream_rows(session, stmt, model, params=None, sort_by=None, sort_order='asc'):
+    stmt = apply_sort(stmt, model, sort_by, sort_order).execution_options(yield_per=stream_chunk_size)
+    result = await session.stream(stmt, params)
+    async for row in result:
+        yield row
+
+# Filter operators, used as a suffix on the filter key, e.g. {"expiration_dt_gte": ...}.
+# A list value is matched with `in` and anything else with `eq`.
+filter_operators = ('eq', 'in', 'gte', 'lte', 'prefix', 'contains')
+
+# A query plan for listing a model: filters are validated against a whitelist
+# of fields and turned into a "shape" (the fields and operators used), and the
+# statements for each shape are built once and cached, with the filter values,
+# offset, limit and cursor passed as bind parameters. That saves rebuilding
+# (and re-keying for SQLAlchemy's compiled cache) the same statement from
+# scratch on every request.
+class QueryPlan:
+    def __init__(self, model, filterable, sortable, default_operators=None, cache_size=256):
+        self.model = model
+        self.filterable = tuple(filterable)
+        self.sortable = tuple(sortable)
+        self.default_operators = default_operators or {}  # e.g. {'name': 'contains'}
+        self.statement = lru_cache(maxsize=cache_size)(self._build_statement)
+        self.page = lru_cache(maxsize=cache_size)(self._build_page)
+
+    def sort_key(self, sort_by):
+        return sort_by if sort_by in self.sortable else None
+
+    # Returns the shape (a tuple of (field, operator) pairs) and the bind
+    # parameters for filters, or raises ValueError for an unknown field or operator
+    def parse_filters(self, filters):
+        if filters is not None and not isinstance(filters, dict):
+            raise ValueError("Invalid filter format")
+        shape, params = [], {}
+        for key, value in (filters or {}).items():
+            field, operator = key, None
+            if key not in self.filterable and '_' in key:
+                field, operator = key.rsplit('_', 1)
+            if field not in self.filterable or (operator and operator not in filter_operators):
+                raise ValueError(f"Invalid filter: {key}")
+            if operator is None:
+                operator = 'in' if isinstance(value, list) else self.default_operators.get(field, 'eq')
+            if operator == 'in' and not isinstance(value, list):
+                value = [value]
+
+            name = f"filter_{field}_{operator}"
+            column = getattr(self.model, field)
+            if operator == 'in':
+                params[name] = [coerce_value(column, v) for v in value]
+            elif operator == 'prefix':
+                params[name] = str(value)
+                params[f"{name}_end"] = str(value) + '\U0010ffff'
+            elif operator == 'contains':
+                params[name] = f"%{value}%"
+            else:
+                params[name] = coerce_value(column, value)
+            shape.append((field, operator))
+        return tuple(sorted(shape)), params
+
+    def _build_statement(self, shape):
+        stmt = select_columns(self.model)
+        for field, operator in shape:
+            column = getattr(self.model, field)
+            name = f"filter_{field}_{operator}"
+            if operator == 'in':
+                stmt = stmt.filter(column.in_(bindparam(name, expanding=True)))
+            elif operator == 'gte':
+                stmt = stmt.filter(column >= bindparam(name, type_=column.type))
+            elif operator == 'lte':
+                stmt = stmt.filter(column <= bindparam(name, type_=column.type))
+            elif operator == 'prefix':
+                # a range rather than LIKE so it can use an index on the column
+                stmt = stmt.filter(column >= bindparam(name), column < bindparam(f"{name}_end"))
+            elif operator == 'contains':
+                stmt = stmt.filter(column.ilike(bindparam(name)))
+            else:
+                stmt = stmt.filter(column == bindparam(name, type_=column.type))
+        return stmt
+
+    def _build_page(self, shape, sort_by, sort_order, cursor_shape, estimate_count):
+        # cursor_shape is None (no cursor), or whether the cursor's sort value is
+        # NULL. The placeholder values are replaced by page_params when executed.
+        after = None if cursor_shape is None else {"id": '', "value": None if cursor_shape else ''}
+        return page_statement(self.statement(shape), self.model, 0, 0, sort_by, sort_order, after, estimate_count)
+
+    # Returns (rows, total_count) for one page of the model matching filters
+    async def fetch_page(self, session, filters=None, offset=0, limit=100, sort_by=None, sort_order='asc',
+                         after=None, estimate_count=False):
+        shape, params = self.parse_filters(filters)
+        sort_by = self.sort_key(sort_by)
+        sort_order = 'desc' if sort_order.lower() == 'desc' else 'asc'
+        cursor_shape = None if not after else after["value"] is None
+        page = self.page(shape, sort_by, sort_order, cursor_shape, estimate_count)
+        params.update(page_params(self.model, offset, limit, sort_by, after, estimate_count))
+        return await execute_page(session, page, self.statement(shape), params, offset, limit, after, estimate_count)
+
+# Bulk writes: each helper runs one multi-row statement (executemany) per chunk
+# of rows rather than a statement (and commit) per row, and is meant to be used
+# inside a db_write unit. Chunks keep IN lists under SQLite's variable limit.
+bulk_chunk_size = 500
+
+def chunks(items, size=bulk_chunk_size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# Inserts rows (dicts of column values including the id). Returns a list with
+# None for each inserted row, or the error that row failed with: if the batch
+# fails it is retried row by row, each in its own SAVEPOINT, to find out which.
+async def bulk_insert(session, model, rows):
+    if not rows:
+        return []
+    try:
+        async with session.begin_nested():
+            await session.execute(insert(model.__table__), rows)
+        return [None] * len(rows)
+    except IntegrityError:
+        errors = []
+        for row in rows:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(model.__table__), row)
+                errors.append(None)
+            except IntegrityError as e:
+                errors.append(e)
+        return errors
+
+# Updates rows (dicts of column values including the id) by primary key.
+# Returns whether each row existed (and so was updated).
+async def bulk_update(session, model, rows):
+    existing = set()
+    for chunk in chunks([row['id'] for row in rows]):
+        existing.update((await session.execute(select(model.id).where(model.id.in_(chunk)))).scalars())
+    found = [row for row in rows if row['id'] in existing]
+    if found:
+        await session.execute(update(model), found)
+    return [row['id'] in existing for row in rows]
+
+# Deletes rows by id. Returns whether each id existed (and so was deleted).
+async def bulk_delete(session, model, ids):
+    deleted = set()
+    for chunk in chunks(ids):
+        deleted.update((await session.execute(delete(model).where(model.id.in_(chunk)).returning(model.id))).scalars())
+    return [id in deleted for id in ids]
+
+# Single row writes that return the written row (a dict of column values) from
+# the same statement with RETURNING (SQLite >= 3.35), rather than following up
+# with a refresh or get. They use the table rather than the ORM entity so the
+# session's identity map is left alone. stmt can be e.g. a dialect specific
+# insert (for ON CONFLICT); insert_returning returns None if nothing was inserted.
+async def insert_returning(session, model, values, stmt=None):
+    stmt = (stmt if stmt is not None else insert(model.__table__)).values(**values)
+    result = await session.execute(stmt.returning(*model.__table__.columns))
+    row = result.one_or_none()
+    return dict(row._mapping) if row else None
+
+# Updates the row with the given id. Returns None if there's no such row.
+async def update_returning(session, model, id, values):
+    table = model.__table__
+    stmt = update(table).where(table.c.id == id).values(**values).returning(*table.columns)
+    row = (await session.execute(stmt)).one_or_none()
+    return dict(row._mapping) if row else None
+
+# The hot lookups each manager runs, by manager. check_query_plans() makes sure
+# none of them has regressed to a full table scan (e.g. a missing index).
+def canonical_queries():
+    from backend.models import Asset, Cred, Session, Share, User
+    from backend.managers.AssetsManager import search_assets, fts_query
+    return {
+        'AuthManager': [
+            select(User).where(User.email == 'user@example.com'),
+            select(User).where(User.email == 'user@example.com', User.emailVerified == True),
+            select(Cred).filter(Cred.webauthn_user_id == 'webauthn-user-id'),
+            delete(Session).where(Session.token == 'token'),
+        ],
+        'UsersManager': [
+            select(User).filter(User.id == 'user-id'),
+        ],
+        'AssetsManager': [
+            select(Asset).filter(Asset.id == 'asset-id'),
+            search_assets(select(Asset), fts_query('search')),
+        ],
+        'SharesManager': [
+            select(Share).filter(Share.id == 'abcd-efgh-ijkl'),
+            select(Share).filter(Share.resource_id == 'resource-id'),
+            select(Share).filter(Share.user_id == 'user-id'),
+            select(Share).filter(Share.expiration_dt < datetime(2000, 1, 1, tzinfo=timezone.utc)),
+        ],
+    }
+
+# Runs EXPLAIN QUERY PLAN on each canonical query and logs a warning for any
+# full table scan. Returns the offending (manager, query, plan detail) tuples.
+def check_query_plans(connection=None):
+    if connection is None:
+        from backend.db import create_sync_engine
+        sync_engine = create_sync_engine()
+        try:
+            with sync_engine.connect() as connection:
+                return check_query_plans(connection)
+        finally:
+            sync_engine.dispose()
+
+    scans = []
+    for manager, statements in canonical_queries().items():
+        for stmt in statements:
+            compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+            for row in plan:
+                detail = row[-1]
+                # "SCAN <table>" without an index (virtual tables such as FTS5 do their own indexing)
+                if detail.startswith('SCAN ') and 'INDEX' not in detail and 'VIRTUAL TABLE' not in detail:
+                    logger.warning(f"{manager} query does a full table scan ({detail}): {' '.join(str(compiled).split())}")
+                    scans.append((manager, str(compiled), detail))
+    return scans
@@ -28,8 +28,8 @@ class ChannelSchema(ChannelBaseSchema):
 class PersonaBaseSchema(BaseModel):
     name: str
     description: Optional[str] = None
-    voice_id: str = None
-    face_id: str = None
+    voice_id: Optional[str] = None
+    face_id: Optional[str] = None
 
 class PersonaCreateSchema(PersonaBaseSchema):
     pass
@@ -0,0 +1,71 @@
+# OpenAPI spec cache: connexion parses the YAML and validates the spec (against
+# the OpenAPI schema) on every start, which is most of the time it takes to add
+# an API. load_spec() validates each version of a spec once and caches it as
+# JSON (much faster to load than YAML) under data/cache, keyed by a hash of the
+# spec file, so warm starts skip both. Use add_api inside prevalidated_spec()
+# so connexion doesn't validate it again.
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import yaml
+from contextlib import contextmanager
+from pathlib import Path
+from connexion.spec import Specification
+from common.paths import cache_dir
+
+logger = logging.getLogger(__name__)
+
+spec_cache_dir = cache_dir / 'openapi'
+
+# prevalidated_spec() switches validation off for the whole process, so specs
+# are only validated, or added without validation, while holding this lock
+spec_validation_lock = threading.Lock()
+
+def spec_cache_path(path: Path, source: bytes) -> Path:
+    return spec_cache_dir / f"{path.parent.name}-{path.stem}-{hashlib.sha256(source).hexdigest()[:16]}.json"
+
+# Returns the parsed and validated spec at path, from the cache if it's there.
+# Raises connexion's InvalidSpecification if the spec is invalid.
+def load_spec(path: Path) -> dict:
+    source = path.read_bytes()
+    cache_path = spec_cache_path(path, source)
+    try:
+        return json.loads(cache_path.read_bytes())
+    except (OSError, ValueError):
+        pass
+
+    # parse with libyaml if it's available (it's much faster)
+    spec = yaml.load(source, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    with spec_validation_lock:
+        Specification.from_dict(copy.deepcopy(spec))  # validates it
+    try:
+        spec_cache_dir.mkdir(parents=True, exist_ok=True)
+        # drop the cached versions of this spec before writing the new one
+        for stale in spec_cache_dir.glob(f"{path.parent.name}-{path.stem}-*.json"):
+            stale.unlink(missing_ok=True)
+        temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_text(json.dumps(spec, default=str))
+        os.replace(temp_path, cache_path)  # atomically, so a concurrent start never reads half a file
+    except OSError as e:
+        logger.warning(f"Couldn't cache the OpenAPI spec {path}: {e}")
+    return spec
+
+# Skips connexion's validation of specs added to an app inside this context.
+# connexion (3.x) has no option for this: Specification always validates in its
+# constructor, through the private classmethod _validate_spec, which is swapped
+# out here. If a later version drops it, specs are just validated again.
+@contextmanager
+def prevalidated_spec():
+    with spec_validation_lock:
+        validate = Specification.__dict__.get('_validate_spec')
+        if validate is None:
+            yield
+            return
+        Specification._validate_spec = classmethod(lambda cls, spec: None)
+        try:
+            yield
+        finally:
+            Specification._validate_spec = validate
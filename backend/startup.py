@@ -0,0 +1,48 @@
+# Startup pipeline: the independent parts of startup (migrations, loading the
+# abilities catalog, Casbin policy and OpenAPI spec) run
+# concurrently in threads, each stage starting as soon as the stages it depends
+# on have finished. The time each stage took is logged once they're all done.
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Runs stages, a list of (name, function, names of the stages it depends on),
+# which may only depend on stages listed before them. Returns each stage's
+# result by name, or raises the first stage's error if any failed (stages
+# depending on a failed stage don't run).
+def run_pipeline(stages, name='startup'):
+    names = set()
+    for stage, _, depends_on in stages:
+        unknown = [dependency for dependency in depends_on if dependency not in names]
+        if unknown:
+            raise ValueError(f"Stage {stage} depends on {', '.join(unknown)}, which must be listed before it")
+        names.add(stage)
+
+    futures, timings = {}, {}
+    start = time.perf_counter()
+
+    def run(stage, function, depends_on):
+        for dependency in depends_on:
+            futures[dependency].result()
+        started = time.perf_counter()
+        try:
+            return function()
+        finally:
+            timings[stage] = (started - start, time.perf_counter() - started)
+
+    # a thread per stage, so stages waiting on their dependencies can't starve the others
+    with ThreadPoolExecutor(max_workers=len(stages) or 1, thread_name_prefix=name) as executor:
+        for stage, function, depends_on in stages:
+            futures[stage] = executor.submit(run, stage, function, depends_on)
+        try:
+            return {stage: future.result() for stage, future in futures.items()}
+        finally:
+            log_timings(name, timings, time.perf_counter() - start)
+
+def log_timings(name, timings, elapsed):
+    serial = sum(duration for _, duration in timings.values())
+    logger.info(f"{name.capitalize()} took {1000 * elapsed:.0f}ms ({1000 * serial:.0f}ms if run one stage at a time)")
+    for stage, (started, duration) in sorted(timings.items(), key=lambda item: item[1][0]):
+        logger.info(f"  {stage:<16} {1000 * duration:7.1f}ms (started at +{1000 * started:.0f}ms)")
@@ -0,0 +1,86 @@
+import unittest
+import importlib.util
+import sqlite3
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import sqlite
+from backend.db import SQLModelBase
+from backend.models import Asset
+from backend.managers.AssetsManager import search_assets, fts_query
+from common.paths import base_dir
+
+class TestAssetSearch(unittest.TestCase):
+    # a scratch database with the asset table and its index, made by the real migrations
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.tmp.name) / "search.db"
+        engine = create_engine(f"sqlite:///{self.db_file}")
+        SQLModelBase.metadata.create_all(engine, tables=[Asset.__table__])
+        for name in ("added_asset_fts_table", "keyed_asset_fts_on_a_stable_key"):
+            path = next((base_dir / "migrations" / "versions").glob(f"*_{name}.py"))
+            spec = importlib.util.spec_from_file_location(name, path)
+            migration = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(migration)
+            with engine.begin() as conn:
+                with Operations.context(MigrationContext.configure(conn)):
+                    migration.upgrade()
+        engine.dispose()
+        self.connection = sqlite3.connect(self.db_file, isolation_level=None)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def search(self, query):
+        stmt = search_assets(select(Asset.id), fts_query(query))
+        sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+        return [id for id, in self.connection.execute(sql)]
+
+    def test_search_after_rowids_change(self):
+        assets = {f"word{i}": str(uuid4()) for i in range(10)}
+        for word, id in assets.items():
+            self.connection.execute("INSERT INTO asset (id, title, creator, subject, description) VALUES (?, ?, 'c', 's', 'd')",
+                                    (id, f"title {word}"))
+        # gaps in the rowids, which a copy of the table closes up
+        for word in list(assets)[::2]:
+            self.connection.execute("DELETE FROM asset WHERE id = ?", (assets.pop(word),))
+        self.connection.execute("UPDATE asset SET title = 'renamed word9' WHERE id = ?", (assets['word9'],))
+
+        self.connection.execute("VACUUM")
+        for word, id in assets.items():
+            self.assertEqual(self.search(word), [id])
+
+        # copying the table, as a migration rebuilding it does (this is SQLite's procedure for
+        # that, keeping its triggers), renumbers its rowids, closing up the gaps
+        rowid = self.connection.execute("SELECT rowid FROM asset WHERE id = ?", (assets['word9'],)).fetchone()
+        create = self.connection.execute("SELECT sql FROM sqlite_master WHERE name = 'asset'").fetchone()[0]
+        triggers = [sql for sql, in self.connection.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'asset'")]
+        self.connection.execute("PRAGMA legacy_alter_table = ON")
+        self.connection.execute("BEGIN")
+        self.connection.execute(create.replace("asset", "asset_new", 1))
+        columns = ", ".join(column.name for column in Asset.__table__.columns)  # as alembic copies them
+        self.connection.execute(f"INSERT INTO asset_new ({columns}) SELECT {columns} FROM asset")
+        self.connection.execute("DROP TABLE asset")
+        self.connection.execute("ALTER TABLE asset_new RENAME TO asset")
+        for sql in triggers:
+            self.connection.execute(sql)
+        self.connection.execute("COMMIT")
+        self.connection.execute("VACUUM")
+        self.assertNotEqual(self.connection.execute("SELECT rowid FROM asset WHERE id = ?", (assets['word9'],)).fetchone(), rowid)
+
+        for word, id in assets.items():
+            self.assertEqual(self.search(word), [id])
+        self.assertEqual(self.search("renamed"), [assets['word9']])
+        self.connection.execute("INSERT INTO asset_fts(asset_fts, rank) VALUES ('integrity-check', 1)")
+
+        # and the index is still kept in sync
+        self.connection.execute("DELETE FROM asset WHERE id = ?", (assets.pop('word9'),))
+        self.assertEqual(self.search("renamed"), [])
+        self.connection.execute("INSERT INTO asset_fts(asset_fts, rank) VALUES ('integrity-check', 1)")
+
+if __name__ == '__main__':
+    unittest.main()
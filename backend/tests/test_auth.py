@@ -0,0 +1,46 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+from sqlalchemy import delete
+from backend.crypto_pool import crypto_pool
+from backend.db import init_db, db_write, engine
+from backend.managers.AuthManager import AuthManager
+from backend.models import Cred, User
+
+class TestWebAuthnLogin(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    @asyncTest
+    async def test_verifies_without_a_connection(self):
+        marker = str(uuid4())
+        async def seed(session):
+            session.add(User(id=marker, webauthn_user_id=marker, name=marker, email=f"{marker}@example.com", emailVerified=True))
+            session.add(Cred(id=marker, public_key="AAAA", webauthn_user_id=marker, backed_up="0", name=marker, transports="[]"))
+        async def unseed(session):
+            await session.execute(delete(Cred).where(Cred.webauthn_user_id == marker))
+            await session.execute(delete(User).where(User.id == marker))
+
+        checked_out = []
+        async def verify(function, *args, **kwargs):
+            checked_out.append(engine.pool.checkedout())
+            return SimpleNamespace(new_sign_count=1)  # rejected, so no token is signed
+
+        await db_write(seed)
+        try:
+            with patch.object(crypto_pool, 'run', verify):
+                self.assertIsNone(await AuthManager().webauthn_login("AAAA", f"{marker}@example.com", {"id": marker}))
+        finally:
+            await db_write(unseed)
+        self.assertEqual(checked_out, [0])
+
+if __name__ == '__main__':
+    unittest.main()
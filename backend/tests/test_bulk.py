@@ -0,0 +1,181 @@
+import unittest
+import asyncio
+import json
+from unittest.mock import patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from sqlalchemy import select
+from backend.db import init_db, db_read_context, db_write
+from backend.managers.AssetsManager import AssetsManager
+from backend.managers.SharesManager import SharesManager
+from backend.api.SharesView import SharesView
+from backend.models import Asset, Share
+from backend.queries import bulk_insert
+from backend.schemas import AssetCreateSchema, AssetSchema, ShareSchema
+from backend.bulk import parse_bulk_body, validate_bulk_items, bulk_results, import_ndjson
+
+class TestBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def setUp(self):
+        self.assets_manager = AssetsManager()
+        self.creator = str(uuid4())  # isolates this test's assets from anything else in the database
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    def test_parse_ndjson(self):
+        items = validate_bulk_items(parse_bulk_body(b'{"title": "a"}\n\nnot json\n{"creator": "b"}\n'), AssetCreateSchema)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0].title, 'a')
+        self.assertTrue(items[1].startswith('Invalid JSON'))
+        self.assertTrue(items[2].startswith('Invalid item: title'))
+        with self.assertRaises(ValueError):
+            parse_bulk_body({"title": "a"})
+
+    @asyncTest
+    async def test_create_update_delete(self):
+        items = [AssetCreateSchema(title=f"asset {i}", creator=self.creator) for i in range(3)]
+        created = await self.assets_manager.create_assets(items)
+        ids = [asset.id for asset in created]
+
+        missing = str(uuid4())
+        updated = await self.assets_manager.update_assets([AssetSchema(id=ids[0], title="renamed"),
+                                                           AssetSchema(id=missing, title="missing")])
+        self.assertEqual([asset is not None for asset in updated], [True, False])
+        self.assertEqual((await self.assets_manager.retrieve_asset(ids[0])).title, "renamed")
+        self.assertEqual((await self.assets_manager.retrieve_asset(ids[0])).creator, self.creator)
+
+        self.assertEqual(await self.assets_manager.delete_assets(ids + [missing]), [True, True, True, False])
+        self.assertIsNone(await self.assets_manager.retrieve_asset(ids[1]))
+
+    @asyncTest
+    async def test_update_shares_leaves_unset_fields(self):
+        shares = SharesManager()
+        expiration = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        share = await shares.create_share(self.creator, self.creator, expiration)
+        try:
+            updated = await shares.update_shares([ShareSchema(id=share.id, resource_id=self.creator, is_revoked=True)])
+            self.assertIsNotNone(updated[0])
+            stored = await shares.retrieve_share(share.id)
+            self.assertTrue(stored.is_revoked)
+            self.assertEqual((stored.user_id, stored.expiration_dt), (self.creator, expiration))
+
+            # a field given as None is cleared (to NULL, not the "" it's serialized as)
+            await shares.update_shares([ShareSchema(id=share.id, resource_id=self.creator, user_id=None)])
+            stored = await shares.retrieve_share(share.id)
+            self.assertIsNone(stored.user_id)
+            self.assertEqual(stored.expiration_dt, expiration)
+        finally:
+            await shares.delete_shares([share.id])
+
+    @asyncTest
+    async def test_bulk_update_shares_endpoint_leaves_unset_fields(self):
+        shares = SharesManager()
+        expiration = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        share = await shares.create_share(self.creator, self.creator, expiration)
+        try:
+            # as PUT /shares/bulk receives it, so with the view's normalization
+            body = f'{{"id": "{share.id}", "resource_id": "{self.creator}", "is_revoked": true}}\n'.encode()
+            response = await SharesView().bulk_update(body)
+            self.assertEqual(json.loads(response.body), [{"status": 200, "id": share.id}])
+            stored = await shares.retrieve_share(share.id)
+            self.assertTrue(stored.is_revoked)
+            self.assertEqual((stored.user_id, stored.expiration_dt), (self.creator, expiration))
+        finally:
+            await shares.delete_shares([share.id])
+
+    @asyncTest
+    async def test_bulk_create_shares_endpoint_stores_missing_user_as_null(self):
+        response = await SharesView().bulk_create(f'{{"resource_id": "{self.creator}"}}\n'.encode())
+        id = json.loads(response.body)[0]['id']
+        try:
+            async with db_read_context() as session:
+                user_id = (await session.execute(select(Share.user_id).where(Share.id == id))).scalar_one()
+            self.assertIsNone(user_id)
+        finally:
+            await SharesManager().delete_shares([id])
+
+    @asyncTest
+    async def test_failing_row_only_fails_itself(self):
+        existing = (await self.assets_manager.create_assets([AssetCreateSchema(title="existing", creator=self.creator)]))[0]
+        rows = [{"id": str(uuid4()), "title": "new", "creator": self.creator}, {"id": existing.id, "title": "duplicate", "creator": self.creator}]
+
+        async def write(session):
+            return await bulk_insert(session, Asset, rows)
+        errors = await db_write(write)
+        self.assertIsNone(errors[0])
+        self.assertIsNotNone(errors[1])
+        self.assertIsNotNone(await self.assets_manager.retrieve_asset(rows[0]["id"]))
+
+        items = ["Invalid JSON", AssetCreateSchema(title="a"), AssetCreateSchema(title="b")]
+        results = bulk_results(items, [AssetSchema(id="1", title="a"), None], 201, 409, "failed")
+        self.assertEqual(results, [{"status": 400, "error": "Invalid JSON"}, {"status": 201, "id": "1"},
+                                   {"status": 409, "error": "failed"}])
+        await self.assets_manager.delete_assets([existing.id, rows[0]["id"]])
+
+    @asyncTest
+    async def test_create_in_failed_batch(self):
+        # batched with a failing write, so the batch is rolled back and rerun
+        # with each write isolated: the assets are created once and reported so
+        async def fails(session):
+            raise RuntimeError("fails")
+        created, failed = await asyncio.gather(
+            self.assets_manager.create_assets([AssetCreateSchema(title=f"batched {i}", creator=self.creator) for i in range(2)]),
+            db_write(fails), return_exceptions=True)
+        self.assertIsInstance(failed, RuntimeError)
+        self.assertTrue(all(asset is not None for asset in created), created)
+        stored = [asset async for asset in self.assets_manager.export_assets({'creator': self.creator})]
+        self.assertEqual(sorted(asset.id for asset in stored), sorted(asset.id for asset in created))
+        await self.assets_manager.delete_assets([asset.id for asset in created])
+
+    @asyncTest
+    async def test_export(self):
+        created = await self.assets_manager.create_assets([AssetCreateSchema(title=f"export {i}", creator=self.creator)
+                                                           for i in range(5)])
+        exported = [asset async for asset in self.assets_manager.export_assets({'creator': self.creator})]
+        self.assertEqual([asset.id for asset in exported], sorted(asset.id for asset in created))
+        with self.assertRaises(ValueError):
+            self.assets_manager.export_assets({'bogus': 1})
+        await self.assets_manager.delete_assets([asset.id for asset in created])
+
+    @asyncTest
+    async def test_import(self):
+        batches = []
+        async def create(items):
+            batches.append(len(items))
+            return await self.assets_manager.create_assets(items)
+        async def stream():
+            # lines split across chunks, bad lines, a blank line and no trailing newline
+            yield f'{{"title": "import 0", "creator": "{self.creator}"}}\n{{"title": "imp'.encode()
+            yield f'ort 1", "creator": "{self.creator}"}}\nnot json\n\n'.encode()
+            yield b'{"title": "\xff"}\n'
+            for i in range(2, 5):
+                yield f'{{"title": "import {i}", "creator": "{self.creator}"}}\n'.encode()
+            yield b'{"creator": "no title"}'
+        summary = await import_ndjson(stream(), AssetCreateSchema, create, batch_size=2)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual((summary['received'], summary['imported'], summary['failed']), (8, 5, 3))
+        self.assertEqual([error['line'] for error in summary['errors']], [3, 5, 9])
+        self.assertTrue(summary['errors'][1]['error'].startswith("Invalid UTF-8"))
+        imported = [asset async for asset in self.assets_manager.export_assets({'creator': self.creator})]
+        self.assertEqual(sorted(asset.title for asset in imported), [f"import {i}" for i in range(5)])
+        await self.assets_manager.delete_assets([asset.id for asset in imported])
+
+    @asyncTest
+    async def test_import_line_too_long(self):
+        async def stream():
+            yield b'{"title": "a"}\n\n'
+            yield b'{"title": "' + b'x' * 32
+        async def create(items):
+            return items
+        with patch('backend.bulk.import_max_line', 16):
+            with self.assertRaisesRegex(ValueError, "^Line 3 "):
+                await import_ndjson(stream(), AssetCreateSchema, create)
+
+if __name__ == '__main__':
+    unittest.main()
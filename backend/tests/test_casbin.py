@@ -0,0 +1,96 @@
+import unittest
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from casbin import Enforcer
+from casbin_sqlalchemy_adapter import Adapter
+from sqlalchemy import create_engine
+from backend.casbin_adapter import AsyncPolicyAdapter
+from backend.managers.CasbinRoleManager import CasbinRoleManager, model_path
+
+class TestCasbinRoleManager(unittest.TestCase):
+    # Each test gets an in-memory policy in place of the database one
+    def setUp(self):
+        self.manager = CasbinRoleManager()
+        self.saved = self.manager.__dict__.copy()
+        self.manager.use_enforcer(Enforcer(model_path))
+        self.manager.add_default_rules()
+
+    def tearDown(self):
+        self.manager.__dict__.clear()
+        self.manager.__dict__.update(self.saved)
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    @asyncTest
+    async def test_decision_cache(self):
+        self.assertFalse(self.manager.check_permissions("alice", "list", "user", "ADMIN_PORTAL"))
+        await self.manager.assign_user_role("alice", "ADMIN_PORTAL", "user")
+        self.assertTrue(self.manager.check_permissions("alice", "list", "user", "ADMIN_PORTAL"))
+        self.assertFalse(self.manager.check_permissions("alice", "delete", "user", "ADMIN_PORTAL"))
+
+        with mock.patch.object(self.manager.enforcer, 'enforce') as enforce:
+            self.assertTrue(self.manager.check_permissions("alice", "list", "user", "ADMIN_PORTAL"))
+        enforce.assert_not_called()
+
+        await self.manager.assign_user_role("alice", "ADMIN_PORTAL", "admin")
+        self.assertTrue(self.manager.check_permissions("alice", "delete", "user", "ADMIN_PORTAL"))
+
+    @asyncTest
+    async def test_users_roles(self):
+        await self.manager.assign_user_role("alice", "ADMIN_PORTAL", "admin")
+        await self.manager.assign_user_role("alice", "ADMIN_PORTAL", "user")
+        await self.manager.assign_user_role("bob", "OTHER", "user")
+        self.assertEqual(self.manager.get_users_roles(["alice", "bob", "carol"], "ADMIN_PORTAL"),
+                         {"alice": "admin,user", "bob": "", "carol": ""})
+        # the index is rebuilt after the policy changes
+        await self.manager.assign_user_role("carol", "ADMIN_PORTAL", "user")
+        self.assertEqual(self.manager.get_user_roles("carol", "ADMIN_PORTAL"), "user")
+
+    @asyncTest
+    async def test_saving_doesnt_block_the_loop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'policy.db'
+            adapter = Adapter(create_engine(f"sqlite:///{path}"))
+            self.manager.use_enforcer(Enforcer(model_path), AsyncPolicyAdapter(adapter))
+            self.manager.add_default_rules()
+
+            # another writer holds the database lock, so saving the role waits on it
+            blocker = sqlite3.connect(path)
+            blocker.execute("BEGIN IMMEDIATE")
+            assign = asyncio.create_task(self.manager.assign_user_role("alice", "ADMIN_PORTAL", "user"))
+
+            ticks, longest = 0, 0.0
+            last = time.perf_counter()
+            while ticks < 30:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                longest, last, ticks = max(longest, now - last), now, ticks + 1
+            self.assertFalse(assign.done())
+            self.assertTrue(self.manager.check_permissions("alice", "list", "user", "ADMIN_PORTAL"))
+            self.assertLess(longest, 0.1)
+
+            blocker.commit()
+            blocker.close()
+            await assign
+            rows = sqlite3.connect(path).execute("SELECT ptype, v0, v1, v2 FROM casbin_rule").fetchall()
+            self.assertEqual(rows, [("g", "alice", "user", "ADMIN_PORTAL")])
+
+    @asyncTest
+    async def test_failed_save_takes_role_away(self):
+        policy_adapter = mock.Mock(spec=AsyncPolicyAdapter)
+        policy_adapter.add_policy.side_effect = RuntimeError("disk full")
+        self.manager.use_enforcer(Enforcer(model_path), policy_adapter)
+        self.manager.add_default_rules()
+        with self.assertRaises(RuntimeError):
+            await self.manager.assign_user_role("alice", "ADMIN_PORTAL", "user")
+        self.assertFalse(self.manager.check_permissions("alice", "list", "user", "ADMIN_PORTAL"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import asyncio
+import time
+import jwt
+from backend.crypto_pool import CryptoPool
+from backend.tokens import sign
+
+class TestCryptoPool(unittest.TestCase):
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    @asyncTest
+    async def test_runs_off_the_loop(self):
+        pool = CryptoPool('thread', 2)
+        calls = asyncio.gather(*[pool.run(time.sleep, 0.1) for _ in range(4)])
+        ticks, longest = 0, 0.0
+        last = time.perf_counter()
+        while ticks < 10:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            longest, last, ticks = max(longest, now - last), now, ticks + 1
+        self.assertEqual(pool.snapshot()["running"], 2)
+        await calls
+        self.assertLess(longest, 0.05)
+
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot["calls"], snapshot["running"], snapshot["queued"], snapshot["max_queued"]), (4, 0, 0, 2))
+        self.assertGreater(snapshot["max_wait_ms"], 50)
+
+        with self.assertRaises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0)
+        self.assertEqual(pool.snapshot()["running"], 0)
+
+    @asyncTest
+    async def test_process_pool(self):
+        pool = CryptoPool('process', 1)
+        secret = "s" * 32
+        token = await pool.run(sign, {"sub": "user"}, secret)
+        self.assertEqual(jwt.decode(token, secret, algorithms=["HS256"]), {"sub": "user"})
+        pool.configure('thread', 0)  # inline
+        self.assertEqual(await pool.run(sign, {"sub": "user"}, secret), token)
+        self.assertEqual(pool.snapshot()["calls"], 0)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            CryptoPool('fibers', 1)
+
+if __name__ == '__main__':
+    unittest.main()
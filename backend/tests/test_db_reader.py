@@ -0,0 +1,64 @@
+import unittest
+import asyncio
+from uuid import uuid4
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from backend.db import init_db, db_read_context, db_write, reader_pool_metrics, PoolMetrics
+
+class TestDatabaseReader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    async def count_personas(self, id):
+        async with db_read_context() as session:
+            return (await session.execute(text("SELECT count(*) FROM persona WHERE id = :id"), {"id": id})).scalar()
+
+    @asyncTest
+    async def test_writes_fail(self):
+        async with db_read_context() as session:
+            with self.assertRaisesRegex(OperationalError, "readonly|query_only"):
+                await session.execute(text("INSERT INTO persona (id, name) VALUES (:id, 'reader')"), {"id": str(uuid4())})
+
+    @asyncTest
+    async def test_sees_committed_writes(self):
+        id = str(uuid4())
+        async def insert(session):
+            await session.execute(text("INSERT INTO persona (id, name) VALUES (:id, 'reader')"), {"id": id})
+        async def remove(session):
+            await session.execute(text("DELETE FROM persona WHERE id = :id"), {"id": id})
+
+        self.assertEqual(await self.count_personas(id), 0)
+        await db_write(insert)
+        try:
+            # from the WAL, on pooled reader connections opened before the write
+            self.assertEqual(await self.count_personas(id), 1)
+        finally:
+            await db_write(remove)
+        self.assertEqual(await self.count_personas(id), 0)
+
+    @asyncTest
+    async def test_checkouts_are_recorded(self):
+        checkouts = reader_pool_metrics.snapshot()["checkouts"]
+        await self.count_personas(str(uuid4()))
+        self.assertEqual(reader_pool_metrics.snapshot()["checkouts"], checkouts + 1)
+
+    def test_slow_checkouts_are_logged(self):
+        metrics = PoolMetrics('reader', 'PAIOS_DB_READERS', slow_wait_ms=100)
+        metrics.record(0.001)
+        with self.assertLogs('backend.db', 'WARNING') as logs:
+            metrics.record(0.2)
+            metrics.record(0.3)  # within the minute since the last warning, so only counted
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('PAIOS_DB_READERS', logs.output[0])
+        self.assertEqual(metrics.snapshot()["checkouts"], 3)
+        self.assertEqual(metrics.snapshot()["slow_checkouts"], 2)
+        self.assertAlmostEqual(metrics.snapshot()["max_wait_ms"], 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+from alembic.script import ScriptDirectory
+from backend.db import init_db, current_revision, schema_head, alembic_config
+
+class TestDbSchema(unittest.TestCase):
+    def test_schema_head_is_migrations_head(self):
+        # update backend.db.schema_head when adding a migration
+        self.assertEqual(schema_head, ScriptDirectory.from_config(alembic_config()).get_current_head())
+
+    def test_init_db(self):
+        init_db()
+        self.assertEqual(current_revision(), schema_head)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import asyncio
+import tempfile
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, Integer, MetaData, Table
+from backend.db import DatabaseWriter, enable_savepoints
+from backend.queries import bulk_insert
+
+# bulk_insert takes a model, and only uses its table
+class Item:
+    __table__ = Table("item", MetaData(), Column("id", Integer, primary_key=True))
+
+class TestDatabaseWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{Path(self.tmp.name) / 'writer.db'}")
+        enable_savepoints(self.engine.sync_engine)
+        session_factory = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.transactions = 0
+
+        def counting_session_factory():
+            self.transactions += 1
+            return session_factory()
+
+        self.writer = DatabaseWriter(session_factory=counting_session_factory)
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    async def create_table(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+
+    async def count_items(self):
+        async with self.engine.connect() as conn:
+            return (await conn.execute(text("SELECT count(*) FROM item"))).scalar()
+
+    def insert(self, id):
+        async def write(session):
+            await session.execute(text("INSERT INTO item (id) VALUES (:id)"), {"id": id})
+            return id
+        return write
+
+    @asyncTest
+    async def test_concurrent_writes_are_group_committed(self):
+        await self.create_table()
+        results = await asyncio.gather(*[self.writer.submit(self.insert(i)) for i in range(50)])
+        await self.writer.stop()
+        self.assertEqual(results, list(range(50)))
+        self.assertEqual(await self.count_items(), 50)
+        self.assertLess(self.transactions, 50)
+
+    @asyncTest
+    async def test_failing_unit_only_fails_its_caller(self):
+        await self.create_table()
+        results = await asyncio.gather(
+            self.writer.submit(self.insert(1)),
+            self.writer.submit(self.insert(1)),  # duplicate primary key
+            self.writer.submit(self.insert(2)),
+            return_exceptions=True
+        )
+        await self.writer.stop()
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], Exception)
+        self.assertEqual(results[2], 2)
+        self.assertEqual(await self.count_items(), 2)
+
+    @asyncTest
+    async def test_rolled_back_batch_leaves_nothing_behind(self):
+        # a unit whose first statement is a SAVEPOINT, batched with a failing
+        # unit: the batch is rolled back and rerun, so what the first unit
+        # wrote is there once, from the rerun
+        await self.create_table()
+        async def bulk(session):
+            return await bulk_insert(session, Item, [{"id": 1}, {"id": 2}])
+        async def fails(session):
+            raise RuntimeError("fails")
+        results = await asyncio.gather(self.writer.submit(bulk), self.writer.submit(fails), return_exceptions=True)
+        await self.writer.stop()
+        self.assertEqual(results[0], [None, None])
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(await self.count_items(), 2)
+
+    def tearDown(self):
+        asyncio.run(self.engine.dispose())
+        self.tmp.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+import sqlite3
+from uuid import uuid4
+from sqlalchemy import delete
+from backend.db import init_db, db_write, table_versions
+from backend.etags import etag_matches, table_etag
+from backend.managers.AssetsManager import AssetsManager
+from backend.models import Asset
+from backend.schemas import AssetCreateSchema
+
+class TestETags(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('W/"a-1"', 'W/"a-1"'))
+        self.assertTrue(etag_matches('"a-1"', 'W/"a-1"'))
+        self.assertTrue(etag_matches('W/"b-2", W/"a-1"', 'W/"a-1"'))
+        self.assertTrue(etag_matches('*', 'W/"a-1"'))
+        self.assertFalse(etag_matches('W/"a-2"', 'W/"a-1"'))
+        self.assertFalse(etag_matches(None, 'W/"a-1"'))
+
+    @asyncTest
+    async def test_table_versions(self):
+        manager = AssetsManager()
+        etag = table_etag('asset', 'share')
+        asset = await manager.create_asset(AssetCreateSchema(title='etag'))
+        self.assertNotEqual(table_etag('asset', 'share'), etag)
+
+        # reads and rolled back writes don't change the version
+        version = table_versions.version('asset')
+        await manager.retrieve_asset(asset.id)
+        async def fails(session):
+            await session.execute(delete(Asset).where(Asset.id == asset.id))
+            raise ValueError("rolled back")
+        with self.assertRaises(ValueError):
+            await db_write(fails)
+        self.assertEqual(table_versions.version('asset'), version)
+
+        await manager.delete_asset(asset.id)
+        self.assertEqual(table_versions.version('asset'), (version[0] + 1,))
+
+    def test_writes_from_other_connections(self):
+        # e.g. another worker process, which the app's engines know nothing about
+        version = table_versions.version('persona')
+        connection = sqlite3.connect(table_versions.path)
+        try:
+            id = str(uuid4())
+            with connection:
+                connection.execute("INSERT INTO persona (id, name) VALUES (?, 'etag')", (id,))
+            self.assertEqual(table_versions.version('persona'), (version[0] + 1,))
+            with connection:
+                connection.execute("DELETE FROM persona WHERE id = ?", (id,))
+            self.assertEqual(table_versions.version('persona'), (version[0] + 2,))
+        finally:
+            connection.close()
+
+    def test_unversioned_table(self):
+        with self.assertRaises(ValueError):
+            table_versions.version('user')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+from uuid import uuid4
+from starlette.responses import JSONResponse
+from backend.db import init_db
+from datetime import datetime, timezone
+from backend.managers.AssetsManager import AssetsManager
+from backend.managers.SharesManager import SharesManager
+from backend.pagination import encode_cursor, parse_cursor, next_cursor
+from backend.schemas import AssetCreateSchema
+
+class TestKeysetPagination(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def setUp(self):
+        self.assets_manager = AssetsManager()
+        self.creator = str(uuid4())  # isolates this test's assets from anything else in the database
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor('title', 'desc', 'foo', 'some-id', 20)
+        self.assertEqual(parse_cursor(cursor), {"sort_by": "title", "sort_order": "desc", "value": "foo", "id": "some-id",
+                                                "position": 20})
+
+    def test_invalid_cursor(self):
+        self.assertIsInstance(parse_cursor('not a cursor'), JSONResponse)
+        self.assertIsInstance(parse_cursor(encode_cursor('title', 'asc', 'foo', 'some-id', -1)), JSONResponse)
+
+    async def walk(self, sort_by, sort_order, limit=3):
+        filters = {'creator': self.creator}
+        assets, _ = await self.assets_manager.retrieve_assets(limit=limit, sort_by=sort_by, sort_order=sort_order, filters=dict(filters))
+        pages = [assets]
+        cursor = next_cursor(assets, limit, sort_by, sort_order)
+        while cursor:
+            after = parse_cursor(cursor)
+            # the cursor's position is where its page starts (reported in Content-Range), and like
+            # the views, it's passed as the offset, which has to be ignored when seeking
+            self.assertEqual(after['position'], sum(len(page) for page in pages))
+            assets, _ = await self.assets_manager.retrieve_assets(offset=after['position'], limit=limit, sort_by=sort_by,
+                                                                  sort_order=sort_order, filters=dict(filters), after=after)
+            pages.append(assets)
+            cursor = next_cursor(assets, limit, sort_by, sort_order, after['position'])
+        return [asset.id for page in pages for asset in page]
+
+    @asyncTest
+    async def test_keyset_matches_offset_order(self):
+        created = []
+        for i in range(10):
+            # duplicate and null sort values exercise the id tie-breaker and NULL handling
+            subject = None if i % 4 == 0 else f"subject {i % 3}"
+            created.append(await self.assets_manager.create_asset(AssetCreateSchema(title=f"asset {i}", creator=self.creator, subject=subject)))
+        try:
+            for sort_by in ('subject', 'title', None):
+                for sort_order in ('asc', 'desc'):
+                    expected, total_count = await self.assets_manager.retrieve_assets(limit=100, sort_by=sort_by, sort_order=sort_order, filters={'creator': self.creator})
+                    self.assertEqual(total_count, 10)
+                    self.assertEqual(await self.walk(sort_by, sort_order), [asset.id for asset in expected])
+        finally:
+            for asset in created:
+                await self.assets_manager.delete_asset(asset.id)
+
+    @asyncTest
+    async def test_keyset_datetime_sort(self):
+        # the cursor carries the datetime as an ISO string, which has to be
+        # parsed again to seek past it
+        shares = SharesManager()
+        created = [await shares.create_share(self.creator, None, None if i % 4 == 0 else datetime(2030, 1, 1 + i % 3, tzinfo=timezone.utc))
+                   for i in range(7)]
+        filters = {'resource_id': self.creator}
+        try:
+            for sort_order in ('asc', 'desc'):
+                expected, _ = await shares.retrieve_shares(limit=100, sort_by='expiration_dt', sort_order=sort_order, filters=dict(filters))
+                page, _ = await shares.retrieve_shares(limit=2, sort_by='expiration_dt', sort_order=sort_order, filters=dict(filters))
+                walked = [share.id for share in page]
+                cursor = next_cursor(page, 2, 'expiration_dt', sort_order)
+                while cursor:
+                    page, _ = await shares.retrieve_shares(limit=2, sort_by='expiration_dt', sort_order=sort_order,
+                                                           filters=dict(filters), after=parse_cursor(cursor))
+                    walked.extend(share.id for share in page)
+                    cursor = next_cursor(page, 2, 'expiration_dt', sort_order)
+                self.assertEqual(walked, [share.id for share in expected])
+        finally:
+            await shares.delete_shares([share.id for share in created])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import asyncio
+from uuid import uuid4
+from backend.db import init_db, db_read_context
+from datetime import datetime, timezone
+from backend.managers.AssetsManager import AssetsManager, assets_plan
+from backend.managers.SharesManager import SharesManager, shares_plan
+from unittest import mock
+from backend import queries
+from backend.queries import check_query_plans, from_row
+from backend.schemas import AssetCreateSchema, AssetSchema
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+
+    def setUp(self):
+        self.assets_manager = AssetsManager()
+        self.creator = str(uuid4())  # isolates this test's assets from anything else in the database
+
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    def test_no_full_table_scans(self):
+        self.assertEqual(check_query_plans(), [])
+
+    def test_invalid_filters(self):
+        with self.assertRaises(ValueError):
+            assets_plan.parse_filters({'webauthn_user_id': 'x'})
+        with self.assertRaises(ValueError):
+            assets_plan.parse_filters({'title_like': 'x'})
+        with self.assertRaises(ValueError):
+            assets_plan.parse_filters(['title'])
+
+    def test_statements_are_cached_by_shape(self):
+        shape, params = assets_plan.parse_filters({'title_prefix': 'a', 'creator': 'b'})
+        self.assertEqual(shape, assets_plan.parse_filters({'creator': 'c', 'title_prefix': 'd'})[0])
+        self.assertIs(assets_plan.statement(shape), assets_plan.statement(shape))
+        self.assertIs(assets_plan.page(shape, 'title', 'asc', None, False), assets_plan.page(shape, 'title', 'asc', None, False))
+
+    @asyncTest
+    async def test_operators(self):
+        for title in ['apple', 'apricot', 'banana', 'cherry']:
+            await self.assets_manager.create_asset(AssetCreateSchema(title=title, creator=self.creator, user_id=None))
+
+        async def titles(**filters):
+            async with db_read_context() as session:
+                rows, total_count = await assets_plan.fetch_page(session, {'creator': self.creator, **filters}, sort_by='title')
+            self.assertEqual(total_count, len(rows))
+            return [row.title for row in rows]
+
+        self.assertEqual(await titles(), ['apple', 'apricot', 'banana', 'cherry'])
+        self.assertEqual(await titles(title='banana'), ['banana'])
+        self.assertEqual(await titles(title=['apple', 'cherry']), ['apple', 'cherry'])
+        self.assertEqual(await titles(title_in='cherry'), ['cherry'])
+        self.assertEqual(await titles(title_gte='apricot', title_lte='banana'), ['apricot', 'banana'])
+        self.assertEqual(await titles(title_prefix='ap'), ['apple', 'apricot'])
+        self.assertEqual(await titles(title_contains='an'), ['banana'])
+
+    @asyncTest
+    async def test_datetime_operators(self):
+        # filter values are ISO strings, which have to be parsed for the UTC
+        # datetime column (whose python_type is object)
+        shares = SharesManager()
+        created = [await shares.create_share(self.creator, None, datetime(2030, month, 1, tzinfo=timezone.utc))
+                   for month in (1, 2, 3)]
+        try:
+            async def months(**filters):
+                async with db_read_context() as session:
+                    rows, _ = await shares_plan.fetch_page(session, {'resource_id': self.creator, **filters}, sort_by='expiration_dt')
+                return [row.expiration_dt.month for row in rows]
+
+            self.assertEqual(await months(expiration_dt_gte='2030-02-01T00:00:00'), [2, 3])
+            self.assertEqual(await months(expiration_dt_lte='2030-02-01T00:00:00+00:00'), [1, 2])
+            self.assertEqual(await months(expiration_dt_eq='2030-03-01T00:00:00Z'), [3])
+            self.assertEqual(await months(expiration_dt=['2030-01-01T00:00:00', '2030-03-01T00:00:00']), [1, 3])
+            for value in ('not a date', 20300101):
+                with self.assertRaises(ValueError):
+                    shares_plan.parse_filters({'expiration_dt_gte': value})
+        finally:
+            await shares.delete_shares([share.id for share in created])
+
+    @asyncTest
+    async def test_from_row(self):
+        await self.assets_manager.create_asset(AssetCreateSchema(title='row', creator=self.creator, user_id=None))
+        async with db_read_context() as session:
+            rows, _ = await assets_plan.fetch_page(session, {'creator': self.creator})
+        asset = from_row(AssetSchema, rows[0])
+        with mock.patch.object(queries, 'validate_rows', True):
+            validated = from_row(AssetSchema, rows[0])
+        # built without validation, but otherwise the same as a validated schema
+        self.assertEqual(asset, validated)
+        self.assertEqual(asset.model_dump_json(), validated.model_dump_json())
+        self.assertEqual(asset.model_fields_set, validated.model_fields_set)
+        self.assertEqual(from_row(AssetSchema, rows[0], title='other').title, 'other')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import json
+from datetime import datetime, timezone
+from starlette.responses import JSONResponse
+from backend.responses import FastJSONResponse
+from backend.schemas import AssetSchema, ShareSchema
+
+assets = [AssetSchema(id=str(i), title=f"título {i}", user_id=None, creator="creator") for i in range(3)]
+shares = [ShareSchema(id="1", resource_id="r", user_id=None, expiration_dt=datetime(2030, 1, 1, 12, tzinfo=timezone.utc)),
+          ShareSchema(id="2", resource_id="r", user_id="u", expiration_dt=None, is_revoked=True)]
+
+class TestResponses(unittest.TestCase):
+    def assertSameJSON(self, response, expected):
+        self.assertEqual(response.headers['content-type'], 'application/json')
+        self.assertEqual(json.loads(response.body), json.loads(expected.body))
+
+    def test_same_as_model_dump(self):
+        self.assertSameJSON(FastJSONResponse(assets[0]), JSONResponse(assets[0].model_dump()))
+        self.assertSameJSON(FastJSONResponse(assets), JSONResponse([asset.model_dump() for asset in assets]))
+        self.assertSameJSON(FastJSONResponse(assets, schema=AssetSchema), JSONResponse([asset.model_dump() for asset in assets]))
+        # field serializers still apply
+        self.assertSameJSON(FastJSONResponse(shares, schema=ShareSchema), JSONResponse([share.model_dump() for share in shares]))
+
+    def test_status_and_headers(self):
+        response = FastJSONResponse(assets, status_code=201, headers={'X-Total-Count': '3'}, schema=AssetSchema)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers['x-total-count'], '3')
+        self.assertEqual(response.headers['content-length'], str(len(response.body)))
+
+    def test_nan(self):
+        self.assertEqual(json.loads(FastJSONResponse({"value": float('nan')}).body), {"value": None})
@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+from connexion.exceptions import InvalidSpecification
+from connexion.spec import Specification
+from backend import spec_cache
+from backend.spec_cache import load_spec, prevalidated_spec
+
+spec = """openapi: 3.0.3
+info:
+  title: test
+  version: 1.0.0
+paths: {}
+"""
+
+class TestSpecCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(setattr, spec_cache, 'spec_cache_dir', spec_cache.spec_cache_dir)
+        spec_cache.spec_cache_dir = Path(self.tmp.name) / 'cache'
+        self.path = Path(self.tmp.name) / 'test' / 'openapi.yaml'
+        self.path.parent.mkdir()
+
+    def test_cache(self):
+        self.path.write_text(spec)
+        self.assertEqual(load_spec(self.path)['info']['title'], 'test')
+        cached = list(spec_cache.spec_cache_dir.iterdir())
+        self.assertEqual(len(cached), 1)
+        # a warm start reads the cache rather than the YAML
+        cached[0].write_text('{"info": {"title": "cached"}}')
+        self.assertEqual(load_spec(self.path)['info']['title'], 'cached')
+        # a changed spec replaces the cached version
+        self.path.write_text(spec.replace('title: test', 'title: changed'))
+        self.assertEqual(load_spec(self.path)['info']['title'], 'changed')
+        self.assertEqual(len(list(spec_cache.spec_cache_dir.iterdir())), 1)
+
+    def test_invalid_spec(self):
+        self.path.write_text(spec.replace('paths: {}', 'paths: []'))
+        with self.assertRaises(InvalidSpecification):
+            load_spec(self.path)
+        self.assertFalse(spec_cache.spec_cache_dir.exists())
+
+    def test_validation_waits_for_prevalidated_spec(self):
+        self.path.write_text(spec.replace('paths: {}', 'paths: []'))
+        errors = []
+        def load():
+            try:
+                load_spec(self.path)
+            except InvalidSpecification as e:
+                errors.append(e)
+        with prevalidated_spec():
+            Specification.from_dict({'openapi': '3.0.3', 'paths': []})  # not validated
+            thread = threading.Thread(target=load)
+            thread.start()
+            # validating in another thread meanwhile waits, rather than being skipped
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+if __name__ == '__main__':
+    unittest.main()
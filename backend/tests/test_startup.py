@@ -0,0 +1,30 @@
+import unittest
+import threading
+from backend.startup import run_pipeline
+
+class TestStartup(unittest.TestCase):
+    def test_dependencies(self):
+        first_done = threading.Event()
+        def first():
+            first_done.set()
+            return 1
+        def second():
+            self.assertTrue(first_done.is_set())
+            return 2
+        results = run_pipeline([('first', first, []), ('second', second, ['first']), ('other', lambda: 3, [])])
+        self.assertEqual(results, {'first': 1, 'second': 2, 'other': 3})
+
+    def test_failed_stage(self):
+        ran = []
+        def fail():
+            raise RuntimeError("failed")
+        with self.assertRaises(RuntimeError):
+            run_pipeline([('fail', fail, []), ('dependent', lambda: ran.append(1), ['fail'])])
+        self.assertEqual(ran, [])
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            run_pipeline([('first', lambda: 1, ['second']), ('second', lambda: 2, [])])
+
+if __name__ == '__main__':
+    unittest.main()
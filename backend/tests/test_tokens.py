@@ -0,0 +1,58 @@
+import os
+import time
+import unittest
+from unittest import mock
+import jwt
+from backend.tokens import TokenVerifier
+
+class TestTokenVerifier(unittest.TestCase):
+    def setUp(self):
+        os.environ['PAIOS_TEST_JWT_SECRET'] = 'test-secret'
+        self.verifier = TokenVerifier(key_name='PAIOS_TEST_JWT_SECRET', cache_size=2)
+
+    def tearDown(self):
+        os.environ.pop('PAIOS_TEST_JWT_SECRET', None)
+
+    def token(self, sub='user', expires_in=60):
+        return self.verifier.encode({"sub": sub, "role": "user", "exp": int(time.time()) + expires_in})
+
+    def test_cached_until_expiry(self):
+        token = self.token(expires_in=60)
+        self.assertEqual(self.verifier.decode(token)['sub'], 'user')
+        self.assertEqual(self.verifier.decode(token)['sub'], 'user')
+        self.assertEqual((self.verifier.misses, self.verifier.hits), (1, 1))
+        # past its expiry the cached claims aren't used and the token is verified again
+        with mock.patch('backend.tokens.time.time', return_value=time.time() + 120):
+            self.verifier.decode(token)
+        self.assertEqual((self.verifier.misses, self.verifier.hits), (2, 1))
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.verifier.decode(self.token(expires_in=-1))
+
+    def test_invalid_tokens_are_not_cached(self):
+        token = self.token()
+        for _ in range(2):
+            with self.assertRaises(jwt.InvalidTokenError):
+                self.verifier.decode(token[:-2] + 'xx')
+        self.assertEqual(self.verifier.snapshot(), {"hits": 0, "misses": 2, "cached": 0})
+
+    def test_bounded(self):
+        tokens = [self.token(sub=str(i)) for i in range(3)]
+        for token in tokens:
+            self.verifier.decode(token)
+        self.assertEqual(self.verifier.snapshot()["cached"], 2)
+        self.verifier.decode(tokens[0])  # evicted, so verified again
+        self.assertEqual(self.verifier.misses, 4)
+
+    def test_rotate(self):
+        token = self.token()
+        self.verifier.decode(token)
+        with mock.patch('backend.tokens.set_key') as set_key:
+            self.verifier.rotate('rotated-secret')
+        set_key.assert_called_once()
+        self.assertEqual(os.environ['PAIOS_TEST_JWT_SECRET'], 'rotated-secret')
+        with self.assertRaises(jwt.InvalidSignatureError):
+            self.verifier.decode(token)
+        self.assertEqual(self.verifier.decode(self.token())['sub'], 'user')
+
+if __name__ == '__main__':
+    unittest.main()
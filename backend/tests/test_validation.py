@@ -0,0 +1,50 @@
+import unittest
+import asyncio
+from connexion.validators import JSONResponseBodyValidator
+from backend.validation import compiled_validator, sampled, response_validation_metrics, validator_map
+from connexion.json_schema import Draft4RequestValidator
+
+schema = {"type": "object", "properties": {"id": {"type": "string"}}, "required": ["id"]}
+
+class TestValidation(unittest.TestCase):
+    def asyncTest(func):
+        def wrapper(*args, **kwargs):
+            return asyncio.run(func(*args, **kwargs))
+        return wrapper
+
+    def test_compiled_validator(self):
+        validator = compiled_validator(Draft4RequestValidator, schema)
+        self.assertIs(compiled_validator(Draft4RequestValidator, schema), validator)
+        self.assertIsNot(compiled_validator(Draft4RequestValidator, dict(schema)), validator)
+
+    async def respond(self, validator_class, body):
+        sent = []
+        async def send(message):
+            sent.append(message)
+        validator = validator_class({"path": "/test"}, schema=schema, encoding="utf-8")
+        send = validator.wrap_send(send)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body[:5], "more_body": True})
+        await send({"type": "http.response.body", "body": body[5:]})
+        return b"".join(message.get("body", b"") for message in sent)
+
+    @asyncTest
+    async def test_sampled(self):
+        before = response_validation_metrics.snapshot()
+        # invalid responses are still sent, and counted
+        self.assertEqual(await self.respond(sampled(JSONResponseBodyValidator, 1), b'{"id": 1}'), b'{"id": 1}')
+        self.assertEqual(await self.respond(sampled(JSONResponseBodyValidator, 1), b'{"id": "1"}'), b'{"id": "1"}')
+        await self.respond(sampled(JSONResponseBodyValidator, 0), b'{"id": 1}')
+        after = response_validation_metrics.snapshot()
+        self.assertEqual(after["checked"] - before["checked"], 2)
+        self.assertEqual(after["violations"] - before["violations"], 1)
+        self.assertEqual(after["violations_by_operation"]["/test"], before["violations_by_operation"].get("/test", 0) + 1)
+
+    def test_validator_map(self):
+        for mode in ('strict', 'sampled', 'off'):
+            validators = validator_map(mode)
+            self.assertIn('application/x-ndjson', validators['body'])
+            self.assertEqual(validators['response']['application/json'].__name__.startswith('Sampled'), mode == 'sampled')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# JWT signing and verification for the API's bearer tokens (see
+# AuthManager.decode_jwt, the x-bearerInfoFunc of every secured endpoint).
+# The secret is loaded once (from PAIOS_JWT_SECRET, generated and saved to .env
+# if it isn't set) rather than on every request, and changed with rotate().
+# Verified tokens are kept in a bounded LRU keyed by a hash of the token until
+# they expire, so a client sending the same token again costs a hash and a
+# dict lookup rather than a full HS256 verification.
+import os
+import time
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+import jwt
+from dotenv import set_key
+from common.paths import base_dir
+from common.utils import get_env_key
+
+jwt_cache_size = int(os.environ.get('PAIOS_JWT_CACHE_SIZE', 10000))
+
+# A function of its arguments alone, so it can run in a worker process (see
+# backend.crypto_pool)
+def sign(payload: dict, secret: str, algorithm='HS256'):
+    return jwt.encode(payload, secret, algorithm=algorithm, headers={"alg": algorithm, "typ": "JWT"})
+
+class TokenVerifier:
+    def __init__(self, key_name='PAIOS_JWT_SECRET', cache_size=jwt_cache_size, algorithm='HS256'):
+        self.key_name = key_name
+        self.cache_size = cache_size
+        self.algorithm = algorithm
+        self.hits = 0
+        self.misses = 0
+        self._secret = None
+        self._cache = OrderedDict()  # token hash -> (claims, expiry as a timestamp)
+        self._lock = threading.Lock()
+
+    @property
+    def secret(self):
+        if self._secret is None:
+            with self._lock:
+                if self._secret is None:
+                    self._secret = get_env_key(self.key_name, lambda: secrets.token_urlsafe(32))
+                    os.environ[self.key_name] = self._secret
+        return self._secret
+
+    # Replaces the secret (with a new random one by default) and saves it to
+    # .env. Tokens signed with the old secret stop verifying straight away.
+    def rotate(self, secret=None):
+        secret = secret or secrets.token_urlsafe(32)
+        set_key(base_dir / '.env', self.key_name, secret)
+        os.environ[self.key_name] = secret
+        with self._lock:
+            self._secret = secret
+            self._cache.clear()
+
+    def encode(self, payload: dict):
+        return sign(payload, self.secret, self.algorithm)
+
+    # Returns the token's claims, or raises jwt.InvalidTokenError (e.g.
+    # jwt.ExpiredSignatureError) as jwt.decode does
+    def decode(self, token: str):
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                claims, expiry = entry
+                if expiry > time.time():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._cache[key]
+            self.misses += 1
+        secret = self.secret
+        claims = jwt.decode(token, secret, algorithms=[self.algorithm])
+        expiry = claims.get('exp', float('inf'))
+        with self._lock:
+            if secret == self._secret:  # not rotated while verifying
+                self._cache[key] = (claims, expiry)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def snapshot(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": len(self._cache),
+        }
+
+token_verifier = TokenVerifier()
@@ -0,0 +1,134 @@
+# Request and response validation against the OpenAPI spec (the validator_map
+# for add_api). Requests are always validated, with the validator for each
+# schema compiled once and reused rather than rebuilt on every request.
+# Responses are validated according to PAIOS_RESPONSE_VALIDATION:
+# - strict (the default): every response is validated before it's sent, and
+#   one that doesn't match the spec is replaced with a 500
+# - sampled: a fraction (PAIOS_RESPONSE_VALIDATION_SAMPLE_RATE, default 0.01)
+#   of responses are validated after they've been sent, so they add no
+#   latency; ones that don't match the spec are logged and counted in
+#   response_validation_metrics
+# - off: responses aren't validated
+import os
+import random
+import logging
+from collections import Counter
+from jsonschema import Draft4Validator
+from connexion.datastructures import MediaTypeDict
+from connexion.exceptions import NonConformingResponse
+from connexion.json_schema import Draft4RequestValidator, Draft4ResponseValidator
+from connexion.validators import VALIDATOR_MAP, JSONRequestBodyValidator, JSONResponseBodyValidator, TextResponseBodyValidator
+from backend.bulk import NDJSONRequestBodyValidator, NDJSONResponseBodyValidator
+
+logger = logging.getLogger(__name__)
+
+response_validation_modes = ('strict', 'sampled', 'off')
+
+def get_response_validation():
+    mode = os.environ.get('PAIOS_RESPONSE_VALIDATION', 'strict').lower()
+    if mode not in response_validation_modes:
+        raise ValueError(f"Invalid value for PAIOS_RESPONSE_VALIDATION: {mode} (expected one of {', '.join(response_validation_modes)})")
+    return mode
+
+def get_sample_rate():
+    rate = float(os.environ.get('PAIOS_RESPONSE_VALIDATION_SAMPLE_RATE', 0.01))
+    if not 0 <= rate <= 1:
+        raise ValueError(f"Invalid value for PAIOS_RESPONSE_VALIDATION_SAMPLE_RATE: {rate} (expected 0 to 1)")
+    return rate
+
+# Validators by (class, schema). The schemas belong to the app's spec, so live
+# as long as the app; each is kept with its validator so that its id can't be
+# reused by another schema.
+_compiled_validators = {}
+
+def compiled_validator(validator_class, schema):
+    key = (validator_class, id(schema))
+    entry = _compiled_validators.get(key)
+    if entry is None or entry[0] is not schema:
+        entry = _compiled_validators[key] = (schema, validator_class(schema, format_checker=Draft4Validator.FORMAT_CHECKER))
+    return entry[1]
+
+class CompiledJSONRequestBodyValidator(JSONRequestBodyValidator):
+    @property
+    def _validator(self):
+        return compiled_validator(Draft4RequestValidator, self._schema)
+
+class CompiledJSONResponseBodyValidator(JSONResponseBodyValidator):
+    @property
+    def validator(self):
+        return compiled_validator(Draft4ResponseValidator, self._schema)
+
+class CompiledTextResponseBodyValidator(TextResponseBodyValidator, CompiledJSONResponseBodyValidator):
+    pass
+
+# Counts sampled responses and the ones that didn't match the spec, by operation
+class ValidationMetrics:
+    def __init__(self):
+        self.checked = 0
+        self.violations = 0
+        self.violations_by_operation = Counter()
+
+    def record(self, operation, error=None):
+        self.checked += 1
+        if error is not None:
+            self.violations += 1
+            self.violations_by_operation[operation] += 1
+            logger.warning(f"Response of {operation} doesn't match the spec: {error}")
+
+    def snapshot(self):
+        return {
+            "checked": self.checked,
+            "violations": self.violations,
+            "violations_by_operation": dict(self.violations_by_operation),
+        }
+
+response_validation_metrics = ValidationMetrics()
+
+# Passes the response through untouched and, for a sample of responses,
+# validates a copy of the body once the last of it has been sent
+class SampledResponseBodyValidator:
+    sample_rate = 0.01
+
+    def wrap_send(self, send):
+        if random.random() >= self.sample_rate:
+            return send
+        chunks = []
+
+        async def send_(message):
+            await send(message)
+            if message["type"] != "http.response.body":
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            routing = self._scope.get("extensions", {}).get("connexion_routing", {})
+            operation = routing.get("operation_id") or self._scope.get("path")
+            try:
+                body = self._parse(iter(chunks))
+                if not (body is None and self._nullable):
+                    self._validate(body)
+            except NonConformingResponse as e:
+                response_validation_metrics.record(operation, e.detail)
+            else:
+                response_validation_metrics.record(operation)
+
+        return send_
+
+def sampled(validator_class, sample_rate):
+    return type(f"Sampled{validator_class.__name__}", (SampledResponseBodyValidator, validator_class),
+                {"sample_rate": sample_rate})
+
+# The validator_map for add_api in the given response validation mode
+def validator_map(response_validation='strict', sample_rate=0.01):
+    response = {
+        '*/*json': CompiledJSONResponseBodyValidator,
+        'text/plain': CompiledTextResponseBodyValidator,
+    }
+    if response_validation == 'sampled':
+        response = {mime_type: sampled(validator, sample_rate) for mime_type, validator in response.items()}
+    return {
+        'body': MediaTypeDict({**VALIDATOR_MAP['body'], '*/*json': CompiledJSONRequestBodyValidator,
+                               'application/x-ndjson': NDJSONRequestBodyValidator}),
+        'response': MediaTypeDict({**VALIDATOR_MAP['response'], **response,
+                                   'application/x-ndjson': NDJSONResponseBodyValidator}),
+    }
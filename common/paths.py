@@ -20,6 +20,7 @@ cert_dir = data_dir / 'cert'
 apps_dir = data_dir / 'apps'
 envs_dir = data_dir / 'envs'
 log_dir = data_dir / 'log'
+cache_dir = data_dir / 'cache'
 
 # logs
 log_db_path = 'file:log?mode=memory&cache=shared'
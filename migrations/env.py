@@ -32,6 +32,14 @@ config.set_main_option("sqlalchemy.url", f"sqlite:///{db_path}")
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModelBase.metadata
 
+# full-text search tables (and their shadow tables) are SQLite virtual tables,
+# and asset_search_key and table_version are maintained by triggers, all
+# managed by hand in migrations, so keep autogenerate from trying to drop them
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and (name.startswith("asset_fts") or name in ("asset_search_key", "table_version")):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -57,6 +65,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         include_schemas=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -81,6 +90,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             include_schemas=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,66 @@
+"""added asset full-text search table
+
+Revision ID: 3b9e6f0c2d71
+Revises: e7cfcff87b8e
+Create Date: 2026-10-18 11:40:12.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e6f0c2d71'
+down_revision: Union[str, None] = 'e7cfcff87b8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # External content FTS5 index over the asset table, keyed by asset rowid
+    # (since keyed on a stable key instead, see keyed_asset_fts_on_a_stable_key)
+    op.execute("""
+        CREATE VIRTUAL TABLE asset_fts USING fts5(
+            title, description, creator, subject,
+            content='asset', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    # rank by BM25 with matches in the title weighted highest, then creator, subject and description
+    op.execute("INSERT INTO asset_fts(asset_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0, 2.0)')")
+
+    # keep the index in sync with the asset table
+    op.execute("""
+        CREATE TRIGGER asset_fts_insert AFTER INSERT ON asset BEGIN
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES (new.rowid, new.title, new.description, new.creator, new.subject);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_delete AFTER DELETE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', old.rowid, old.title, old.description, old.creator, old.subject);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_update AFTER UPDATE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', old.rowid, old.title, old.description, old.creator, old.subject);
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES (new.rowid, new.title, new.description, new.creator, new.subject);
+        END
+    """)
+
+    # index existing assets
+    op.execute("INSERT INTO asset_fts(asset_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_insert")
+    op.execute("DROP TABLE IF EXISTS asset_fts")
@@ -0,0 +1,50 @@
+"""added table version table
+
+Revision ID: 6e0174db0af8
+Revises: a41c7d2e9f53
+Create Date: 2026-10-18 16:22:09.530716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e0174db0af8'
+down_revision: Union[str, None] = 'a41c7d2e9f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# tables whose versions are kept (see backend.db.TableVersions), i.e. those
+# read by @conditional endpoints
+versioned_tables = ['asset', 'persona', 'resource', 'share']
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE table_version (
+            name TEXT NOT NULL PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    for table in versioned_tables:
+        # versions start at random, so a database that's recreated doesn't
+        # repeat the versions (and so the ETags) of the one it replaces
+        op.execute(f"INSERT INTO table_version (name, version) VALUES ('{table}', random() & 281474976710655)")
+        # bumped in the same transaction as the write, by whichever connection makes it
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"""
+                CREATE TRIGGER {table}_version_{event} AFTER {event.upper()} ON "{table}" BEGIN
+                    UPDATE table_version SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+
+def downgrade() -> None:
+    for table in reversed(versioned_tables):
+        for event in ('delete', 'update', 'insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{event}")
+    op.execute("DROP TABLE IF EXISTS table_version")
@@ -0,0 +1,41 @@
+"""added lookup indexes
+
+Revision ID: a41c7d2e9f53
+Revises: 3b9e6f0c2d71
+Create Date: 2026-10-18 13:05:47.102518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7d2e9f53'
+down_revision: Union[str, None] = '3b9e6f0c2d71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # user.email and user.webauthn_user_id are already covered by their unique constraints
+    op.create_index('ix_cred_webauthn_user_id', 'cred', ['webauthn_user_id'], unique=False)
+    op.create_index('ix_session_token', 'session', ['token'], unique=False)
+    op.create_index('ix_session_user_id', 'session', ['user_id'], unique=False)
+    op.create_index('ix_share_resource_id_expiration_dt', 'share', ['resource_id', 'expiration_dt'], unique=False)
+    op.create_index('ix_share_user_id', 'share', ['user_id'], unique=False,
+                    sqlite_where=sa.text('user_id IS NOT NULL'))
+    op.create_index('ix_share_expiration_dt', 'share', ['expiration_dt'], unique=False,
+                    sqlite_where=sa.text('expiration_dt IS NOT NULL'))
+    op.execute('ANALYZE')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_share_expiration_dt', table_name='share')
+    op.drop_index('ix_share_user_id', table_name='share')
+    op.drop_index('ix_share_resource_id_expiration_dt', table_name='share')
+    op.drop_index('ix_session_user_id', table_name='session')
+    op.drop_index('ix_session_token', table_name='session')
+    op.drop_index('ix_cred_webauthn_user_id', table_name='cred')
@@ -0,0 +1,131 @@
+"""keyed asset fts on a stable key
+
+Revision ID: cf6657f26c36
+Revises: 6e0174db0af8
+Create Date: 2026-10-18 17:04:51.218346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf6657f26c36'
+down_revision: Union[str, None] = '6e0174db0af8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+fts_options = """
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+"""
+
+
+def drop_asset_fts():
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS asset_fts_insert")
+    op.execute("DROP TABLE IF EXISTS asset_fts")
+
+
+def rank_and_rebuild():
+    # rank by BM25 with matches in the title weighted highest, then creator, subject and description
+    op.execute("INSERT INTO asset_fts(asset_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0, 2.0)')")
+    op.execute("INSERT INTO asset_fts(asset_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    # The index was keyed on asset's implicit rowid, which asset (keyed on a
+    # text id) doesn't own: VACUUM may renumber it, and copying the table (a
+    # dump and restore, or a migration that rebuilds it) does, leaving the
+    # index pointing at the wrong assets. Each asset now gets a key of its own
+    # in asset_search_key, an INTEGER PRIMARY KEY and so kept as it is by all
+    # of those, and the index is over the asset_search view of assets by key.
+    drop_asset_fts()
+    op.execute("""
+        CREATE TABLE asset_search_key (
+            key INTEGER PRIMARY KEY,
+            asset_id VARCHAR NOT NULL UNIQUE
+        )
+    """)
+    op.execute("INSERT INTO asset_search_key (asset_id) SELECT id FROM asset ORDER BY rowid")
+    op.execute("""
+        CREATE VIEW asset_search AS
+            SELECT asset_search_key.key, asset.title, asset.description, asset.creator, asset.subject
+            FROM asset_search_key JOIN asset ON asset.id = asset_search_key.asset_id
+    """)
+    op.execute(f"""
+        CREATE VIRTUAL TABLE asset_fts USING fts5(
+            title, description, creator, subject,
+            content='asset_search', content_rowid='key',
+            {fts_options}
+        )
+    """)
+
+    # keep the keys and the index in sync with the asset table
+    op.execute("""
+        CREATE TRIGGER asset_fts_insert AFTER INSERT ON asset BEGIN
+            INSERT INTO asset_search_key (asset_id) VALUES (new.id);
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES ((SELECT key FROM asset_search_key WHERE asset_id = new.id),
+                    new.title, new.description, new.creator, new.subject);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_delete AFTER DELETE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', (SELECT key FROM asset_search_key WHERE asset_id = old.id),
+                    old.title, old.description, old.creator, old.subject);
+            DELETE FROM asset_search_key WHERE asset_id = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_update AFTER UPDATE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', (SELECT key FROM asset_search_key WHERE asset_id = old.id),
+                    old.title, old.description, old.creator, old.subject);
+            UPDATE asset_search_key SET asset_id = new.id WHERE asset_id = old.id AND new.id IS NOT old.id;
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES ((SELECT key FROM asset_search_key WHERE asset_id = new.id),
+                    new.title, new.description, new.creator, new.subject);
+        END
+    """)
+
+    rank_and_rebuild()
+
+
+def downgrade() -> None:
+    drop_asset_fts()
+    op.execute("DROP VIEW IF EXISTS asset_search")
+    op.execute("DROP TABLE IF EXISTS asset_search_key")
+    op.execute(f"""
+        CREATE VIRTUAL TABLE asset_fts USING fts5(
+            title, description, creator, subject,
+            content='asset', content_rowid='rowid',
+            {fts_options}
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_insert AFTER INSERT ON asset BEGIN
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES (new.rowid, new.title, new.description, new.creator, new.subject);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_delete AFTER DELETE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', old.rowid, old.title, old.description, old.creator, old.subject);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER asset_fts_update AFTER UPDATE ON asset BEGIN
+            INSERT INTO asset_fts(asset_fts, rowid, title, description, creator, subject)
+            VALUES ('delete', old.rowid, old.title, old.description, old.creator, old.subject);
+            INSERT INTO asset_fts(rowid, title, description, creator, subject)
+            VALUES (new.rowid, new.title, new.description, new.creator, new.subject);
+        END
+    """)
+    rank_and_rebuild()